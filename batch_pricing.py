@@ -0,0 +1,160 @@
+"""
+Batch validation and columnar price calculation for main4's POST /items/batch.
+
+Pricing jobs send tens of thousands of items. One HTTP request per item spends most of its
+time in routing, body parsing and response encoding rather than in `price + tax`, so the
+batch endpoint takes them all at once:
+
+1. The body (a JSON array, or NDJSON with one item per line) is validated in a single
+   `TypeAdapter(list[Item]).validate_json` call, which parses and validates in pydantic-core.
+2. If some rows are invalid, their errors are collected by index and only the remaining rows
+   are validated again, so one bad row doesn't fail the batch.
+3. Prices and taxes are copied into `array('d')` columns and added in one `map` pass.
+
+Results come back in request order: {"index": i, "item": {...}} for valid rows (with
+`final_price` when a tax is given, as in POST /items/) and {"index": i, "errors": [...]}
+for invalid ones. Rows whose price, tax or final_price isn't finite (NaN, Infinity, or an
+overflowing sum) are reported as invalid too, since JSON has no way to return them.
+For NDJSON, `i` is the 0-based physical line number; blank lines are skipped but still
+counted, so an index points at the line it came from.
+
+The body is read with `read_batch_body`, which stops at MAX_BATCH_BYTES, and a batch of
+more than MAX_BATCH_ROWS rows is refused before it is validated; both raise BatchTooLarge
+(413 in main4).
+
+Configuration:
+    BATCH_MAX_BYTES=16777216     - largest batch body accepted
+    BATCH_MAX_ROWS=100000        - most rows accepted in one batch
+"""
+
+import json
+import os
+from array import array
+from functools import lru_cache
+from math import isfinite
+from operator import add
+from typing import Any, AsyncIterable
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+MAX_BATCH_BYTES = int(os.environ.get("BATCH_MAX_BYTES", str(16 * 1024 * 1024)))
+MAX_BATCH_ROWS = int(os.environ.get("BATCH_MAX_ROWS", "100000"))
+
+
+class BatchBodyError(ValueError):
+    """The body as a whole can't be read as a batch (bad JSON array, not a list)."""
+
+
+class BatchTooLarge(BatchBodyError):
+    """The body is over MAX_BATCH_BYTES or holds more than MAX_BATCH_ROWS rows."""
+
+
+async def read_batch_body(chunks: AsyncIterable[bytes], max_bytes: int = MAX_BATCH_BYTES) -> bytes:
+    """The whole body, or BatchTooLarge as soon as it grows past `max_bytes`."""
+    parts = []
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > max_bytes:
+            raise BatchTooLarge(f"Batch body is larger than {max_bytes} bytes")
+        parts.append(chunk)
+    return b"".join(parts)
+
+
+def _check_rows(count: int, max_rows: int) -> None:
+    if count > max_rows:
+        raise BatchTooLarge(f"Batch has {count} rows, more than {max_rows}")
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(list[model])
+
+
+def _split_errors(errors: list[dict]) -> dict[int, list[dict]]:
+    by_row: dict[int, list[dict]] = {}
+    for error in errors:
+        index, *loc = error["loc"]
+        by_row.setdefault(index, []).append({**error, "loc": loc})
+    return by_row
+
+
+def validate_batch(model: type[BaseModel], body: bytes, ndjson: bool = False,
+                   max_rows: int = MAX_BATCH_ROWS) -> tuple[list[tuple[int, Any]], dict[int, list[dict]]]:
+    """Validate every row of a batch body; return ([(index, model)], {index: errors})."""
+    adapter = _list_adapter(model)
+    row_errors: dict[int, list[dict]] = {}
+    if ndjson:
+        numbered = [(number, line) for number, line in enumerate(body.splitlines()) if line.strip()]
+        _check_rows(len(numbered), max_rows)
+        raw = b"[" + b",".join(line for _, line in numbered) + b"]"
+    else:
+        raw = body
+
+    try:
+        rows = adapter.validate_json(raw)
+    except ValidationError as e:
+        errors = e.errors(include_url=False, include_input=False)
+    else:
+        # A line holding several comma-separated values would add rows and shift every later
+        # index, so the fast path only stands if each line made exactly one row.
+        if not ndjson:
+            _check_rows(len(rows), max_rows)
+            return list(enumerate(rows)), row_errors
+        if len(rows) == len(numbered):
+            return [(number, row) for (number, _), row in zip(numbered, rows)], row_errors
+
+    if ndjson:
+        # Read line by line, so a broken line only invalidates that line and indexes are lines
+        rows_by_index = {}
+        for index, line in numbered:
+            try:
+                rows_by_index[index] = json.loads(line)
+            except ValueError as exc:
+                row_errors[index] = [{"type": "json_invalid", "loc": [], "msg": f"Invalid JSON: {exc}"}]
+    elif errors[0]["type"] == "json_invalid" or errors[0]["loc"] == ():
+        raise BatchBodyError(errors[0]["msg"])
+    else:
+        rows_by_index = dict(enumerate(json.loads(raw)))
+        _check_rows(len(rows_by_index), max_rows)
+        row_errors.update(_split_errors(errors))
+
+    valid_indexes = [i for i in rows_by_index if i not in row_errors]
+    try:
+        valid = adapter.validate_python([rows_by_index[i] for i in valid_indexes])
+    except ValidationError as exc:
+        # Only reached for NDJSON: its lines haven't been validated one by one yet
+        for position, errs in _split_errors(exc.errors(include_url=False, include_input=False)).items():
+            row_errors[valid_indexes[position]] = errs
+        valid_indexes = [i for i in valid_indexes if i not in row_errors]
+        valid = adapter.validate_python([rows_by_index[i] for i in valid_indexes])
+    return list(zip(valid_indexes, valid)), row_errors
+
+
+def _non_finite_errors(item: Any) -> list[dict]:
+    errors = [{"type": "finite_number", "loc": [field], "msg": "Input should be a finite number"}
+              for field in ("price", "tax") if not isfinite(getattr(item, field) or 0.0)]
+    return errors or [{"type": "finite_number", "loc": ["final_price"], "msg": "price + tax is not a finite number"}]
+
+
+def price_batch(items: list[tuple[int, Any]], row_errors: dict[int, list[dict]]) -> list[dict]:
+    """Compute final prices column-wise and merge valid and invalid rows back in order."""
+    models = [item for _, item in items]
+    prices = array("d", [item.price for item in models])
+    taxes = array("d", [item.tax or 0.0 for item in models])
+    final_prices = array("d", map(add, prices, taxes))
+
+    # NDJSON indexes are line numbers, which skip blank lines, so order by index at the end
+    results: dict[int, dict] = {}
+    for (index, item), final_price in zip(items, final_prices):
+        if not isfinite(final_price):
+            # NaN/Infinity in the input, or an overflowing sum: JSON can't carry them
+            results[index] = {"index": index, "errors": _non_finite_errors(item)}
+            continue
+        item_dict = item.model_dump()
+        if item.tax:
+            item_dict["final_price"] = final_price
+        results[index] = {"index": index, "item": item_dict}
+    for index, errors in row_errors.items():
+        results[index] = {"index": index, "errors": errors}
+    return [results[index] for index in sorted(results)]
@@ -0,0 +1,76 @@
+"""
+Benchmark: pricing N items with N calls to main4's POST /items/ vs one POST /items/batch.
+
+Requests go through httpx.ASGITransport (no sockets), so the difference is the per-request
+overhead of routing, body parsing, validation setup and response encoding.
+
+Run from the repository root:
+    python -m benchmarks.bench_batch_pricing
+    python -m benchmarks.bench_batch_pricing --sizes 1000 10000 --invalid 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import httpx
+
+import main4
+
+
+def make_rows(n: int, invalid: float, seed: int = 4) -> list[dict]:
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        row = {"name": f"item-{i}", "price": round(rng.uniform(1, 500), 2)}
+        if rng.random() < 0.7:
+            row["tax"] = round(row["price"] * 0.15, 2)
+        if rng.random() < invalid:
+            del row["price"]
+        rows.append(row)
+    return rows
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--invalid", type=float, default=0.0, help="fraction of rows missing a price")
+    parser.add_argument("--single-limit", type=int, default=10_000,
+                        help="skip the one-request-per-item run above this size")
+    args = parser.parse_args()
+
+    transport = httpx.ASGITransport(app=main4.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{'items':>8} {'single items/s':>15} {'batch items/s':>14} {'ndjson items/s':>15}")
+        for size in args.sizes:
+            rows = make_rows(size, args.invalid)
+            valid_rows = [row for row in rows if "price" in row]
+
+            if size <= args.single_limit:
+                start = time.perf_counter()
+                for row in valid_rows:
+                    response = await client.post("/items/", json=row)
+                    assert response.status_code == 200
+                single = f"{len(valid_rows) / (time.perf_counter() - start):15.0f}"
+            else:
+                single = f"{'skipped':>15}"
+
+            body = json.dumps(rows).encode()
+            start = time.perf_counter()
+            response = await client.post("/items/batch", content=body, headers={"content-type": "application/json"})
+            batch = size / (time.perf_counter() - start)
+            assert len(response.json()) == size
+
+            body = b"\n".join(json.dumps(row).encode() for row in rows)
+            start = time.perf_counter()
+            response = await client.post("/items/batch", content=body, headers={"content-type": "application/x-ndjson"})
+            ndjson = size / (time.perf_counter() - start)
+            assert len(response.json()) == size
+
+            print(f"{size:>8} {single} {batch:14.0f} {ndjson:15.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
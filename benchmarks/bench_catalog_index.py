@@ -0,0 +1,113 @@
+"""
+Benchmark: main7-style FilterParams queries on CatalogIndex vs filtering and sorting a list.
+
+Items get 1-4 tags drawn from a Zipf-like distribution, so a few tags ("tag-0", "tag-1")
+are on a large share of the items and most tags are rare. For each query the table
+shows the plan CatalogIndex picked and the time per query for both approaches.
+
+Run from the repository root:
+    python -m benchmarks.bench_catalog_index
+    python -m benchmarks.bench_catalog_index --items 100000
+"""
+
+import argparse
+import random
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+
+from catalog_index import CatalogIndex
+
+
+@dataclass(slots=True)
+class Row:
+    # Same attributes as main7.Item, without pydantic's per-instance overhead at 1M rows
+    id: int
+    name: str
+    tags: list[str]
+    created_at: datetime
+    updated_at: datetime
+
+
+def make_rows(n: int, n_tags: int, seed: int = 7) -> list[Row]:
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(n_tags)]
+    tag_names = [f"tag-{rank}" for rank in range(n_tags)]
+    start = datetime(2020, 1, 1)
+    rows = []
+    for i in range(n):
+        tags = rng.choices(tag_names, weights=weights, k=rng.randint(1, 4))
+        created = start + timedelta(seconds=rng.randrange(10**8))
+        rows.append(Row(i, f"item-{i}", tags, created, created + timedelta(seconds=rng.randrange(10**6))))
+    return rows
+
+
+def naive(rows: list[Row], order_by: str, offset: int, limit: int, tags: list[str]) -> list[Row]:
+    matches = [row for row in rows if all(tag in row.tags for tag in tags)]
+    matches.sort(key=lambda row: (getattr(row, order_by), row.id))
+    return matches[offset:offset + limit]
+
+
+def check_overlapping_extend(n: int = 5_000, n_tags: int = 50) -> None:
+    """extend() with ids that are already indexed and ids repeated within one batch."""
+    rng = random.Random(11)
+    rows = make_rows(n, n_tags)
+    index = CatalogIndex()
+    index.extend(rows[: n // 2])
+    batch = rows[n // 4:]
+    batch += [replace(row, created_at=row.created_at + timedelta(days=rng.randrange(1, 400)),
+                      updated_at=row.updated_at - timedelta(days=rng.randrange(1, 400)),
+                      tags=rng.sample([f"tag-{rank}" for rank in range(n_tags)], 2))
+              for row in rng.sample(rows, n // 5)]
+    index.extend(batch)
+    current = {row.id: row for row in rows[: n // 2] + batch}
+    assert all(len(entries) == len(current) for entries in index._sorted.values())
+    for order_by, tags in [("created_at", []), ("updated_at", []), ("created_at", ["tag-0"]),
+                           ("updated_at", ["tag-1", "tag-2"])]:
+        expected = naive(list(current.values()), order_by, 0, n, tags)
+        assert [row.id for row in index.query(order_by, 0, n, tags).items] == [row.id for row in expected]
+
+
+def per_query(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--tags", type=int, default=1_000, help="distinct tags")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--naive-repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    check_overlapping_extend()
+    rows = make_rows(args.items, args.tags)
+    index = CatalogIndex()
+    start = time.perf_counter()
+    index.extend(rows)
+    print(f"indexed {len(index)} items in {time.perf_counter() - start:.1f}s\n")
+
+    queries = [
+        ("created_at", 0, 100, []),
+        ("updated_at", 500_000 if args.items > 500_000 else args.items // 2, 100, []),
+        ("created_at", 0, 100, ["tag-0"]),
+        ("created_at", 0, 100, ["tag-0", "tag-1"]),
+        ("updated_at", 0, 50, ["tag-900"]),
+        ("created_at", 0, 100, ["tag-3", "tag-500"]),
+        ("created_at", 1_000, 100, ["tag-0", "tag-2"]),
+    ]
+    print(f"{'order_by':>10} {'offset':>7} {'limit':>5} {'tags':>18} {'plan':>9} {'index us':>10} {'naive ms':>10}")
+    for order_by, offset, limit, tags in queries:
+        result = index.query(order_by, offset, limit, tags)
+        assert [r.id for r in result.items] == [r.id for r in naive(rows, order_by, offset, limit, tags)]
+        index_s = per_query(lambda: index.query(order_by, offset, limit, tags), args.repeat)
+        naive_s = per_query(lambda: naive(rows, order_by, offset, limit, tags), args.naive_repeat)
+        print(f"{order_by:>10} {offset:>7} {limit:>5} {','.join(tags) or '-':>18} {result.plan:>9} "
+              f"{index_s * 1e6:10.0f} {naive_s * 1e3:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
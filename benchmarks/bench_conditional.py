@@ -0,0 +1,78 @@
+"""
+Benchmark: a client polling main17's GET /items/{id} and GET /items/ (with `--items` items
+in the store).
+
+    before - a copy of the routes as they were: load, validate and serialize every time
+    200    - the current routes without validators: the body is reused from the cache
+    304    - the current routes with If-None-Match: no body at all
+
+Both apps run through httpx.ASGITransport; the table shows requests per second and bytes
+of response body per request.
+
+Run from the repository root:
+    python -m benchmarks.bench_conditional
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+import main17
+from main17 import Item, items_db
+
+before = FastAPI()
+
+
+@before.get("/items/{item_id}", response_model=Item)
+async def get_item(item_id: int) -> Item:
+    item = await items_db.get(item_id)
+    if item is not None:
+        return item
+    raise HTTPException(status_code=404)
+
+
+@before.get("/items/", response_model=List[Item])
+async def list_items() -> List[Item]:
+    return await items_db.values()
+
+
+async def poll(app, path: str, n: int, conditional: bool) -> tuple[float, float]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        first = await client.get(path)
+        headers = {"If-None-Match": first.headers["etag"]} if conditional else {}
+        received = 0
+        start = time.perf_counter()
+        for _ in range(n):
+            response = await client.get(path, headers=headers)
+            received += len(response.content)
+        elapsed = time.perf_counter() - start
+    return n / elapsed, received / n
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=1_000)
+    args = parser.parse_args()
+
+    await items_db.clear()
+    await items_db.extend(
+        Item(id=i, name=f"Item {i}", description="Something to poll for", price=float(i), tax=1.5)
+        for i in range(1, args.items + 1)
+    )
+
+    print(f"{'path':>10} {'mode':>7} {'req/s':>8} {'body bytes':>11}")
+    for path in ("/items/1", "/items/"):
+        for mode, app, conditional in (("before", before, False), ("200", main17.app, False),
+                                       ("304", main17.app, True)):
+            rate, size = await poll(app, path, args.requests, conditional)
+            print(f"{path:>10} {mode:>7} {rate:8.0f} {size:11.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+"""
+Benchmark: parsing a Cookie header with main12's old split-based loop, with
+`http.cookies.SimpleCookie`, and with cookie_parser (memo cold and warm).
+
+The first table shows which parsers survive a few valid but awkward headers; the second
+times each parser on a typical header.
+
+Run from the repository root:
+    python -m benchmarks.bench_cookie_parser
+"""
+
+import argparse
+import timeit
+from http.cookies import SimpleCookie
+
+from cookie_parser import _parse, parse_cookie_header
+
+HEADER = ("session_id=abc123; fatebook_tracker=tracker123; googall_tracker=tracker456; "
+          "theme=dark; csrftoken=Zm9vYmFyYmF6cXV4; _ga=GA1.2.1234567890.1700000000")
+
+AWKWARD = {
+    "value with '='": "token=YWJjZA==; session_id=abc123",
+    "no space after ';'": "session_id=abc123;theme=dark",
+    "flag cookie": "session_id=abc123; debug",
+    "quoted value": 'session_id="abc123"',
+}
+
+
+def split_parser(header: str) -> dict[str, str]:
+    # main12's extract_without_cookie before cookie_parser
+    cookies = {}
+    for cookie in header.split("; "):
+        key, value = cookie.split("=")
+        cookies[key] = value
+    return cookies
+
+
+def simple_cookie(header: str) -> dict[str, str]:
+    jar = SimpleCookie()
+    jar.load(header)
+    return {name: morsel.value for name, morsel in jar.items()}
+
+
+PARSERS = {
+    "split": split_parser,
+    "SimpleCookie": simple_cookie,
+    "cookie_parser": lambda header: dict(parse_cookie_header(header)),
+}
+
+
+def describe(parser, header: str) -> str:
+    try:
+        return str(parser(header).get("session_id"))
+    except Exception as e:
+        return type(e).__name__
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print("session_id as parsed from awkward headers:")
+    print(f"{'header':>20} " + " ".join(f"{name:>14}" for name in PARSERS))
+    for label, header in AWKWARD.items():
+        print(f"{label:>20} " + " ".join(f"{describe(fn, header):>14}" for fn in PARSERS.values()))
+
+    timings = {
+        "split": lambda: split_parser(HEADER),
+        "SimpleCookie": lambda: simple_cookie(HEADER),
+        "cookie_parser (cold)": lambda: _parse(HEADER),
+        "cookie_parser (memo)": lambda: parse_cookie_header(HEADER),
+    }
+    print(f"\n{'parser':>22} {'us/header':>10}")
+    for name, fn in timings.items():
+        number = args.number // 10 if name == "SimpleCookie" else args.number
+        seconds = min(timeit.repeat(fn, number=number, repeat=5)) / number
+        print(f"{name:>22} {seconds * 1e6:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Benchmark: jsonable_encoder vs encode_for_storage on main18's Event and Item models.
+
+Item payload size is varied through the number of tags. Every case first checks that both
+encoders return the same dict.
+
+Run from the repository root:
+    python -m benchmarks.bench_encoders
+"""
+
+import argparse
+import timeit
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+
+from encoders import encode_for_storage
+from main18 import Event, Item
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20_000)
+    args = parser.parse_args()
+
+    cases = [("Event", Event(name="FastAPI Meetup", date=datetime(2025, 1, 12, 14, 30)))]
+    for n_tags in (0, 10, 100, 1_000):
+        cases.append((
+            f"Item ({n_tags} tags)",
+            Item(name="Foo", description="The pretender", price=42.0, tags=[f"tag-{i}" for i in range(n_tags)]),
+        ))
+
+    print(f"{'payload':>18} {'jsonable_encoder us':>20} {'encode_for_storage us':>22} {'speedup':>8}")
+    for name, obj in cases:
+        assert encode_for_storage(obj) == jsonable_encoder(obj)
+        number = max(1, args.number // (1 + len(getattr(obj, "tags", ())) // 10))
+        slow = min(timeit.repeat(lambda: jsonable_encoder(obj), number=number, repeat=3)) / number
+        fast = min(timeit.repeat(lambda: encode_for_storage(obj), number=number, repeat=3)) / number
+        print(f"{name:>18} {slow * 1e6:20.2f} {fast * 1e6:22.2f} {slow / fast:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark: main14's POST /items/ and POST /user/ with FastAPI's response_model handling
+("before") vs main14's FastResponseRoute ("after").
+
+"before" is a copy of the two routes on a separate app with the default APIRoute. Both apps are
+driven through httpx.ASGITransport. The second table times just the response step: FastAPI's
+`serialize_response` vs the cached fast_response serializer.
+
+Before timing, `check_route_options` checks that a FastResponseRoute app answers exactly like a
+default one when routes set status codes, exclude options, headers, cookies and background tasks.
+
+Run from the repository root:
+    python -m benchmarks.bench_fast_response
+"""
+
+import argparse
+import asyncio
+import time
+import timeit
+from typing import Any
+
+import httpx
+from fastapi import BackgroundTasks, Depends, FastAPI, Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+import main14
+from fast_response import FastResponseRoute, serializer_for
+from main14 import Item, UserIn, UserOut
+
+before = FastAPI()
+
+
+@before.post("/items/", response_model=Item)
+async def create_item(item: Item) -> Any:
+    return item
+
+
+@before.post("/user/", response_model=UserOut)
+async def create_user(user: UserIn) -> Any:
+    return user
+
+
+ITEM = {"name": "Portal Gun", "description": "A device for interdimensional travel", "price": 42.0,
+        "tax": 4.2, "tags": ["sci-fi", "gadget"]}
+USER = {"username": "johndoe", "password": "supersecret", "email": "john.doe@example.com", "full_name": "John Doe"}
+
+
+def options_app(route_class: type | None) -> tuple[FastAPI, list[str]]:
+    app = FastAPI()
+    if route_class is not None:
+        app.router.route_class = route_class
+    tasks: list[str] = []
+
+    def tag(response: Response) -> None:
+        response.headers["X-Tag"] = "dependency"
+
+    @app.post("/created", response_model=Item, status_code=201, response_model_exclude_none=True)
+    async def created(item: Item) -> Any:
+        return item
+
+    @app.post("/unset", response_model=UserOut, response_model_exclude_unset=True, dependencies=[Depends(tag)])
+    async def unset(user: UserIn, response: Response, background_tasks: BackgroundTasks) -> Any:
+        response.set_cookie("seen", "1")
+        response.status_code = 202
+        background_tasks.add_task(tasks.append, user.username)
+        return user
+
+    @app.post("/plain", response_model=Item, response_model_exclude_unset=True, dependencies=[Depends(tag)])
+    async def plain(item: Item) -> Any:
+        return {"name": item.name, "price": item.price}
+
+    return app, tasks
+
+
+async def check_route_options() -> None:
+    """FastResponseRoute keeps status codes, exclude options, headers, cookies and background tasks."""
+    requests = [("/created", {"name": "x", "price": 1.0}), ("/unset", {"username": "u", "password": "p", "email": "u@example.com"}),
+                ("/plain", ITEM)]
+    answers = []
+    for route_class in (None, FastResponseRoute):
+        app, tasks = options_app(route_class)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://check") as client:
+            responses = [await client.post(path, json=body) for path, body in requests]
+        answers.append(([(r.status_code, sorted(r.headers.items()), r.content) for r in responses], tasks))
+    assert answers[0] == answers[1], answers
+
+
+async def requests_per_second(app, path: str, body: dict, n: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        expected = (await client.post(path, json=body)).content
+        start = time.perf_counter()
+        for _ in range(n):
+            response = await client.post(path, json=body)
+        assert response.content == expected
+    return n / (time.perf_counter() - start)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--number", type=int, default=50_000)
+    args = parser.parse_args()
+
+    await check_route_options()
+    print(f"{'route':>8} {'before req/s':>13} {'after req/s':>12}")
+    for path, body in (("/items/", ITEM), ("/user/", USER)):
+        # Alternate the two apps and keep the best round of each, to smooth out machine noise
+        old = new = 0.0
+        for _ in range(args.rounds):
+            old = max(old, await requests_per_second(before, path, body, args.requests))
+            new = max(new, await requests_per_second(main14.app, path, body, args.requests))
+        print(f"{path:>8} {old:13.0f} {new:12.0f}")
+
+    print(f"\n{'route':>8} {'serialize_response us':>22} {'fast_response us':>17} {'kind':>11}")
+    for path, value, model in (("/items/", Item(**ITEM), Item), ("/user/", UserIn(**USER), UserOut)):
+        field = create_model_field(name="Response", type_=model, mode="serialization")
+        kind, serialize = serializer_for(type(value), model)
+
+        async def fastapi_path():
+            content = await serialize_response(field=field, response_content=value, is_coroutine=True)
+            return JSONResponse(content).body
+
+        loop_number = args.number // 5
+        start = time.perf_counter()
+        for _ in range(loop_number):
+            await fastapi_path()
+        old = (time.perf_counter() - start) / loop_number
+        new = min(timeit.repeat(lambda: serialize(value), number=args.number, repeat=3)) / args.number
+        print(f"{path:>8} {old * 1e6:22.2f} {new * 1e6:17.2f} {kind:>11}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+"""
+Benchmark: serving small and large files.
+
+    read bytes    - `def` endpoint that reads the whole file and returns Response(bytes)
+    FileResponse  - Starlette's FileResponse (stat, open, 64 KiB reads, md5 ETag)
+    serve_file    - file_serving.py: cached metadata, one hop for small files, pread chunks
+    304           - serve_file with If-None-Match (answered from the metadata cache)
+
+Files of each size are written to a temporary directory and fetched through
+httpx.ASGITransport, one request at a time. The table shows requests per second and
+MB/s of response body.
+
+Run from the repository root:
+    python -m benchmarks.bench_file_serving
+"""
+
+import argparse
+import asyncio
+import os
+import pathlib
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+
+from file_serving import FileCache, serve_file
+
+SIZES = (("1 KiB", 1024), ("200 KiB", 200 * 1024), ("16 MiB", 16 * 1024**2))
+
+
+def build_app(root: str) -> FastAPI:
+    app = FastAPI()
+    files = FileCache(root)
+
+    @app.get("/bytes/{name}")
+    def read_bytes(name: str) -> Response:
+        return Response(pathlib.Path(root, name).read_bytes(), media_type="application/octet-stream")
+
+    @app.get("/file-response/{name}")
+    async def file_response(name: str) -> FileResponse:
+        return FileResponse(os.path.join(root, name))
+
+    @app.get("/serve-file/{name}")
+    async def cached(name: str, request: Request) -> Response:
+        response = await serve_file(request, files, name)
+        if response is None:
+            raise HTTPException(status_code=404)
+        return response
+
+    return app
+
+
+async def fetch(client: httpx.AsyncClient, path: str, n: int, conditional: bool) -> tuple[float, float]:
+    first = await client.get(path)
+    headers = {"If-None-Match": first.headers["etag"]} if conditional else {}
+    received = 0
+    start = time.perf_counter()
+    for _ in range(n):
+        response = await client.get(path, headers=headers)
+        received += len(response.content)
+    elapsed = time.perf_counter() - start
+    return n / elapsed, received / elapsed / 1e6
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1_000)
+    parser.add_argument("--large-requests", type=int, default=50, help="requests per mode for the 16 MiB file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        for label, size in SIZES:
+            pathlib.Path(root, f"{size}.bin").write_bytes(os.urandom(size))
+        app = build_app(root)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            print(f"{'file':>8} {'mode':>13} {'req/s':>8} {'MB/s':>8}")
+            for label, size in SIZES:
+                n = args.large_requests if size > 1024**2 else args.requests
+                for mode, prefix, conditional in (("read bytes", "/bytes", False),
+                                                  ("FileResponse", "/file-response", False),
+                                                  ("serve_file", "/serve-file", False),
+                                                  ("304", "/serve-file", True)):
+                    rate, mb = await fetch(client, f"{prefix}/{size}.bin", n, conditional)
+                    print(f"{label:>8} {mode:>13} {rate:8.0f} {mb:8.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+"""
+Report: memory and startup time of one uvicorn process per app vs. the gateway.
+
+    separate      - `uvicorn mainN:app` for every app, all started at once
+    gateway xN    - `uvicorn gateway:app --workers N`
+
+"startup s" is the wall time from launch until every app answers (for the separate
+processes, each one's /openapi.json; for the gateway, its GET /). "RSS MiB" is the
+resident memory of all the processes involved, worker and helper processes included
+(main14's password hashing pool, for example), measured a couple of seconds after
+startup. Reads /proc, so Linux only.
+
+Run from the repository root:
+    python -m benchmarks.bench_gateway
+"""
+
+import argparse
+import pathlib
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+from gateway import app_modules
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def launch(target: str, port: int, workers: int = 1) -> subprocess.Popen:
+    command = [sys.executable, "-m", "uvicorn", target, "--port", str(port), "--log-level", "warning"]
+    if workers > 1:
+        command += ["--workers", str(workers)]
+    return subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_ready(url: str, deadline: float) -> None:
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(url)
+
+
+def process_tree(pids: list[int]) -> list[int]:
+    """`pids` and all their descendants."""
+    children: dict[int, list[int]] = {}
+    for stat in pathlib.Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(stat.parent.name))
+    tree, todo = [], list(pids)
+    while todo:
+        pid = todo.pop()
+        tree.append(pid)
+        todo.extend(children.get(pid, ()))
+    return tree
+
+
+def tree_rss_kib(pids: list[int]) -> int:
+    """Total VmRSS of `pids` and all their descendants."""
+    total = 0
+    for pid in process_tree(pids):
+        try:
+            for line in pathlib.Path(f"/proc/{pid}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1])
+        except OSError:
+            pass
+    return total
+
+
+def measure(processes: list[subprocess.Popen], urls: list[str], settle: float, timeout: float) -> tuple[float, float]:
+    start = time.monotonic()
+    try:
+        for url in urls:
+            wait_ready(url, start + timeout)
+        startup = time.monotonic() - start
+        time.sleep(settle)
+        return startup, tree_rss_kib([process.pid for process in processes]) / 1024
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="*", default=[1, 2])
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds to wait after startup before reading RSS")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    modules = app_modules()
+    print(f"{'setup':>12} {'workers':>9} {'startup s':>9} {'RSS MiB':>8}")
+
+    ports = [free_port() for _ in modules]
+    processes = [launch(f"{name}:app", port) for name, port in zip(modules, ports)]
+    urls = [f"http://127.0.0.1:{port}/openapi.json" for port in ports]
+    startup, rss = measure(processes, urls, args.settle, args.timeout)
+    print(f"{'separate':>12} {len(modules):9d} {startup:9.2f} {rss:8.0f}")
+
+    for workers in args.workers:
+        port = free_port()
+        processes = [launch("gateway:app", port, workers)]
+        startup, rss = measure(processes, [f"http://127.0.0.1:{port}/"], args.settle, args.timeout)
+        print(f"{f'gateway x{workers}':>12} {workers:9d} {startup:9.2f} {rss:8.0f}")
+
+
+if __name__ == "__main__":
+    main()
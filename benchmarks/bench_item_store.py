@@ -0,0 +1,71 @@
+"""
+Benchmark: get-by-id latency, linear list scan vs ItemStore hash index.
+
+The old main17 walked `items_db: List[Item]` on every lookup, so the cost grows with the
+number of items. ItemStore.get is a dict lookup, so it should stay flat from 1k to 1M.
+
+Run from the repository root:
+    python -m benchmarks.bench_item_store
+    python -m benchmarks.bench_item_store --sizes 1000 10000 --lookups 200
+"""
+
+import argparse
+import random
+import timeit
+
+from item_store import ItemStore, NonFinitePrice
+from main17 import Item
+
+
+def list_scan(items: list[Item], item_id: int) -> Item | None:
+    for item in items:
+        if item.id == item_id:
+            return item
+    return None
+
+
+def check_non_finite_prices() -> None:
+    """NaN and infinite prices are refused, and the price index stays sorted and queryable."""
+    store: ItemStore[Item] = ItemStore(key="id", index_price=True)
+    for i, price in enumerate([5, float("nan"), 1, 3, 10, float("inf"), 2]):
+        # model_construct skips main17's own allow_inf_nan=False check
+        item = Item.model_construct(id=i, name=f"item-{i}", price=float(price))
+        try:
+            store.add(item)
+        except NonFinitePrice:
+            assert i in (1, 5) and i not in store
+    assert [item.price for item in store.find_by_price_range(2, 10)] == [2.0, 3.0, 5.0, 10.0]
+    store.delete(4)
+    assert [item.price for item in store.find_by_price_range(0, 100)] == [1.0, 2.0, 3.0, 5.0]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--lookups", type=int, default=1_000, help="lookups per measurement")
+    parser.add_argument("--scan-limit", type=int, default=100_000,
+                        help="skip the list scan above this size (it takes too long)")
+    args = parser.parse_args()
+
+    check_non_finite_prices()
+    print(f"{'items':>10} {'store.get (ns)':>16} {'list scan (ns)':>16}")
+    for size in args.sizes:
+        items = [Item(id=i, name=f"item-{i}", price=float(i % 1000)) for i in range(size)]
+        store: ItemStore[Item] = ItemStore(key="id")
+        store.extend(items)
+        keys = [random.randrange(size) for _ in range(args.lookups)]
+
+        store_ns = min(timeit.repeat(lambda: [store.get(k) for k in keys], number=1, repeat=5))
+        store_ns = store_ns / len(keys) * 1e9
+
+        if size <= args.scan_limit:
+            scan_keys = keys[: max(1, args.lookups // 10)]
+            scan_ns = min(timeit.repeat(lambda: [list_scan(items, k) for k in scan_keys], number=1, repeat=3))
+            scan = f"{scan_ns / len(scan_keys) * 1e9:16.0f}"
+        else:
+            scan = f"{'skipped':>16}"
+        print(f"{size:>10} {store_ns:16.0f} {scan}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmark: the cost of metrics.py on main.py's hello world route (GET /).
+
+Two copies of main.py's app are compared, one plain and one with `instrument_metrics`,
+in two ways:
+
+    in-process  - both apps are called directly as ASGI apps (no HTTP client, no
+                  server), so the middleware's share of the request is as large as it
+                  can get. Batches of `--batch` requests alternate between the apps.
+    served      - both apps run under uvicorn (httptools, one worker) and are driven in
+                  turn over keep-alive connections for `--duration` seconds at a time;
+                  the cost is the server's CPU time per request, read from /proc
+                  (Linux only), which leaves out the client sharing the machine.
+
+Either way the overhead is the median of the paired rounds' ratios, which holds up
+better against a noisy machine than comparing two long runs. The target is under 2% on
+a served request; the in-process figure is the worst case for the same microseconds.
+
+Before timing, `check_mounts` checks that routes added to a mounted app after the first
+request are labelled with their template, and that an instrumented app mounted in another
+one is only counted once.
+
+Run from the repository root:
+    python -m benchmarks.bench_metrics
+    python -m benchmarks.bench_metrics --skip-served
+"""
+
+import argparse
+import asyncio
+import pathlib
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI
+from starlette.routing import Mount
+
+import main
+from benchmarks.bench_gateway import free_port, wait_ready
+from benchmarks.bench_servers import cpu_seconds, drive
+from metrics import instrument_metrics
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+SCOPE = {
+    "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+    "path": "/", "raw_path": b"/", "root_path": "", "query_string": b"", "headers": [(b"host", b"bench")],
+    "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 8000),
+}
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def hello_app(metrics: bool) -> FastAPI:
+    app = FastAPI()
+    app.get("/")(main.root)
+    if metrics:
+        instrument_metrics(app)
+    return app
+
+
+# uvicorn --factory targets for the served comparison
+def plain_app() -> FastAPI:
+    return hello_app(False)
+
+
+def metrics_app() -> FastAPI:
+    return hello_app(True)
+
+
+async def check_mounts() -> None:
+    """Late routes inside a mount get their own series; a nested registry steps aside."""
+    inner = hello_app(True)
+    outer = FastAPI()
+    outer.router.routes.append(Mount("/inner", app=inner))
+    instrument_metrics(outer)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=outer), base_url="http://check") as client:
+        await client.get("/inner/")
+        inner.get("/late/{x}")(main.root)
+        for path in ("/inner/late/1", "/inner/late/2", "/inner/missing"):
+            await client.get(path)
+        assert (await client.get("/inner/metrics")).status_code == 404
+        text = (await client.get("/metrics")).text
+    for line in ('route="/inner/",status="2xx"} 1', 'route="/inner/late/{x}",status="2xx"} 2',
+                 'route="<unmatched>",status="4xx"} 1'):
+        assert f'http_requests_total{{method="GET",{line}' in text, line
+
+
+async def per_call_us(app: FastAPI, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        await app(dict(SCOPE), receive, send)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def report(label: str, unit: str, plain: list[float], instrumented: list[float]) -> None:
+    overhead = statistics.median(m / p for p, m in zip(plain, instrumented)) - 1
+    added = statistics.median(m - p for p, m in zip(plain, instrumented))
+    print(f"{label:>11} {unit:>11} {statistics.median(plain):9.2f} {statistics.median(instrumented):9.2f} "
+          f"{added:+9.2f} {overhead:+9.1%}")
+
+
+async def in_process(args: argparse.Namespace) -> None:
+    plain, instrumented = hello_app(False), hello_app(True)
+    for app in (plain, instrumented):
+        await per_call_us(app, 1_000)
+    plain_us, metrics_us = [], []
+    for _ in range(args.rounds):
+        plain_us.append(await per_call_us(plain, args.batch))
+        metrics_us.append(await per_call_us(instrumented, args.batch))
+    report("in-process", "us/request", plain_us, metrics_us)
+
+
+async def served_cpu_us(pid: int, base_url: str, args: argparse.Namespace) -> float:
+    before = cpu_seconds(pid)
+    latencies, errors = await drive(base_url, ["/"], args.concurrency, args.duration)
+    if errors:
+        raise RuntimeError(f"{errors} failed requests against {base_url}")
+    return (cpu_seconds(pid) - before) / len(latencies) * 1e6
+
+
+async def served(args: argparse.Namespace) -> None:
+    servers = []
+    try:
+        for factory in ("plain_app", "metrics_app"):
+            port = free_port()
+            command = [
+                sys.executable, "-m", "uvicorn", f"benchmarks.bench_metrics:{factory}", "--factory",
+                "--port", str(port), "--http", "httptools", "--no-access-log", "--log-level", "warning",
+            ]
+            process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            servers.append((process, f"http://127.0.0.1:{port}"))
+            await asyncio.to_thread(wait_ready, f"http://127.0.0.1:{port}/", time.monotonic() + 60)
+        for process, base_url in servers:
+            await drive(base_url, ["/"], args.concurrency, 1.0)
+        results: list[list[float]] = [[], []]
+        for _ in range(args.served_rounds):
+            for result, (process, base_url) in zip(results, servers):
+                result.append(await served_cpu_us(process.pid, base_url, args))
+    finally:
+        for process, _ in servers:
+            process.terminate()
+            process.wait()
+    report("served", "CPU us/req", *results)
+
+
+async def main_() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--skip-served", action="store_true")
+    parser.add_argument("--served-rounds", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per served round and app")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    await check_mounts()
+    print(f"{'mode':>11} {'unit':>11} {'plain':>9} {'metrics':>9} {'added':>9} {'overhead':>9}")
+    await in_process(args)
+    if not args.skip_served:
+        await served(args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main_())
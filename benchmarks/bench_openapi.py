@@ -0,0 +1,52 @@
+"""
+Report: startup cost of every mainN app and of generating its OpenAPI schema.
+
+For each main*.py in the repository root: how long importing it takes (building the app and
+its routes) and what `OpenAPICache.build()` measures: generating the schema from scratch,
+serializing it, gzipping it, and the resulting sizes. Without `cache_openapi`, generate +
+serialize is what the first /openapi.json request waits for; with it ("cached" = yes), that
+cost moves to startup and every request gets the prebuilt bytes.
+
+Run from the repository root:
+    python -m benchmarks.bench_openapi
+"""
+
+import argparse
+import importlib
+import pathlib
+import re
+import time
+
+from openapi_cache import OpenAPICache
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+
+def app_modules() -> list[str]:
+    names = [path.stem for path in ROOT.glob("main*.py")]
+    # main, main2, ..., main18 in numeric order
+    return sorted(names, key=lambda name: [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    print(f"{'app':>7} {'cached':>6} {'routes':>6} {'import ms':>9} {'generate ms':>11} {'serialize ms':>12} "
+          f"{'gzip ms':>7} {'bytes':>7} {'gzipped':>7}")
+    for name in app_modules():
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        import_ms = (time.perf_counter() - start) * 1e3
+        routes = sum(1 for route in module.app.routes if getattr(route, "include_in_schema", False))
+        cached = isinstance(getattr(module, "openapi", None), OpenAPICache)
+
+        cache = OpenAPICache(module.app)
+        cache.build()
+        t = cache.timings
+        print(f"{name:>7} {'yes' if cached else 'no':>6} {routes:6d} {import_ms:9.1f} {t['generate_ms']:11.2f} "
+              f"{t['serialize_ms']:12.2f} {t['gzip_ms']:7.2f} {t['bytes']:7d} {t['gzip_bytes']:7d}")
+
+
+if __name__ == "__main__":
+    main()
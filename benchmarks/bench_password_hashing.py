@@ -0,0 +1,109 @@
+"""
+Benchmark: latency of an unrelated endpoint (main14's GET /items/) during a burst of
+POST /users/register, with the password KDF run
+
+    event loop  - hash_password called directly in the route
+    threadpool  - anyio.to_thread.run_sync(hash_password), the shared threadpool
+    process     - PasswordHasher, the bounded process pool main14 uses
+
+While the burst runs, a probe sends GET /items/ every 5 ms and times each request from when it
+was due, so time spent waiting for a blocked event loop counts. The table shows its
+p50/p99/max latency and how many signups were accepted or rejected with 503.
+
+Run from the repository root:
+    python -m benchmarks.bench_password_hashing
+"""
+
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+
+import httpx
+from anyio import to_thread
+
+import main14
+from password_hashing import PasswordHasher, hash_password
+
+
+class EventLoopHasher:
+    async def hash(self, password: str) -> str:
+        return hash_password(password)
+
+
+class ThreadpoolHasher:
+    async def hash(self, password: str) -> str:
+        return await to_thread.run_sync(hash_password, password)
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run(hasher, signups: int, interval: float) -> tuple[list[float], int, int]:
+    main14.password_hasher = hasher
+    main14.users_db.clear()
+    transport = httpx.ASGITransport(app=main14.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        await client.get("/items/")
+        burst_done = asyncio.Event()
+        latencies: list[float] = []
+
+        async def timed_get(scheduled: float):
+            response = await client.get("/items/")
+            latencies.append(time.perf_counter() - scheduled)
+            assert response.status_code == 200
+
+        async def probe():
+            # Fixed rate, timed from when each request was due: a blocked event loop shows
+            # up as latency instead of as fewer probes
+            probes = []
+            start = time.perf_counter()
+            for k in itertools.count():
+                if burst_done.is_set():
+                    break
+                scheduled = start + k * interval
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                probes.append(asyncio.create_task(timed_get(scheduled)))
+            await asyncio.gather(*probes)
+
+        async def signup(i: int) -> int:
+            body = {"username": f"user{i}", "password": "correct horse battery staple", "email": f"u{i}@example.com"}
+            return (await client.post("/users/register", json=body)).status_code
+
+        async def burst():
+            try:
+                return await asyncio.gather(*(signup(i) for i in range(signups)))
+            finally:
+                burst_done.set()
+
+        statuses, _ = await asyncio.gather(burst(), probe())
+    return latencies, statuses.count(201), statuses.count(503)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--signups", type=int, default=60)
+    parser.add_argument("--interval", type=float, default=0.005, help="seconds between probe requests")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: PASSWORD_HASH_WORKERS)")
+    parser.add_argument("--queue", type=int, default=None, help="process pool queue (default: PASSWORD_HASH_QUEUE)")
+    args = parser.parse_args()
+
+    pool = PasswordHasher(**{k: v for k, v in (("workers", args.workers), ("max_queue", args.queue)) if v})
+    await pool.warm_up()
+    print(f"{args.signups} concurrent signups; process pool: {pool.workers} workers, queue {pool.max_queue}\n")
+    print(f"{'KDF runs in':>12} {'probes':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'201':>5} {'503':>5}")
+    try:
+        for name, hasher in (("event loop", EventLoopHasher()), ("threadpool", ThreadpoolHasher()), ("process", pool)):
+            latencies, accepted, rejected = await run(hasher, args.signups, args.interval)
+            print(f"{name:>12} {len(latencies):7d} {statistics.median(latencies) * 1e3:8.2f} "
+                  f"{percentile(latencies, 0.99) * 1e3:8.2f} {max(latencies) * 1e3:8.2f} {accepted:5d} {rejected:5d}")
+        print(f"\nprocess pool metrics: {pool.metrics()}")
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""
+Benchmark: what profiling.py costs main.py's hello world route (GET /), idle and running.
+
+    plain              - no profiler installed
+    idle               - `install_profiler` (its route comes after GET /), nothing running
+    sample 10ms ...    - a StackSampler thread sampling every thread's stack at that interval
+    cprofile           - a RouteProfile on GET / (cProfile on while a request is in flight)
+
+Requests are made by calling the app directly as an ASGI app, as in bench_metrics, so the
+profiler's share is as large as it can get. Each configuration's batches alternate with
+batches of the plain app and the overhead is the median of the paired ratios. For the
+samplers, "sampler CPU" is the sampling thread's own CPU time per sample.
+
+Run from the repository root:
+    python -m benchmarks.bench_profiler
+"""
+
+import argparse
+import asyncio
+import statistics
+import threading
+
+from fastapi import FastAPI
+
+import main
+from benchmarks.bench_metrics import per_call_us
+from profiling import RouteProfile, StackSampler, find_route, install_profiler
+
+
+def hello_app(profiler: bool) -> FastAPI:
+    app = FastAPI()
+    app.get("/")(main.root)
+    if profiler:
+        install_profiler(app, token="bench")
+    return app
+
+
+async def paired(plain: FastAPI, app: FastAPI, args: argparse.Namespace) -> tuple[float, float]:
+    plain_us, app_us = [], []
+    for _ in range(args.rounds):
+        plain_us.append(await per_call_us(plain, args.batch))
+        app_us.append(await per_call_us(app, args.batch))
+    return statistics.median(app_us), statistics.median(a / p for p, a in zip(plain_us, app_us)) - 1
+
+
+async def main_() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--intervals", type=float, nargs="+", default=[0.01, 0.005, 0.001], help="seconds")
+    args = parser.parse_args()
+
+    plain, app = hello_app(False), hello_app(True)
+    for warm in (plain, app):
+        await per_call_us(warm, 1_000)
+    print(f"{'profiler':>14} {'us/request':>11} {'overhead':>9} {'samples':>8} {'sampler CPU':>12}")
+    us, _ = await paired(plain, plain, args)
+    print(f"{'plain':>14} {us:11.2f}")
+    us, overhead = await paired(plain, app, args)
+    print(f"{'idle':>14} {us:11.2f} {overhead:+9.1%}")
+
+    for interval in args.intervals:
+        sampler = StackSampler(interval)
+        thread = threading.Thread(target=sampler.run, args=(3600,), daemon=True)
+        thread.start()
+        try:
+            us, overhead = await paired(plain, app, args)
+        finally:
+            sampler.stop()
+            thread.join()
+        per_sample = sampler.cpu_seconds / max(sampler.samples, 1) * 1e6
+        print(f"{f'sample {interval * 1e3:g}ms':>14} {us:11.2f} {overhead:+9.1%} {sampler.samples:8d} "
+              f"{per_sample:9.0f} us")
+
+    profile = RouteProfile(find_route(app.router.routes, "/", "GET"))
+    try:
+        us, overhead = await paired(plain, app, args)
+    finally:
+        profile.close()
+    print(f"{'cprofile':>14} {us:11.2f} {overhead:+9.1%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main_())
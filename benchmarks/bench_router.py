@@ -0,0 +1,88 @@
+"""
+Benchmark: finding the route for a request with Starlette's linear scan and with
+radix_router.py's trie, for apps with 10, 100 and 1000 routes.
+
+The routes come in groups of four shapes (a static path, an {int} parameter, a {str}
+parameter in the middle, a {path} catch-all), each group under its own prefix. The
+request path matches the first, the middle or the last route, since the linear scan
+pays for every route declared before the match. Only the lookup is timed (the
+`matches` loop of Starlette's Router against `RadixRouter._resolve`); the endpoints
+never run. The last column is how long compiling the trie, conflict checks included,
+takes at startup.
+
+Run from the repository root:
+    python -m benchmarks.bench_router
+"""
+
+import argparse
+import time
+
+from starlette.responses import PlainTextResponse
+from starlette.routing import Match, Route, Router
+
+from radix_router import RadixRouter
+
+
+def endpoint(request):
+    return PlainTextResponse("")
+
+
+def build(n: int) -> tuple[Router, list[str]]:
+    routes, paths = [], []
+    for i in range(n):
+        group, shape = divmod(i, 4)
+        template, path = (
+            (f"/g{group}/items", f"/g{group}/items"),
+            (f"/g{group}/items/{{item_id:int}}", f"/g{group}/items/42"),
+            (f"/g{group}/users/{{name}}/orders", f"/g{group}/users/alice/orders"),
+            (f"/g{group}/files/{{file_path:path}}", f"/g{group}/files/docs/2024/report.pdf"),
+        )[shape]
+        routes.append(Route(template, endpoint))
+        paths.append(path)
+    return Router(routes=routes), paths
+
+
+def scope_for(path: str) -> dict:
+    return {"type": "http", "method": "GET", "path": path, "root_path": "", "headers": []}
+
+
+def linear(router: Router, scope: dict):
+    for route in router.routes:
+        match, child_scope = route.matches(scope)
+        if match is Match.FULL:
+            return route, child_scope
+    return None
+
+
+def per_call_us(lookup, router, scope: dict, n: int) -> float:
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(n):
+            lookup(router, scope)
+        best = min(best, (time.perf_counter() - start) / n)
+    return best * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=5_000)
+    args = parser.parse_args()
+
+    print(f"{'routes':>6} {'match':>6} {'linear us':>10} {'trie us':>8} {'speedup':>8} {'compile ms':>11}")
+    for n in (10, 100, 1000):
+        router, paths = build(n)
+        radix = RadixRouter(router)
+        start = time.perf_counter()
+        radix.compile()
+        compile_ms = (time.perf_counter() - start) * 1e3
+        for label, index in (("first", 0), ("middle", n // 2 - 1), ("last", n - 1)):
+            scope = scope_for(paths[index])
+            assert linear(router, scope)[0] is radix._resolve(scope)[1] is router.routes[index]
+            linear_us = per_call_us(linear, router, scope, args.number)
+            trie_us = per_call_us(lambda _, scope: radix._resolve(scope), router, scope, args.number)
+            print(f"{n:6d} {label:>6} {linear_us:10.2f} {trie_us:8.2f} {linear_us / trie_us:7.1f}x {compile_ms:11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+"""
+Benchmark: every route of every mainN app, with a JSON baseline to compare against.
+
+Routes are discovered from each app's OpenAPI schema, and a request is built for each one
+from what the schema declares: `example`/`examples` where the models or parameters have
+them (request body examples, `openapi_examples` included), otherwise a value synthesized
+from the type and constraints (enum members, minimum/maximum, minLength, date-time and
+email formats, ...). Required query, header and cookie parameters are filled in;
+multipart bodies get a small file for each binary field.
+
+Each app's lifespan runs first, so the example data its startup handlers seed is there.
+Each route then gets `--warmup` untimed requests and `--requests` timed ones, sent by
+`--concurrency` tasks through httpx.ASGITransport. The client's own cost is part of every
+number, so compare numbers from this script with each other, not with a real server.
+
+    req/s            - completed requests per second
+    p50/p95/p99 ms   - per-request latency
+    peak KiB         - median of tracemalloc's peak during one request (a separate,
+                       sequential pass, so tracing doesn't slow the timed one)
+    retained B       - traced memory still held afterwards, per request (leaks, caches)
+    status           - the most common status code; routes answering anything but 2xx
+                       are still measured, but check that's the path you meant to time
+
+--output writes the results as JSON. --compare BASELINE runs the same routes and marks
+every route whose req/s dropped or whose p95 grew by more than --threshold (10% by
+default); the exit status is 1 if any did.
+
+Run from the repository root:
+    python -m benchmarks.bench_routes --output baseline.json
+    python -m benchmarks.bench_routes --compare baseline.json
+    python -m benchmarks.bench_routes --apps main17 main18 --routes "items"
+"""
+
+import argparse
+import asyncio
+import collections
+import datetime
+import importlib
+import json
+import platform
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Any
+
+import fastapi
+import httpx
+
+from gateway import app_modules
+
+MISSING = object()
+
+
+@dataclass
+class RouteCall:
+    app: str
+    method: str
+    path: str  # the route's template, e.g. /items/{item_id}
+    url: str
+    params: dict[str, Any] = field(default_factory=dict)
+    headers: dict[str, str] = field(default_factory=dict)
+    cookies: dict[str, str] = field(default_factory=dict)
+    json: Any = MISSING
+    data: dict[str, Any] | None = None
+    files: dict[str, tuple[str, bytes, str]] | None = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.app} {self.method} {self.path}"
+
+    def request(self, client: httpx.AsyncClient):
+        headers = dict(self.headers)
+        if self.cookies:
+            headers["cookie"] = "; ".join(f"{name}={value}" for name, value in self.cookies.items())
+        kwargs: dict[str, Any] = {"params": self.params, "headers": headers}
+        if self.json is not MISSING:
+            kwargs["json"] = self.json
+        if self.data is not None:
+            kwargs["data"] = self.data
+        if self.files is not None:
+            kwargs["files"] = self.files
+        return client.request(self.method, self.url, **kwargs)
+
+
+# Building requests from the schema
+
+class Sampler:
+    def __init__(self, schema: dict):
+        self.components = schema.get("components", {}).get("schemas", {})
+
+    def resolve(self, schema: dict) -> dict:
+        while "$ref" in schema:
+            schema = self.components[schema["$ref"].rsplit("/", 1)[1]]
+        return schema
+
+    def sample(self, schema: dict, depth: int = 0) -> Any:
+        """A value that should validate against `schema`, preferring declared examples."""
+        if "example" in schema:
+            return schema["example"]
+        if schema.get("examples"):
+            return schema["examples"][0]
+        schema = self.resolve(schema)
+        for key in ("example", "const"):
+            if key in schema:
+                return schema[key]
+        if schema.get("examples"):
+            return schema["examples"][0]
+        if schema.get("enum"):
+            return schema["enum"][0]
+        if schema.get("default") is not None:
+            return schema["default"]
+        for key in ("anyOf", "oneOf"):
+            if key in schema:
+                options = [option for option in schema[key] if self.resolve(option).get("type") != "null"]
+                return self.sample(options[0], depth) if options else None
+        if "allOf" in schema:
+            return self.sample(schema["allOf"][0], depth)
+        kind = schema.get("type")
+        if kind == "object" or "properties" in schema:
+            return self.sample_object(schema, depth)
+        if kind == "array":
+            count = max(schema.get("minItems", 1), 1)
+            return [] if depth > 5 else [self.sample(schema.get("items", {}), depth + 1) for _ in range(count)]
+        if kind == "integer":
+            return int(self.number(schema, 1))
+        if kind == "number":
+            return float(self.number(schema, 1.5))
+        if kind == "boolean":
+            return True
+        if kind == "string":
+            return self.string(schema)
+        return "string"
+
+    def sample_object(self, schema: dict, depth: int) -> dict:
+        if depth > 5:
+            return {}
+        required = set(schema.get("required", ()))
+        value = {}
+        for name, prop in schema.get("properties", {}).items():
+            resolved = self.resolve(prop)
+            declared = any(key in prop or key in resolved for key in ("example", "examples"))
+            if name in required or declared:
+                value[name] = self.sample(prop, depth + 1)
+        additional = schema.get("additionalProperties")
+        if not value and isinstance(additional, dict):
+            value["key"] = self.sample(additional, depth + 1)
+        return value
+
+    @staticmethod
+    def number(schema: dict, preferred: float) -> float:
+        low = schema.get("minimum", schema.get("exclusiveMinimum"))
+        high = schema.get("maximum", schema.get("exclusiveMaximum"))
+        value = preferred
+        if low is not None and value <= low:
+            value = low + 1
+        if high is not None and value >= high:
+            value = high - 1 if "exclusiveMaximum" in schema else high
+        return value
+
+    @staticmethod
+    def string(schema: dict) -> str:
+        value = {
+            "date-time": "2025-01-01T12:00:00",
+            "date": "2025-01-01",
+            "time": "12:00:00",
+            "email": "user@example.com",
+            "uuid": "3fa85f64-5717-4562-b3fc-2c963f66afa6",
+            "uri": "https://example.com/",
+            "binary": "file contents",
+        }.get(schema.get("format"), "string")
+        if len(value) < schema.get("minLength", 0):
+            value = value + "x" * (schema["minLength"] - len(value))
+        if "maxLength" in schema:
+            value = value[: schema["maxLength"]]
+        return value
+
+
+def parameter_value(sampler: Sampler, parameter: dict) -> Any:
+    if "example" in parameter:
+        return parameter["example"]
+    if parameter.get("examples"):
+        return next(iter(parameter["examples"].values()))["value"]
+    return sampler.sample(parameter.get("schema", {}))
+
+
+def as_text(value: Any) -> str:
+    """How a sampled value is written in a path, query string, header or form field."""
+    if isinstance(value, (dict, list, bool)):
+        return json.dumps(value)
+    return str(value)
+
+
+def build_calls(name: str, app: fastapi.FastAPI) -> list[RouteCall]:
+    schema = app.openapi()
+    sampler = Sampler(schema)
+    calls = []
+    for path, operations in schema.get("paths", {}).items():
+        for method, operation in operations.items():
+            call = RouteCall(name, method.upper(), path, path)
+            for parameter in operation.get("parameters", ()):
+                location = parameter["in"]
+                if location != "path" and not parameter.get("required"):
+                    continue
+                value = parameter_value(sampler, parameter)
+                if location == "path":
+                    call.url = call.url.replace("{" + parameter["name"] + "}", as_text(value))
+                elif location == "query":
+                    call.params[parameter["name"]] = [as_text(v) for v in value] if isinstance(value, list) else as_text(value)
+                elif location == "header":
+                    header = parameter["name"].replace("_", "-")
+                    call.headers[header] = "bench" if header == "host" else as_text(value)
+                elif location == "cookie":
+                    call.cookies[parameter["name"]] = as_text(value)
+            body = operation.get("requestBody")
+            if body is not None:
+                add_body(sampler, call, body)
+            calls.append(call)
+    return calls
+
+
+def add_body(sampler: Sampler, call: RouteCall, body: dict) -> None:
+    media_type, content = next(iter(body["content"].items()))
+    if content.get("examples"):
+        value = next(iter(content["examples"].values()))["value"]
+    elif "example" in content:
+        value = content["example"]
+    else:
+        value = sampler.sample(content.get("schema", {}))
+    if media_type == "application/json":
+        call.json = value
+        return
+    schema = sampler.resolve(content.get("schema", {}))
+    call.data, files = {}, {}
+    for name, field_value in (value or {}).items():
+        prop = sampler.resolve(schema.get("properties", {}).get(name, {}))
+        items = sampler.resolve(prop.get("items", {})) if prop.get("type") == "array" else prop
+        if items.get("format") == "binary" or prop.get("contentMediaType"):
+            files[name] = (f"{name}.txt", b"benchmark upload\n" * 64, "text/plain")
+        else:
+            call.data[name] = as_text(field_value)
+    call.files = files or None
+
+
+# Measuring
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def timed_run(client: httpx.AsyncClient, call: RouteCall, n: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    statuses: collections.Counter = collections.Counter()
+    remaining = n
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            response = await call.request(client)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": n,
+        "req_per_s": n / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1e3,
+        "p95_ms": percentile(latencies, 0.95) * 1e3,
+        "p99_ms": percentile(latencies, 0.99) * 1e3,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+async def allocation_run(client: httpx.AsyncClient, call: RouteCall, n: int) -> dict:
+    peaks = []
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        for _ in range(n):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            await call.request(client)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    return {"peak_kib": statistics.median(peaks) / 1024, "retained_bytes": retained / n}
+
+
+async def bench_app(name: str, args: argparse.Namespace, pattern: re.Pattern) -> dict[str, dict]:
+    app = importlib.import_module(name).app
+    calls = [call for call in build_calls(name, app) if pattern.search(call.key)]
+    results = {}
+    if not calls:
+        return results
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for call in calls:
+                for _ in range(args.warmup):
+                    await call.request(client)
+                result = await timed_run(client, call, args.requests, args.concurrency)
+                if args.alloc_requests:
+                    result.update(await allocation_run(client, call, args.alloc_requests))
+                results[call.key] = result
+                print_row(call.key, result)
+    return results
+
+
+def print_row(key: str, result: dict) -> None:
+    status = max(result["statuses"].items(), key=lambda item: item[1])[0]
+    allocations = (f"{result['peak_kib']:9.1f} {result['retained_bytes']:10.0f}"
+                   if "peak_kib" in result else f"{'-':>9} {'-':>10}")
+    print(f"{key:<48} {status:>6} {result['req_per_s']:8.0f} {result['p50_ms']:7.2f} {result['p95_ms']:7.2f} "
+          f"{result['p99_ms']:7.2f} {allocations}")
+
+
+def compare(baseline: dict, current: dict, threshold: float, apps: list[str], pattern: re.Pattern) -> list[str]:
+    """Keys of the routes that got slower by more than `threshold`, after printing a table."""
+    regressions = []
+    print(f"\n{'route':<48} {'req/s':>8} {'before':>8} {'change':>7} {'p95 ms':>7} {'before':>7} {'change':>7}")
+    for key, result in current.items():
+        before = baseline.get(key)
+        if before is None:
+            print(f"{key:<48} {result['req_per_s']:8.0f} {'new':>8}")
+            continue
+        throughput = result["req_per_s"] / before["req_per_s"] - 1
+        latency = result["p95_ms"] / before["p95_ms"] - 1
+        regressed = throughput < -threshold or latency > threshold
+        if regressed:
+            regressions.append(key)
+        print(f"{key:<48} {result['req_per_s']:8.0f} {before['req_per_s']:8.0f} {throughput:+7.1%} "
+              f"{result['p95_ms']:7.2f} {before['p95_ms']:7.2f} {latency:+7.1%}{'  REGRESSION' if regressed else ''}")
+    for key in sorted(baseline.keys() - current.keys()):
+        if key.split()[0] in apps and pattern.search(key):
+            print(f"{key:<48} {'gone':>8}")
+    return regressions
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apps", nargs="*", default=None, help="modules to benchmark (default: every main*.py)")
+    parser.add_argument("--routes", default="", help="only routes whose 'app METHOD path' matches this regex")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--alloc-requests", type=int, default=20, help="requests for the tracemalloc pass (0 to skip)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    pattern = re.compile(args.routes)
+    print(f"{'route':<48} {'status':>6} {'req/s':>8} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} "
+          f"{'peak KiB':>9} {'retained B':>10}")
+    results: dict[str, dict] = {}
+    apps = args.apps or app_modules()
+    for name in apps:
+        results.update(await bench_app(name, args, pattern))
+
+    if args.output:
+        document = {
+            "meta": {
+                "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "fastapi": fastapi.__version__,
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+            },
+            "routes": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(document, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline["routes"], results, args.threshold, apps, pattern)
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
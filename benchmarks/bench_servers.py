@@ -0,0 +1,141 @@
+"""
+Load test: one app under uvicorn in every (event loop x HTTP parser x workers) setup.
+
+For each configuration the app is started with
+
+    uvicorn <app> --loop {asyncio,uvloop} --http {h11,httptools} --workers N
+
+on a free local port and driven for `--duration` seconds by `--concurrency` tasks sharing
+one keep-alive httpx.AsyncClient pool (at most `--concurrency` connections, all reused),
+cycling through `--path` values. The table reports:
+
+    req/s          - successful responses per second
+    p50/p99 ms     - latency seen by the client
+    CPU us/req     - user + system CPU time of the server's processes (workers included)
+                     during the run, per request
+    errors         - non-2xx responses and transport errors
+
+The client runs in this process on the same machine, so it competes with the server for
+CPU, and httpx's own cost per request grows with the size of its pool. Compare the rows
+with each other, not with numbers from a separate load generator; "CPU us/req" is the
+column that depends least on the client.
+Reads /proc for CPU time, so Linux only.
+
+Run from the repository root:
+    python -m benchmarks.bench_servers --app main17 --path /items/1 /items/
+    python -m benchmarks.bench_servers --app main --workers 1 2
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import pathlib
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.bench_gateway import free_port, process_tree, wait_ready
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def launch(app: str, port: int, loop: str, http: str, workers: int) -> subprocess.Popen:
+    command = [
+        sys.executable, "-m", "uvicorn", app, "--port", str(port), "--loop", loop, "--http", http,
+        "--workers", str(workers), "--no-access-log", "--log-level", "warning",
+    ]
+    return subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def cpu_seconds(pid: int) -> float:
+    """User + system CPU time of `pid` and its descendants."""
+    total = 0
+    for child in process_tree([pid]):
+        try:
+            fields = pathlib.Path(f"/proc/{child}/stat").read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        total += int(fields[11]) + int(fields[12])
+    return total / CLOCK_TICKS
+
+
+async def drive(base_url: str, paths: list[str], concurrency: int, duration: float) -> tuple[list[float], int]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies: list[float] = []
+    errors = 0
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker(offset: int) -> None:
+            nonlocal errors
+            for path in itertools.islice(itertools.cycle(paths), offset, None):
+                if time.perf_counter() >= deadline:
+                    return
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                except httpx.TransportError:
+                    errors += 1
+                    continue
+                if response.is_success:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return latencies, errors
+
+
+async def run(args: argparse.Namespace, loop: str, http: str, workers: int) -> None:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = launch(args.app, port, loop, http, workers)
+    try:
+        await asyncio.to_thread(wait_ready, base_url + args.path[0], time.monotonic() + args.timeout)
+        await drive(base_url, args.path, args.concurrency, args.warmup)
+        cpu_before = cpu_seconds(server.pid)
+        start = time.perf_counter()
+        latencies, errors = await drive(base_url, args.path, args.concurrency, args.duration)
+        elapsed = time.perf_counter() - start
+        cpu = cpu_seconds(server.pid) - cpu_before
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    n = len(latencies)
+    p50 = latencies[n // 2] * 1e3 if n else float("nan")
+    p99 = latencies[min(n - 1, int(n * 0.99))] * 1e3 if n else float("nan")
+    cpu_us = cpu / n * 1e6 if n else float("nan")
+    print(f"{loop:>8} {http:>10} {workers:7d} {n / elapsed:8.0f} {p50:7.2f} {p99:7.2f} {cpu_us:11.0f} {errors:6d}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="main", help="module (or module:attribute) to serve")
+    parser.add_argument("--path", nargs="+", default=["/"], help="GET paths to request, in turn")
+    parser.add_argument("--loop", nargs="+", default=["asyncio", "uvloop"])
+    parser.add_argument("--http", nargs="+", default=["h11", "httptools"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for the server to start")
+    args = parser.parse_args()
+    if ":" not in args.app:
+        args.app += ":app"
+
+    print(f"{args.app}, {args.concurrency} connections, {args.duration:g} s per configuration, "
+          f"{os.cpu_count()} CPU(s)")
+    print(f"{'loop':>8} {'http':>10} {'workers':>7} {'req/s':>8} {'p50 ms':>7} {'p99 ms':>7} {'CPU us/req':>11} "
+          f"{'errors':>6}")
+    for loop, http, workers in itertools.product(args.loop, args.http, args.workers):
+        await run(args, loop, http, workers)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
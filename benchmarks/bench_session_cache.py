@@ -0,0 +1,92 @@
+"""
+Benchmark: resolving session ids straight from the SQLite session store vs through
+SessionCache.
+
+Each run resolves `--lookups` ids drawn from a skewed (Zipf-like) distribution over
+`--sessions` stored sessions plus a few unknown ids, 100 at a time concurrently, and
+reports lookups per second, store queries and the cache's counters. It first checks that a
+load still in flight when its id is invalidated doesn't put the stale session back.
+
+Run from the repository root:
+    python -m benchmarks.bench_session_cache
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from session_cache import SessionCache
+from sqlite_store import SQLiteDocumentStore, SQLitePool
+
+
+async def resolve_all(get, ids: list[str], concurrency: int = 100) -> float:
+    start = time.perf_counter()
+    for i in range(0, len(ids), concurrency):
+        await asyncio.gather(*(get(session_id) for session_id in ids[i:i + concurrency]))
+    return len(ids) / (time.perf_counter() - start)
+
+
+async def check_invalidate_during_load() -> None:
+    """invalidate() while a load is in flight: the load's result isn't cached."""
+    store = {"s": "old"}
+    loading, release = asyncio.Event(), asyncio.Event()
+
+    async def slow_get(session_id: str):
+        value = store.get(session_id)
+        loading.set()
+        await release.wait()
+        return value
+
+    cache = SessionCache(slow_get)
+    stale = asyncio.ensure_future(cache.get("s"))
+    await loading.wait()
+    store["s"] = "new"
+    cache.invalidate("s")
+    release.set()
+    assert await stale == "old"
+    assert await cache.get("s") == "new"
+    assert cache.stats()["misses"] == 2
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--cache-size", type=int, default=2_000)
+    args = parser.parse_args()
+
+    await check_invalidate_during_load()
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = SQLitePool(os.path.join(tmp, "sessions.db"))
+        store = SQLiteDocumentStore(pool, "sessions")
+        await store.put_many({f"s{i}": {"username": f"user{i}"} for i in range(args.sessions)})
+
+        rng = random.Random(0)
+        weights = [1 / (rank + 1) for rank in range(args.sessions)]
+        ids = rng.choices([f"s{i}" for i in range(args.sessions)], weights, k=args.lookups)
+        ids = [f"unknown{rng.randrange(50)}" if rng.random() < 0.02 else session_id for session_id in ids]
+
+        queries = 0
+
+        async def counted_get(session_id: str):
+            nonlocal queries
+            queries += 1
+            return await store.get(session_id)
+
+        print(f"{'resolver':>14} {'lookups/s':>10} {'store queries':>14}")
+        rate = await resolve_all(counted_get, ids)
+        print(f"{'SQLite store':>14} {rate:10.0f} {queries:14d}")
+
+        queries = 0
+        cache = SessionCache(counted_get, maxsize=args.cache_size)
+        rate = await resolve_all(cache.get, ids)
+        print(f"{'SessionCache':>14} {rate:10.0f} {queries:14d}")
+        print(f"\ncache stats: {cache.stats()}")
+        pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
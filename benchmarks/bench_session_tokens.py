@@ -0,0 +1,92 @@
+"""
+Benchmark: checking a session on every request with main15's signed tokens vs a
+dict-backed session store (random session id -> (username, expiry)).
+
+The first table times one check: a dict lookup, a token verify answered from the cache,
+and a full verify (decode + HMAC-SHA256 + JSON) with the cache disabled. The second drives
+GET /me/ through httpx.ASGITransport with each check as the `Depends` dependency.
+
+The dict is the fastest single check, but it only works while every request reaches the
+process that holds it; the token needs no shared state at all.
+
+Run from the repository root:
+    python -m benchmarks.bench_session_tokens
+"""
+
+import argparse
+import asyncio
+import secrets
+import time
+import timeit
+from typing import Annotated
+
+import httpx
+from fastapi import Depends, FastAPI, Header, HTTPException
+
+import main15
+from session_tokens import TokenSigner
+
+sessions: dict[str, tuple[str, float]] = {}
+
+
+async def dict_session(authorization: Annotated[str | None, Header()] = None) -> str:
+    session = sessions.get((authorization or "").removeprefix("Bearer "))
+    if session is None or session[1] <= time.time():
+        raise HTTPException(status_code=401)
+    return session[0]
+
+
+dict_app = FastAPI()
+
+
+@dict_app.get("/me/")
+async def read_me(username: Annotated[str, Depends(dict_session)]):
+    return {"username": username}
+
+
+def per_call_us(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+async def requests_per_second(app, token: str, n: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        assert (await client.get("/me/")).status_code == 200
+        start = time.perf_counter()
+        for _ in range(n):
+            await client.get("/me/")
+    return n / (time.perf_counter() - start)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--sessions", type=int, default=10_000, help="live sessions in the dict store")
+    args = parser.parse_args()
+
+    for i in range(args.sessions):
+        sessions[secrets.token_urlsafe(32)] = (f"user{i}", time.time() + 3600)
+    session_id = next(iter(sessions))
+    cached = TokenSigner({"1": secrets.token_bytes(32)})
+    uncached = TokenSigner({"1": secrets.token_bytes(32)}, cache_size=0)
+    token, raw_token = cached.issue("user0"), uncached.issue("user0")
+
+    def dict_lookup():
+        session = sessions.get(session_id)
+        return session is not None and session[1] > time.time()
+
+    print(f"{'check':>22} {'us/call':>9}")
+    for name, fn in (("dict store", dict_lookup), ("token (cached)", lambda: cached.verify(token)),
+                     ("token (full verify)", lambda: uncached.verify(raw_token))):
+        print(f"{name:>22} {per_call_us(fn, args.number):9.3f}")
+
+    main_token = main15.token_signer.issue("user0")
+    print(f"\n{'GET /me/ with':>22} {'req/s':>9}")
+    for name, app, bearer in (("dict store", dict_app, session_id), ("token", main15.app, main_token)):
+        print(f"{name:>22} {await requests_per_second(app, bearer, args.requests):9.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""
+Benchmark: throughput of main17's POST /items/ and GET /items/{item_id} on the memory and
+SQLite storage backends.
+
+Requests go through httpx.ASGITransport (no sockets), `--concurrency` at a time, so the
+numbers show what the storage layer and the threadpool offload cost per request.
+
+Run from the repository root:
+    python -m benchmarks.bench_storage_backends
+    python -m benchmarks.bench_storage_backends --requests 5000 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+
+import main17
+from sqlite_store import SQLitePool, SQLiteItemStore
+from storage import open_item_backend
+
+
+async def drive(client: httpx.AsyncClient, requests: list, concurrency: int) -> float:
+    queue = list(reversed(requests))
+
+    async def worker():
+        while queue:
+            method, url, body = queue.pop()
+            response = await client.request(method, url, json=body)
+            assert response.status_code < 400, response.text
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return len(requests) / (time.perf_counter() - start)
+
+
+async def run_backend(name: str, backend, n: int, concurrency: int) -> None:
+    main17.items_db = backend
+    transport = httpx.ASGITransport(app=main17.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        first_id = 1_000
+        posts = [
+            ("POST", "/items/", {"id": first_id + i, "name": f"item-{i}", "price": float(i), "tax": 1.0})
+            for i in range(n)
+        ]
+        gets = [("GET", f"/items/{first_id + i}", None) for i in range(n)]
+        post_rps = await drive(client, posts, concurrency)
+        get_rps = await drive(client, gets, concurrency)
+    print(f"{name:>8} {post_rps:14.0f} {get_rps:14.0f}")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--pool-size", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'backend':>8} {'POST req/s':>14} {'GET req/s':>14}")
+    await run_backend("memory", open_item_backend(main17.Item, backend="memory"), args.requests, args.concurrency)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = SQLitePool(os.path.join(tmp, "bench.db"), size=args.pool_size)
+        try:
+            store = SQLiteItemStore(pool, main17.Item, table="main17_items")
+            await run_backend("sqlite", store, args.requests, args.concurrency)
+        finally:
+            pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,80 @@
+"""
+Benchmark: peak memory and time-to-first-byte of main17's GET /items/ as a buffered JSON
+list vs a streamed NDJSON response.
+
+The app is called directly through ASGI with a `send` that only counts bytes, so the
+measured peak is what the server allocates, not what a client buffers. Peak memory of
+the buffered response grows with the number of items; the streamed one stays flat
+(on top of the items themselves, which are allocated before measuring).
+
+Run from the repository root:
+    python -m benchmarks.bench_streaming
+    python -m benchmarks.bench_streaming --sizes 1000 10000
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+import main17
+from storage import open_item_backend
+
+
+async def call(app, query_string: bytes, accept: bytes) -> tuple[int, float, float]:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/items/", "raw_path": b"/items/", "root_path": "",
+        "query_string": query_string, "headers": [(b"host", b"bench"), (b"accept", accept)],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    received = 0
+    first_byte = None
+    start = time.perf_counter()
+
+    request_sent = False
+    done = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal received, first_byte
+        if message["type"] == "http.response.body":
+            if message.get("body"):
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+                received += len(message["body"])
+            if not message.get("more_body", False):
+                done.set()
+
+    await app(scope, receive, send)
+    return received, first_byte or 0.0, time.perf_counter() - start
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'items':>8} {'mode':>9} {'bytes':>12} {'peak KiB':>10} {'TTFB ms':>9} {'total ms':>9}")
+    for size in args.sizes:
+        main17.items_db = open_item_backend(main17.Item, backend="memory")
+        await main17.items_db.extend(
+            main17.Item(id=i, name=f"item-{i}", description="x" * 40, price=float(i), tax=1.0) for i in range(size)
+        )
+        for mode, query, accept in [("buffered", b"", b"application/json"), ("ndjson", b"stream=true", b"*/*")]:
+            tracemalloc.start()
+            received, ttfb, total = await call(main17.app, query, accept)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{size:>8} {mode:>9} {received:>12} {peak / 1024:10.0f} {ttfb * 1e3:9.1f} {total * 1e3:9.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
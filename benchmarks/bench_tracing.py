@@ -0,0 +1,104 @@
+"""
+Benchmark: per-request cost of tracing.py's TracingMiddleware.
+
+The first table wraps a do-nothing ASGI app and calls it directly, so only the middleware
+is measured:
+
+    no middleware          - the bare app
+    unsampled              - no traceparent, sample rate 0 (the common case)
+    unsampled parent       - traceparent with the sampled flag off
+    sampled                - traceparent with the sampled flag on: ids, timestamps, a span
+
+The second table drives main13's GET /catalog/ through httpx.ASGITransport with sample
+rates 0, 1% and 100% (spans are drained, not written, so disk speed doesn't count).
+
+Run from the repository root:
+    python -m benchmarks.bench_tracing
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+import main13
+from tracing import Tracer, TracingMiddleware
+
+UNSAMPLED_PARENT = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-00"
+SAMPLED_PARENT = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+
+async def bare_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def scope_with(traceparent: str | None) -> dict:
+    headers = [(b"host", b"bench"), (b"accept", b"*/*"), (b"user-agent", b"bench"), (b"save-data", b"false")]
+    if traceparent is not None:
+        headers.append((b"traceparent", traceparent.encode()))
+    return {"type": "http", "method": "GET", "path": "/", "headers": headers}
+
+
+async def per_call_us(app, scope: dict, n: int, tracer: Tracer | None) -> float:
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(n):
+            await app(scope, receive, send)
+        best = min(best, (time.perf_counter() - start) / n)
+        if tracer is not None:
+            tracer.buffer.drain()
+    return best * 1e6
+
+
+async def requests_per_second(n: int) -> float:
+    transport = httpx.ASGITransport(app=main13.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers={"save-data": "false"}) as client:
+        await client.get("/catalog/")
+        start = time.perf_counter()
+        for _ in range(n):
+            await client.get("/catalog/")
+        elapsed = time.perf_counter() - start
+    main13.tracer.buffer.drain()
+    return n / elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=50_000)
+    parser.add_argument("--requests", type=int, default=2_000)
+    args = parser.parse_args()
+
+    tracer = Tracer(sample_rate=0.0)
+    traced = TracingMiddleware(bare_app, tracer)
+    cases = (
+        ("no middleware", bare_app, scope_with(None), None),
+        ("unsampled", traced, scope_with(None), tracer),
+        ("unsampled parent", traced, scope_with(UNSAMPLED_PARENT), tracer),
+        ("sampled", traced, scope_with(SAMPLED_PARENT), tracer),
+    )
+    print(f"{'middleware only':>18} {'us/request':>11} {'overhead us':>12}")
+    baseline = None
+    for name, app, scope, case_tracer in cases:
+        us = await per_call_us(app, scope, args.number, case_tracer)
+        baseline = us if baseline is None else baseline
+        print(f"{name:>18} {us:11.3f} {us - baseline:12.3f}")
+
+    print(f"\n{'main13 sample rate':>18} {'req/s':>11}")
+    for rate in (0.0, 0.01, 1.0):
+        main13.tracer.sample_rate = rate
+        print(f"{rate:>18.2f} {await requests_per_second(args.requests):11.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,117 @@
+"""
+Benchmark: peak RSS while uploading a large file to main16's
+POST /files/ (File() bytes), POST /uploadfile/ (UploadFile) and POST /files/stream.
+
+Each upload runs in a fresh child process that calls the app directly through ASGI with a
+synthetic body delivered in 64 KiB chunks, so ru_maxrss in the child is the peak for that
+upload alone. The streamed endpoint's peak should not change with the file size.
+
+Run from the repository root:
+    python -m benchmarks.bench_upload_memory
+    python -m benchmarks.bench_upload_memory --sizes-mb 64 512 2048 --skip-bytes-above 512
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+CHUNK = 64 * 1024
+BOUNDARY = b"benchboundary"
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def body_chunks(size: int, multipart: bool):
+    block = os.urandom(CHUNK)
+    if multipart:
+        yield (b"--" + BOUNDARY + b"\r\nContent-Disposition: form-data; name=\"file\"; filename=\"big.bin\"\r\n"
+               b"Content-Type: application/octet-stream\r\n\r\n")
+    sent = 0
+    while sent < size:
+        piece = block[: min(CHUNK, size - sent)]
+        sent += len(piece)
+        yield piece
+    if multipart:
+        yield b"\r\n--" + BOUNDARY + b"--\r\n"
+
+
+async def upload(path: str, size: int) -> dict:
+    import main16
+
+    multipart = path != "/files/stream"
+    content_type = b"multipart/form-data; boundary=" + BOUNDARY if multipart else b"application/octet-stream"
+    chunks = body_chunks(size, multipart)
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"content-type", content_type)],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    response = {}
+
+    async def receive():
+        chunk = next(chunks, None)
+        return {"type": "http.request", "body": chunk or b"", "more_body": chunk is not None}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["body"] = response.get("body", b"") + message.get("body", b"")
+
+    await main16.app(scope, receive, send)
+    return response
+
+
+def child(path: str, size: int) -> None:
+    import main16  # imported before the baseline so it isn't counted as upload memory
+
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    response = asyncio.run(upload(path, size))
+    elapsed = time.perf_counter() - start
+    assert response["status"] == 200, response
+    print(json.dumps({"baseline": baseline, "peak": peak_rss_mb(), "seconds": elapsed}))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[64, 256, 1024])
+    parser.add_argument("--skip-bytes-above", type=int, default=256,
+                        help="don't run the File() bytes endpoint above this many MB")
+    parser.add_argument("--child", nargs=2, metavar=("PATH", "BYTES"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], int(args.child[1]))
+        return
+
+    print(f"{'size MB':>8} {'endpoint':>14} {'peak RSS MB':>12} {'over baseline':>14} {'MB/s':>8}")
+    with tempfile.TemporaryDirectory() as upload_dir:
+        env = {**os.environ, "UPLOAD_DIR": upload_dir}
+        for size_mb in args.sizes_mb:
+            for path in ("/files/", "/uploadfile/", "/files/stream"):
+                if path == "/files/" and size_mb > args.skip_bytes_above:
+                    continue
+                out = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_upload_memory", "--child", path, str(size_mb * 1024**2)],
+                    env=env, capture_output=True, text=True, check=True,
+                )
+                result = json.loads(out.stdout.strip().splitlines()[-1])
+                print(f"{size_mb:>8} {path:>14} {result['peak']:12.0f} {result['peak'] - result['baseline']:14.0f} "
+                      f"{size_mb / result['seconds']:8.0f}")
+                for name in os.listdir(upload_dir):
+                    os.unlink(os.path.join(upload_dir, name))
+
+
+if __name__ == "__main__":
+    main()
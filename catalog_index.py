@@ -0,0 +1,161 @@
+"""
+Sorted and tag indexes for answering main7's FilterParams queries.
+
+main7's `/items/` accepts `order_by` (created_at / updated_at), `offset`, `limit` and
+`tags`. CatalogIndex keeps:
+
+1. Two sorted lists of (timestamp, id), one per order_by field. Paging through them is a
+   slice, so `order_by + offset + limit` costs O(limit) once the list is built, and an
+   insert is a bisect plus a list insert.
+2. An inverted index tag -> set of ids. A multi-tag filter (items that have ALL the
+   tags) intersects the sets, starting from the smallest one.
+
+When both a tag filter and an ordering are requested there are two ways to answer:
+- "intersect": intersect the posting sets, then pick the first offset + limit matches
+               by timestamp. Cost ~ m, the size of the smallest posting set.
+- "scan":      walk the timestamp index in order and keep items that have every tag,
+               stopping after offset + limit matches. Cost ~ (offset + limit) / selectivity.
+
+`plan()` estimates both from the posting set sizes and picks the cheaper one. Rare tags
+go through "intersect"; common tags through "scan".
+
+Usage:
+    index = CatalogIndex()
+    index.add(item)  # needs id, tags, created_at, updated_at attributes
+    result = index.query(order_by="created_at", offset=0, limit=10, tags=["python"])
+    result.items, result.plan
+"""
+
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from heapq import nsmallest
+from itertools import islice
+from threading import RLock
+from typing import Any, Hashable, Iterable
+
+ORDER_FIELDS = ("created_at", "updated_at")
+
+# Cost of one intersect step relative to one scan step, used by CatalogIndex.plan()
+INTERSECT_STEP_COST = 0.5
+
+
+@dataclass
+class QueryResult:
+    items: list[Any]
+    plan: str
+
+
+class CatalogIndex:
+    def __init__(self):
+        self._items: dict[Hashable, Any] = {}
+        self._sorted: dict[str, list[tuple[Any, Hashable]]] = {field: [] for field in ORDER_FIELDS}
+        self._tags: dict[str, set[Hashable]] = {}
+        self._lock = RLock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Hashable) -> Any | None:
+        return self._items.get(key)
+
+    # ----------------------
+    # Writes
+    # ----------------------
+
+    def add(self, item: Any) -> None:
+        """Insert or replace an item."""
+        with self._lock:
+            old = self._items.get(item.id)
+            if old is not None:
+                self._unindex(old)
+            self._items[item.id] = item
+            for field in ORDER_FIELDS:
+                insort(self._sorted[field], (getattr(item, field), item.id))
+            for tag in set(item.tags):
+                self._tags.setdefault(tag, set()).add(item.id)
+
+    def extend(self, items: Iterable[Any]) -> None:
+        """Bulk load: append everything, then sort each timestamp index once."""
+        with self._lock:
+            # The last item wins for an id repeated in the batch. Replaced items are taken out
+            # while the lists are still sorted, since _unindex finds their entries by bisect.
+            batch = {item.id: item for item in items}
+            for key in batch:
+                old = self._items.get(key)
+                if old is not None:
+                    self._unindex(old)
+            for item in batch.values():
+                self._items[item.id] = item
+                for field in ORDER_FIELDS:
+                    self._sorted[field].append((getattr(item, field), item.id))
+                for tag in set(item.tags):
+                    self._tags.setdefault(tag, set()).add(item.id)
+            for entries in self._sorted.values():
+                entries.sort()
+
+    def remove(self, key: Hashable) -> Any:
+        with self._lock:
+            item = self._items.pop(key)
+            self._unindex(item)
+        return item
+
+    def _unindex(self, item: Any) -> None:
+        for field in ORDER_FIELDS:
+            entries = self._sorted[field]
+            entry = (getattr(item, field), item.id)
+            pos = bisect_left(entries, entry)
+            if pos < len(entries) and entries[pos] == entry:
+                del entries[pos]
+        for tag in set(item.tags):
+            ids = self._tags.get(tag)
+            if ids is not None:
+                ids.discard(item.id)
+                if not ids:
+                    del self._tags[tag]
+
+    # ----------------------
+    # Queries
+    # ----------------------
+
+    def plan(self, offset: int, limit: int, tags: list[str]) -> str:
+        """Pick "index" (no tags), "empty", "intersect" or "scan" for a query."""
+        if not tags:
+            return "index"
+        sizes = [len(self._tags.get(tag, ())) for tag in tags]
+        smallest = min(sizes)
+        if smallest == 0:
+            return "empty"
+        n = len(self._items)
+        # Assume tags are independent: the fraction of items that match every tag
+        selectivity = 1.0
+        for size in sizes:
+            selectivity *= size / n
+        # Measured per-element costs: a scan step (Python loop + membership tests) is about
+        # twice as expensive as an intersect + nsmallest step (mostly C).
+        scan_cost = min(n, (offset + limit) / selectivity)
+        intersect_cost = smallest * INTERSECT_STEP_COST
+        return "scan" if scan_cost < intersect_cost else "intersect"
+
+    def query(self, order_by: str = "created_at", offset: int = 0, limit: int = 100,
+              tags: Iterable[str] = ()) -> QueryResult:
+        if order_by not in self._sorted:
+            raise ValueError(f"order_by must be one of {ORDER_FIELDS}")
+        tags = list(dict.fromkeys(tags))
+        with self._lock:
+            plan = self.plan(offset, limit, tags)
+            entries = self._sorted[order_by]
+            if plan == "empty":
+                keys = []
+            elif plan == "index":
+                keys = [key for _, key in entries[offset:offset + limit]]
+            elif plan == "scan":
+                postings = sorted((self._tags[tag] for tag in tags), key=len)
+                matches = (key for _, key in entries if all(key in ids for ids in postings))
+                keys = list(islice(matches, offset, offset + limit))
+            else:
+                postings = sorted((self._tags[tag] for tag in tags), key=len)
+                matched = postings[0].intersection(*postings[1:])
+                items = self._items
+                keys = nsmallest(offset + limit, matched, key=lambda key: (getattr(items[key], order_by), key))
+                keys = keys[offset:]
+            return QueryResult(items=[self._items[key] for key in keys], plan=plan)
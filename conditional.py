@@ -0,0 +1,170 @@
+"""
+Conditional GET: strong ETags, Last-Modified and 304 Not Modified.
+
+A client polling GET /items/1 receives, validates and parses the same JSON every time, and
+the server loads, validates and serializes it every time, even when nothing changed.
+
+With conditional requests the server labels each response with an ETag (a hash of the
+body) and a Last-Modified date. The client sends them back in If-None-Match /
+If-Modified-Since, and if they still match the server answers `304 Not Modified` with no
+body.
+
+The stores count versions (see storage.py), so the ETag doesn't need to be recomputed per
+request either. RepresentationCache keeps, per resource, the body and ETag built for the
+version that was current at the time:
+
+1. Read the resource's version and the time of the write that made it (a dict lookup, or
+   one indexed SQLite query; see `version_info` in storage.py).
+2. If a representation for that version is cached, use it: no loading, no validation,
+   no serialization, no hashing.
+3. Otherwise render the body, hash it once, and cache it, but only if the version is
+   still the same afterwards (a write that lands in between would make the body newer
+   than the version it would be stored under).
+4. Answer 304 if the request's validators match, else 200 with the cached body.
+
+Last-Modified is the time of that write, rounded down to the second as HTTP dates are, so
+every worker sends the same date for the same version. It is capped at the current time,
+so it is never later than the response's Date even if another worker's clock is ahead.
+When the time isn't known (`version` returns a bare number, or the row predates recorded
+times), the time the representation is built is used instead. HTTP dates can't tell apart
+two changes within the same second, so If-Modified-Since may hide the second one; the ETag
+covers that case, and If-None-Match takes precedence over If-Modified-Since.
+
+Usage:
+    response = await conditional_get(request, cache, ("item", item_id),
+                                     version=lambda: store.version_info(item_id),
+                                     render=lambda: render_item(item_id))
+    if response is None:
+        raise HTTPException(status_code=404)
+    return response
+"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Hashable
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+REPRESENTATION_CACHE_SIZE = 1024
+
+
+@dataclass(frozen=True)
+class Representation:
+    body: bytes
+    etag: str
+    modified_at: int  # Unix time, whole seconds
+    last_modified: str  # modified_at as an HTTP date
+
+
+def make_representation(body: bytes, modified_at: float | None = None) -> Representation:
+    """`modified_at` is the Unix time of the change; unknown (None or 0), it is now."""
+    now = int(time.time())
+    modified_at = min(int(modified_at), now) if modified_at else now
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    return Representation(body, etag, modified_at, formatdate(modified_at, usegmt=True))
+
+
+def json_body(content: Any) -> bytes:
+    """The bytes FastAPI's default JSONResponse would send for `content`."""
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class RepresentationCache:
+    """The latest representation of each resource, keyed by its version. Bounded LRU."""
+
+    def __init__(self, maxsize: int = REPRESENTATION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Hashable, tuple[int, Representation]] = OrderedDict()
+
+    def get(self, resource: Hashable, version: int) -> Representation | None:
+        entry = self._entries.get(resource)
+        if entry is None or entry[0] != version:
+            return None
+        self._entries.move_to_end(resource)
+        return entry[1]
+
+    def put(self, resource: Hashable, version: int, body: bytes, modified_at: float | None = None) -> Representation:
+        representation = make_representation(body, modified_at)
+        self._entries[resource] = (version, representation)
+        self._entries.move_to_end(resource)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return representation
+
+
+def _split_version(info: int | tuple[int, float]) -> tuple[int, float | None]:
+    return (info, None) if isinstance(info, int) else (info[0], info[1])
+
+
+def parse_http_date(value: str) -> int | None:
+    try:
+        return int(parsedate_to_datetime(value).timestamp())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def not_modified_since(if_modified_since: str | None, modified_at: int) -> bool:
+    """True if an If-Modified-Since value shows the client's copy is still current."""
+    if not if_modified_since:
+        return False
+    since = parse_http_date(if_modified_since)
+    return since is not None and modified_at <= since
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses the weak comparison: `W/"x"` matches `"x"`."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def is_not_modified(request: Request, representation: Representation) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, representation.etag)
+    return not_modified_since(request.headers.get("if-modified-since"), representation.modified_at)
+
+
+def respond(request: Request, representation: Representation, media_type: str = "application/json") -> Response:
+    """200 with the body, or a body-less 304 if the request's validators match."""
+    headers = {
+        "ETag": representation.etag,
+        "Last-Modified": representation.last_modified,
+        # Caches may keep the response but must check with us before reusing it
+        "Cache-Control": "no-cache",
+    }
+    if is_not_modified(request, representation):
+        return Response(status_code=304, headers=headers)
+    return Response(representation.body, media_type=media_type, headers=headers)
+
+
+async def conditional_get(
+    request: Request,
+    cache: RepresentationCache,
+    resource: Hashable,
+    version: Callable[[], Awaitable[int | tuple[int, float]]],
+    render: Callable[[], Awaitable[bytes | None]],
+) -> Response | None:
+    """Response for `resource`, rendered at most once per version; None if render() finds nothing.
+
+    `version` returns the version, or (version, Unix time of the write that made it).
+    """
+    current, modified_at = _split_version(await version())
+    representation = cache.get(resource, current)
+    if representation is None:
+        body = await render()
+        if body is None:
+            return None
+        if _split_version(await version())[0] == current:
+            representation = cache.put(resource, current, body, modified_at)
+        else:
+            representation = make_representation(body)
+    return respond(request, representation)
@@ -0,0 +1,63 @@
+"""
+Cookie header parsing following RFC 6265.
+
+The `Cookie` request header is `name=value` pairs separated by `;`:
+
+    Cookie: session_id=abc123; theme=dark
+
+Splitting on "; " and then on "=" breaks on perfectly valid headers:
+- values that contain "=" (base64 padding, signed tokens): `token=YWJj==`
+- pairs separated by ";" with no space, which some clients and proxies send
+- pairs with no "=" at all (flag cookies), which make the unpacking fail
+
+`parse_cookie_header` splits pairs on ";", trims the optional whitespace around them, splits
+each pair on its first "=" only, and removes the optional double quotes around a value. A
+pair without "=" becomes a cookie with an empty value, pairs with an empty name are skipped,
+and when a name appears twice the first one wins (browsers send the most specific cookie
+first).
+
+A client sends the same Cookie header on every request, so the parsed result is memoized
+by the raw header string in a small LRU cache. The returned mapping is shared between
+callers and therefore read-only; copy it with `dict(...)` to change it.
+
+Usage:
+    cookies = parse_cookie_header(request.headers.get("cookie", ""))
+    cookies.get("session_id")
+"""
+
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping
+
+COOKIE_MEMO_SIZE = 256
+# Longer headers are parsed every time instead of being kept in the memo
+MAX_MEMO_HEADER = 4096
+
+
+def _parse(header: str) -> dict[str, str]:
+    cookies: dict[str, str] = {}
+    for pair in header.split(";"):
+        name, sep, value = pair.partition("=")
+        name = name.strip()
+        if not sep:
+            # A flag cookie: `Cookie: a=1; debug`
+            name, value = pair.strip(), ""
+        if not name or name in cookies:
+            continue
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] == '"':
+            value = value[1:-1]
+        cookies[name] = value
+    return cookies
+
+
+@lru_cache(maxsize=COOKIE_MEMO_SIZE)
+def _parse_memoized(header: str) -> Mapping[str, str]:
+    return MappingProxyType(_parse(header))
+
+
+def parse_cookie_header(header: str) -> Mapping[str, str]:
+    """name -> value for every cookie in a `Cookie` header (read-only, see module docstring)."""
+    if len(header) > MAX_MEMO_HEADER:
+        return MappingProxyType(_parse(header))
+    return _parse_memoized(header)
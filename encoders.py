@@ -0,0 +1,41 @@
+"""
+Fast JSON-compatible encoding of pydantic models for storage.
+
+`jsonable_encoder(model)` first calls `model.model_dump(mode="json")` (done in Rust by
+pydantic-core) and then walks the resulting dict again in Python, checking every value
+against a long list of types, only to return an equal dict. For a model the second walk
+does nothing but cost time.
+
+`encode_for_storage` skips it: it looks up one cached serializer per model class and calls
+pydantic-core directly. The output is the same as `jsonable_encoder` with its defaults:
+datetimes become ISO 8601 strings, None stays None, sets become lists, and aliases are
+used as keys. Anything that is not a pydantic model falls back to `jsonable_encoder`.
+
+Usage:
+    from encoders import encode_for_storage
+    events[id] = encode_for_storage(event)
+"""
+
+from functools import lru_cache
+from typing import Any, Callable
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+
+@lru_cache(maxsize=None)
+def model_encoder(model: type[BaseModel]) -> Callable[[BaseModel], Any]:
+    """The cached `model -> JSON-compatible dict` function for one model class."""
+    to_python = model.__pydantic_serializer__.to_python
+
+    def encode(obj: BaseModel) -> Any:
+        return to_python(obj, mode="json", by_alias=True)
+
+    return encode
+
+
+def encode_for_storage(obj: Any) -> Any:
+    """Drop-in replacement for `jsonable_encoder(obj)` that is fast for pydantic models."""
+    if isinstance(obj, BaseModel):
+        return model_encoder(type(obj))(obj)
+    return jsonable_encoder(obj)
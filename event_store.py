@@ -0,0 +1,165 @@
+"""
+Time-indexed event store for main18.
+
+main18 kept events in a dict keyed by id, so "which events happen between T1 and T2?"
+meant looking at every event. EventStore keeps, next to the id -> event dict:
+
+1. A list of (date, id) pairs sorted by date. A range query is two bisects plus a slice,
+   O(log n + k) for k results.
+2. Event counts per hour and per day, updated on every write, so GET /events/stats is a
+   read of two small Counters instead of a scan.
+3. `evict_before(cutoff)`, which drops every event older than `cutoff` in one slice of the
+   sorted list. `run_retention` calls it periodically from a background task.
+
+Dates are compared in UTC. Naive datetimes (no timezone) are treated as UTC, so events
+sent with and without a timezone can live in the same index.
+
+Usage:
+    store = EventStore()
+    store.put("1", {"name": "FastAPI Meetup", "date": "..."}, datetime(2025, 1, 12, 14, 30))
+    store.range(datetime(2025, 1, 1), datetime(2025, 2, 1), limit=100)
+    store.stats("day")
+"""
+
+import asyncio
+import logging
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from threading import RLock
+from typing import Any, Awaitable, Callable, Literal
+
+logger = logging.getLogger(__name__)
+
+Bucket = Literal["hour", "day"]
+
+
+def to_utc(value: datetime) -> datetime:
+    """Aware UTC datetime; naive values are assumed to already be in UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def bucket_start(value: datetime, bucket: Bucket) -> datetime:
+    value = value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0) if bucket == "day" else value
+
+
+class EventStore:
+    def __init__(self):
+        self._events: dict[str, tuple[datetime, Any]] = {}
+        self._by_date: list[tuple[datetime, str]] = []
+        self._counts: dict[Bucket, Counter] = {"hour": Counter(), "day": Counter()}
+        self._lock = RLock()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._events
+
+    # ----------------------
+    # Writes
+    # ----------------------
+
+    def put(self, key: str, event: Any, date: datetime) -> None:
+        """Insert or replace the event stored under `key`."""
+        date = to_utc(date)
+        with self._lock:
+            if key in self._events:
+                self._unindex(key)
+            self._events[key] = (date, event)
+            insort(self._by_date, (date, key))
+            for bucket, counter in self._counts.items():
+                counter[bucket_start(date, bucket)] += 1
+
+    def delete(self, key: str) -> Any:
+        with self._lock:
+            event = self._unindex(key)
+            del self._events[key]
+        return event
+
+    def evict_before(self, cutoff: datetime) -> int:
+        """Drop every event dated before `cutoff`; returns how many were dropped."""
+        cutoff = to_utc(cutoff)
+        with self._lock:
+            stop = bisect_left(self._by_date, (cutoff,))
+            for date, key in self._by_date[:stop]:
+                del self._events[key]
+                self._uncount(date)
+            del self._by_date[:stop]
+        return stop
+
+    def _unindex(self, key: str) -> Any:
+        date, event = self._events[key]
+        pos = bisect_left(self._by_date, (date, key))
+        del self._by_date[pos]
+        self._uncount(date)
+        return event
+
+    def _uncount(self, date: datetime) -> None:
+        for bucket, counter in self._counts.items():
+            start = bucket_start(date, bucket)
+            counter[start] -= 1
+            if not counter[start]:
+                del counter[start]
+
+    # ----------------------
+    # Reads
+    # ----------------------
+
+    def get(self, key: str) -> Any | None:
+        entry = self._events.get(key)
+        return None if entry is None else entry[1]
+
+    def range(self, start: datetime | None = None, end: datetime | None = None,
+              limit: int = 100) -> list[tuple[str, Any]]:
+        """Up to `limit` (id, event) pairs with start <= date < end, oldest first."""
+        with self._lock:
+            index = self._by_date
+            lo = 0 if start is None else bisect_left(index, (to_utc(start),))
+            hi = len(index) if end is None else bisect_left(index, (to_utc(end),))
+            hi = min(hi, lo + limit)
+            return [(key, self._events[key][1]) for _, key in index[lo:hi]]
+
+    def stats(self, bucket: Bucket = "hour", start: datetime | None = None,
+              end: datetime | None = None) -> dict[datetime, int]:
+        """Event counts per bucket, in time order, for events dated from the start of
+        `start`'s bucket up to, but not including, `end` (as SQLiteEventStore counts them)."""
+        start = None if start is None else bucket_start(to_utc(start), bucket)
+        end = None if end is None else to_utc(end)
+        partial: dict[datetime, int] = {}
+        with self._lock:
+            counts = list(self._counts[bucket].items())
+            if end is not None:
+                last = bucket_start(end, bucket)
+                if last < end and (start is None or last >= start):
+                    # `end` falls inside a bucket: count that bucket's events before `end`
+                    # from the date index instead of taking the whole bucket
+                    index = self._by_date
+                    count = bisect_left(index, (end,)) - bisect_left(index, (last,))
+                    if count:
+                        partial[last] = count
+                end = last
+        whole = {
+            when: count
+            for when, count in sorted(counts)
+            if (start is None or when >= start) and (end is None or when < end)
+        }
+        return {**whole, **partial}
+
+
+async def run_retention(evict_before: Callable[[datetime], Awaitable[int]], max_age: timedelta,
+                        interval: float = 60.0) -> None:
+    """Every `interval` seconds, evict events older than `max_age`. Runs until cancelled."""
+    while True:
+        cutoff = datetime.now(timezone.utc) - max_age
+        try:
+            evicted = await evict_before(cutoff)
+        except Exception:
+            logger.exception("Event retention failed")
+        else:
+            if evicted:
+                logger.info("Evicted %d events older than %s", evicted, cutoff.isoformat())
+        await asyncio.sleep(interval)
@@ -0,0 +1,149 @@
+"""
+Response fast path for routes whose handler already returns a validated model.
+
+With `response_model=...`, FastAPI takes whatever the handler returned, dumps it to a dict,
+validates that dict against the response model (building a new object) and then serializes
+the new object. When the handler returns an `Item` for `response_model=Item`, or a `UserIn`
+for `response_model=UserOut`, that round trip re-checks data pydantic has already checked.
+
+`FastResponseRoute`, an APIRoute class, wraps the endpoint of every route with a
+`response_model` and serializes the result itself, choosing one serializer per (type of the
+returned value, response model, exclude options) and caching it:
+
+1. direct      - the result is exactly a `Model`: dump it with Model's serializer, no validation.
+2. projection  - the result is another model that has every field of `Model` with the same
+                 type and alias, and `Model` has no validators of its own: dump only those
+                 fields with the result's serializer (`include=`), no validation. This is how
+                 UserIn -> UserOut drops `password`.
+3. validate    - anything else (dicts, lists, other models): validate with a cached
+                 TypeAdapter(Model) and dump, which is what FastAPI does, minus the extra dict.
+
+Everything else comes from the route, as it would without the fast path: `status_code`,
+`response_model_by_alias` and `response_model_exclude_unset/defaults/none`, and the headers,
+cookies and status code that the endpoint or its dependencies set on an injected `Response`
+(background tasks are attached by FastAPI as usual). The OpenAPI schema doesn't change. The
+handler's own `Response` objects (StreamingResponse, ...) are passed through untouched.
+Routes that are left to FastAPI: no `response_model`, `response_model_include/exclude`, a
+`response_class` other than JSONResponse, or a `def` endpoint (it runs in the threadpool).
+
+Usage:
+    app = FastAPI()
+    app.router.route_class = FastResponseRoute   # before declaring routes
+
+    @app.post("/user/", response_model=UserOut)
+    async def create_user(user: UserIn) -> Any:
+        return user
+"""
+
+import functools
+import inspect
+from typing import Any, Callable
+
+from fastapi import Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from fastapi.utils import is_body_allowed_for_status_code
+from pydantic import BaseModel, TypeAdapter
+
+_serializers: dict[tuple[type, Any, tuple], tuple[str, Callable[[Any], bytes]]] = {}
+# Keyword under which the injected Response reaches endpoints that don't declare one
+_SUB_RESPONSE = "_fast_response_sub_response"
+
+
+def _is_projection(source: type[BaseModel], target: type[BaseModel]) -> bool:
+    decorators = target.__pydantic_decorators__
+    if any((decorators.validators, decorators.field_validators, decorators.root_validators,
+            decorators.model_validators, decorators.field_serializers, decorators.model_serializers,
+            decorators.computed_fields)):
+        return False
+    source_fields = source.model_fields
+    for name, field in target.model_fields.items():
+        other = source_fields.get(name)
+        if other is None or other.annotation != field.annotation or other.metadata != field.metadata:
+            return False
+        if other.alias != field.alias or other.serialization_alias != field.serialization_alias:
+            return False
+    return True
+
+
+def serializer_for(value_type: type, model: Any, by_alias: bool = True, exclude_unset: bool = False,
+                   exclude_defaults: bool = False, exclude_none: bool = False) -> tuple[str, Callable[[Any], bytes]]:
+    """The cached (kind, value -> JSON bytes) pair for this return type, response model and options."""
+    key = (value_type, model, (by_alias, exclude_unset, exclude_defaults, exclude_none))
+    cached = _serializers.get(key)
+    if cached is not None:
+        return cached
+
+    excludes = {"exclude_unset": exclude_unset, "exclude_defaults": exclude_defaults, "exclude_none": exclude_none}
+    if value_type is model:
+        to_json = model.__pydantic_serializer__.to_json
+        cached = ("direct", lambda value: to_json(value, by_alias=by_alias, **excludes))
+    elif (isinstance(model, type) and issubclass(model, BaseModel) and issubclass(value_type, BaseModel)
+          and _is_projection(value_type, model)):
+        to_json = value_type.__pydantic_serializer__.to_json
+        include = set(model.model_fields)
+        # FastAPI builds a new Model from the result's attributes, in which every field is set
+        projected = {**excludes, "exclude_unset": False}
+        cached = ("projection", lambda value: to_json(value, include=include, by_alias=by_alias, **projected))
+    else:
+        adapter = TypeAdapter(model)
+        validate, dump = adapter.validate_python, adapter.dump_json
+
+        def validate_and_dump(value: Any) -> bytes:
+            if isinstance(value, BaseModel):
+                # Same as FastAPI: validate the model's data, not the instance itself
+                value = value.model_dump(by_alias=True)
+            return dump(validate(value, from_attributes=True), by_alias=by_alias, **excludes)
+
+        cached = ("validate", validate_and_dump)
+    _serializers[key] = cached
+    return cached
+
+
+class FastResponseRoute(APIRoute):
+    """APIRoute that serializes already-validated results without validating them again."""
+
+    def get_route_handler(self) -> Callable:
+        response_class = self.response_class
+        if isinstance(response_class, DefaultPlaceholder):
+            response_class = response_class.value
+        if (self.response_field is not None and self.response_model_include is None
+                and self.response_model_exclude is None and response_class is JSONResponse
+                and inspect.iscoroutinefunction(self.dependant.call)
+                and not getattr(self.dependant.call, "__fast_response__", False)):
+            self._use_fast_path()
+        return super().get_route_handler()
+
+    def _use_fast_path(self) -> None:
+        call = self.dependant.call
+        model = self.response_model
+        options = {
+            "by_alias": self.response_model_by_alias,
+            "exclude_unset": self.response_model_exclude_unset,
+            "exclude_defaults": self.response_model_exclude_defaults,
+            "exclude_none": self.response_model_exclude_none,
+        }
+        status_code = self.status_code
+        # Ask FastAPI for the Response it shares with the dependencies, so whatever they
+        # set on it can be merged in below, as FastAPI itself does
+        declared = self.dependant.response_param_name
+        if declared is None:
+            self.dependant.response_param_name = _SUB_RESPONSE
+
+        @functools.wraps(call)
+        async def endpoint(*args, **kwargs):
+            sub_response = kwargs[declared] if declared else kwargs.pop(_SUB_RESPONSE)
+            result = await call(*args, **kwargs)
+            if isinstance(result, Response):
+                return result
+            _, serialize = serializer_for(type(result), model, **options)
+            response = Response(content=serialize(result), media_type=JSONResponse.media_type,
+                                status_code=sub_response.status_code or status_code or 200)
+            if not is_body_allowed_for_status_code(response.status_code):
+                response.body = b""
+            response.headers.raw.extend(sub_response.headers.raw)
+            return response
+
+        endpoint.__fast_response__ = True
+        self.dependant.call = endpoint
@@ -0,0 +1,309 @@
+"""
+Static files from a configured directory: cached metadata, Range requests and 304s.
+
+Starlette's FileResponse is correct but does a lot per request: an `os.stat` in the
+threadpool, then an open, one read per 64 KiB chunk and a close, each its own threadpool
+hop, plus an md5 for the ETag. Resolving the path safely (following symlinks to make sure
+the file is really under the root) adds a few more syscalls on top.
+
+`serve_file(request, cache, path)` does the per-file work once and keeps it in a FileCache:
+
+1. Path normalisation: the requested path is split on "/"; empty and "." segments are
+   dropped, and "..", NUL bytes and backslashes are refused outright rather than
+   resolved. The result is joined to the root and passed through `realpath`, and
+   anything that ends up outside the root (a symlink pointing elsewhere) is treated as
+   missing.
+2. Metadata cache: the resolved path, stat result, ETag, Last-Modified and media type
+   are kept for `ttl` seconds (LRU-bounded). Missing files are cached too, so a 404
+   flood doesn't stat the disk on each request. A hot file costs a dict lookup and an
+   expiry check before its body is read.
+3. Validators: ETag is "<mtime_ns>-<size>" in hex (no hashing), Last-Modified is the
+   mtime. If-None-Match / If-Modified-Since are answered with 304 straight from the
+   cache: no syscalls at all.
+4. Ranges: a single `Range: bytes=...` range gets 206 with Content-Range, or 416 if it
+   starts past the end. If-Range is honoured. Several ranges in one header are answered
+   with the whole file, which HTTP allows.
+5. Body: the file is opened and fstat'ed in one threadpool hop. If the file changed
+   since its metadata was cached, the fresh fstat is used (and cached) so the headers
+   always describe the bytes being sent. Files up to `SMALL_FILE_BYTES` are read in that
+   same hop; bigger ones are streamed from the open descriptor with `os.pread` in
+   `CHUNK_BYTES` chunks.
+
+ASGI servers like uvicorn don't offer a sendfile extension, so the body still passes
+through the event loop; the savings are in syscalls and threadpool hops.
+
+Configuration:
+    FILES_ROOT=files      - directory served by main2's /files/{file_path:path}
+    FILE_STAT_TTL=1.0     - seconds a file's metadata is trusted before it is stat'ed again
+
+Usage:
+    files = FileCache(FILES_ROOT)
+
+    @app.get("/files/{file_path:path}")
+    async def read_file(file_path: str, request: Request):
+        response = await serve_file(request, files, file_path)
+        if response is None:
+            raise HTTPException(status_code=404)
+        return response
+"""
+
+import mimetypes
+import os
+import re
+import stat
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.utils import formatdate
+
+from anyio import to_thread
+from fastapi import Request, Response
+from starlette.types import Receive, Scope, Send
+
+from conditional import etag_matches, not_modified_since
+
+FILES_ROOT = os.environ.get("FILES_ROOT", "files")
+FILE_STAT_TTL = float(os.environ.get("FILE_STAT_TTL", "1.0"))
+FILE_CACHE_SIZE = 4096
+SMALL_FILE_BYTES = 256 * 1024
+CHUNK_BYTES = 1024 * 1024
+
+_BYTE_RANGE = re.compile(r"^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$", re.ASCII | re.IGNORECASE)
+
+
+class UnsafePath(ValueError):
+    pass
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class FileInfo:
+    path: str  # resolved, absolute
+    size: int
+    mtime_ns: int
+    etag: str
+    modified_at: int  # Unix time, whole seconds
+    last_modified: str  # modified_at as an HTTP date
+    media_type: str
+
+    @classmethod
+    def from_stat(cls, path: str, st: os.stat_result) -> "FileInfo":
+        modified_at = int(st.st_mtime)
+        return cls(
+            path=path,
+            size=st.st_size,
+            mtime_ns=st.st_mtime_ns,
+            etag=f'"{st.st_mtime_ns:x}-{st.st_size:x}"',
+            modified_at=modified_at,
+            last_modified=formatdate(modified_at, usegmt=True),
+            media_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+        )
+
+    def matches(self, st: os.stat_result) -> bool:
+        return st.st_size == self.size and st.st_mtime_ns == self.mtime_ns
+
+
+def normalize(requested: str) -> str:
+    """`requested` as a relative path with no empty, "." or ".." segments."""
+    if "\0" in requested or "\\" in requested:
+        raise UnsafePath(requested)
+    parts = []
+    for part in requested.split("/"):
+        if part in ("", "."):
+            continue
+        if part == "..":
+            raise UnsafePath(requested)
+        parts.append(part)
+    if not parts:
+        raise UnsafePath(requested)
+    return "/".join(parts)
+
+
+class FileCache:
+    def __init__(self, root: str = FILES_ROOT, ttl: float = FILE_STAT_TTL, maxsize: int = FILE_CACHE_SIZE):
+        self.root = os.path.realpath(root)
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # normalised relative path -> (FileInfo or None for "missing", monotonic expiry)
+        self._entries: OrderedDict[str, tuple[FileInfo | None, float]] = OrderedDict()
+        self._counters = dict.fromkeys(("hits", "misses", "refreshes", "evictions"), 0)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _resolve(self, relative: str) -> FileInfo | None:
+        """Blocking: realpath + stat, None unless it's a regular file under the root."""
+        path = os.path.realpath(os.path.join(self.root, relative))
+        if os.path.commonpath((self.root, path)) != self.root:
+            return None
+        try:
+            st = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            return None
+        return FileInfo.from_stat(path, st) if stat.S_ISREG(st.st_mode) else None
+
+    def _put(self, relative: str, info: FileInfo | None) -> None:
+        self._entries[relative] = (info, time.monotonic() + self.ttl)
+        self._entries.move_to_end(relative)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    async def get(self, requested: str) -> FileInfo | None:
+        """Metadata for a file under the root, None if it's missing or the path is unsafe."""
+        try:
+            relative = normalize(requested)
+        except UnsafePath:
+            return None
+        entry = self._entries.get(relative)
+        if entry is not None and entry[1] > time.monotonic():
+            self._entries.move_to_end(relative)
+            self._counters["hits"] += 1
+            return entry[0]
+        self._counters["misses"] += 1
+        info = await to_thread.run_sync(self._resolve, relative)
+        self._put(relative, info)
+        return info
+
+    def refresh(self, info: FileInfo, st: os.stat_result) -> FileInfo:
+        """Replace `info` after an fstat showed the file changed."""
+        fresh = FileInfo.from_stat(info.path, st)
+        relative = os.path.relpath(info.path, self.root)
+        if relative in self._entries:
+            self._put(relative, fresh)
+        self._counters["refreshes"] += 1
+        return fresh
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._entries), **self._counters}
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """(start, end) with end exclusive for a single byte range; None to send the whole file."""
+    match = _BYTE_RANGE.match(header)
+    if match is None or not any(match.groups()):
+        return None  # not bytes, several ranges, or malformed: ignored, as HTTP allows
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size
+    start = int(first)
+    end = int(last) + 1 if last else size
+    if last and end <= start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(end, size)
+
+
+def _validators(info: FileInfo) -> dict[str, str]:
+    return {"ETag": info.etag, "Last-Modified": info.last_modified, "Accept-Ranges": "bytes"}
+
+
+def _open(path: str, expected: FileInfo, start: int, length: int) -> tuple[int, os.stat_result, bytes | None]:
+    """Blocking: open and fstat; for a small, unchanged file also read it and close."""
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+    try:
+        st = os.fstat(fd)
+        if not expected.matches(st) or length > SMALL_FILE_BYTES:
+            return fd, st, None
+        data = os.pread(fd, length, start)
+    except BaseException:
+        os.close(fd)
+        raise
+    os.close(fd)
+    return -1, st, data
+
+
+class CachedFileResponse(Response):
+    """Sends `length` bytes of a file from `start`, re-checking its metadata on open."""
+
+    def __init__(self, cache: FileCache, info: FileInfo, byte_range: tuple[int, int] | None = None):
+        self.cache = cache
+        self.info = info
+        self.byte_range = byte_range
+        status_code = 200 if byte_range is None else 206
+        headers = self._file_headers(info, status_code, *(byte_range or (0, info.size)))
+        super().__init__(status_code=status_code, headers=headers, media_type=info.media_type)
+
+    @staticmethod
+    def _file_headers(info: FileInfo, status_code: int, start: int, end: int) -> dict[str, str]:
+        headers = {**_validators(info), "Content-Length": str(end - start)}
+        if status_code == 206:
+            headers["Content-Range"] = f"bytes {start}-{end - 1}/{info.size}"
+        return headers
+
+    def _update_headers(self, info: FileInfo, start: int, end: int) -> None:
+        # In place, so headers and cookies added after __init__ are kept; the media type
+        # comes from the path, so it can't have changed
+        for name, value in self._file_headers(info, self.status_code, start, end).items():
+            self.headers[name] = value
+        if self.status_code != 206 and "content-range" in self.headers:
+            del self.headers["content-range"]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        info = self.info
+        start, end = self.byte_range or (0, info.size)
+        fd, st, data = await to_thread.run_sync(_open, info.path, info, start, end - start)
+        try:
+            if data is None and not info.matches(st):
+                # Changed since it was cached: describe (and send) what's on disk now
+                info = self.cache.refresh(info, st)
+                self.status_code, start, end = 200, 0, info.size
+                if end <= SMALL_FILE_BYTES:
+                    data = await to_thread.run_sync(os.pread, fd, end, 0)
+            if data is not None:
+                end = start + len(data)  # in case it was truncated after the fstat
+            self._update_headers(info, start, end)
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if scope["method"] == "HEAD":
+                await send({"type": "http.response.body", "body": b""})
+            elif data is not None:
+                await send({"type": "http.response.body", "body": data})
+            else:
+                await self._send_range(send, info, fd, start, end)
+        finally:
+            if fd >= 0:
+                os.close(fd)
+        if self.background is not None:
+            await self.background()
+
+    @staticmethod
+    async def _send_range(send: Send, info: FileInfo, fd: int, start: int, end: int) -> None:
+        offset = start
+        while offset < end:
+            chunk = await to_thread.run_sync(os.pread, fd, min(CHUNK_BYTES, end - offset), offset)
+            if not chunk:
+                raise RuntimeError(f"{info.path} was truncated while it was being sent")
+            offset += len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": offset < end})
+
+
+async def serve_file(request: Request, cache: FileCache, path: str) -> Response | None:
+    """The response for a file under the cache's root, None if there is no such file."""
+    info = await cache.get(path)
+    if info is None:
+        return None
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = etag_matches(if_none_match, info.etag)
+    else:
+        not_modified = not_modified_since(request.headers.get("if-modified-since"), info.modified_at)
+    if not_modified:
+        return Response(status_code=304, headers=_validators(info))
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header is not None and (if_range is None or if_range.strip() in (info.etag, info.last_modified)):
+        try:
+            byte_range = parse_range(range_header, info.size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{info.size}"})
+    return CachedFileResponse(cache, info, byte_range)
@@ -0,0 +1,147 @@
+"""
+One process for every tutorial app.
+
+Each mainN.py defines its own `app = FastAPI()`, so running all of them takes one uvicorn
+process each: nineteen interpreters that import FastAPI, pydantic and starlette nineteen
+times over and hold their own copies in memory. The gateway imports every mainN module
+once and mounts its app under a prefix:
+
+    /main/...      main.py
+    /main2/...     main2.py
+    ...
+    /main18/...    main18.py
+
+so /main17/items/1 is main17's /items/1 and /main17/docs is its Swagger UI.
+
+- Shared middleware: whatever is passed to `build_gateway(middleware=...)` wraps all the
+  mounted apps once, instead of being configured per app. By default that's CORS for
+  the origins in GATEWAY_CORS_ORIGINS, if any. The apps' own middleware (main13's
+  tracing, for example) still runs inside their mount.
+- One lifespan: Starlette doesn't send lifespan events to mounted apps, so their startup
+  and shutdown handlers would never run. The gateway's lifespan enters each app's
+  lifespan in turn (which runs its `on_event` handlers) and leaves them in reverse
+  order on shutdown. If one app fails to start, the ones already started are shut down.
+  How long each startup took is logged.
+- Metrics: the gateway's own /metrics (see metrics.py) covers every mounted app, labelled
+  with the full template (/main17/items/{item_id}). main.py's own instrumentation steps
+  aside when mounted, so its requests aren't counted twice and /main/metrics is a 404.
+- Profiling: with PROFILER_TOKEN set, /debug/profile (see profiling.py) samples the
+  worker's stacks, or cProfiles one route such as /main17/items/{item_id}.
+- Multiple workers: `python -m gateway` runs uvicorn with GATEWAY_WORKERS processes, each
+  holding one copy of all the apps.
+
+GET / lists the mounted apps. `python -m benchmarks.bench_gateway` compares total RSS and
+time to ready of the gateway with one uvicorn process per app.
+
+Configuration:
+    GATEWAY_APPS=main,main2,...    - modules to mount (default: every main*.py)
+    GATEWAY_CORS_ORIGINS=          - comma-separated origins allowed by the shared CORS middleware
+    GATEWAY_WORKERS=1              - uvicorn worker processes for `python -m gateway`
+    GATEWAY_HOST=127.0.0.1, GATEWAY_PORT=8000
+
+`gateway.app` is only built when first accessed, and `python -m gateway` serves the
+`build_gateway` factory, so neither importing the module nor starting a spawned worker or
+pool process (which re-imports the main module) builds the gateway more than once.
+
+Usage:
+    python -m gateway
+    uvicorn gateway:app --workers 4
+"""
+
+import importlib
+import logging
+import os
+import pathlib
+import re
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Sequence
+
+from fastapi import FastAPI
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.routing import Mount
+
+from metrics import instrument_metrics
+from profiling import install_profiler
+
+logger = logging.getLogger(__name__)
+
+ROOT = pathlib.Path(__file__).resolve().parent
+
+GATEWAY_CORS_ORIGINS = [origin for origin in os.environ.get("GATEWAY_CORS_ORIGINS", "").split(",") if origin]
+GATEWAY_WORKERS = int(os.environ.get("GATEWAY_WORKERS", "1"))
+GATEWAY_HOST = os.environ.get("GATEWAY_HOST", "127.0.0.1")
+GATEWAY_PORT = int(os.environ.get("GATEWAY_PORT", "8000"))
+
+
+def app_modules() -> list[str]:
+    """main, main2, ..., main18 (and main4h) in numeric order."""
+    names = [path.stem for path in ROOT.glob("main*.py")]
+    return sorted(names, key=lambda name: [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)])
+
+
+GATEWAY_APPS = [name for name in os.environ.get("GATEWAY_APPS", "").split(",") if name] or app_modules()
+
+
+def default_middleware() -> list[Middleware]:
+    if not GATEWAY_CORS_ORIGINS:
+        return []
+    return [Middleware(CORSMiddleware, allow_origins=GATEWAY_CORS_ORIGINS, allow_methods=["*"], allow_headers=["*"])]
+
+
+def build_gateway(modules: Sequence[str] = GATEWAY_APPS, middleware: Sequence[Middleware] | None = None) -> FastAPI:
+    """A FastAPI app with each module's `app` mounted at /<module name>."""
+    apps: dict[str, FastAPI] = {}
+    for name in modules:
+        start = time.perf_counter()
+        apps[name] = importlib.import_module(name).app
+        logger.debug("Imported %s in %.1f ms", name, (time.perf_counter() - start) * 1e3)
+
+    @asynccontextmanager
+    async def lifespan(gateway: FastAPI):
+        async with AsyncExitStack() as stack:
+            for name, sub_app in apps.items():
+                start = time.perf_counter()
+                await stack.enter_async_context(sub_app.router.lifespan_context(sub_app))
+                logger.info("Started %s in %.1f ms", name, (time.perf_counter() - start) * 1e3)
+            yield
+
+    gateway = FastAPI(
+        title="FastAPI tutorial gateway",
+        lifespan=lifespan,
+        middleware=default_middleware() if middleware is None else list(middleware),
+    )
+
+    @gateway.get("/")
+    async def index():
+        return {name: {"prefix": f"/{name}", "docs": f"/{name}/docs"} for name in apps}
+
+    for name, sub_app in apps.items():
+        gateway.router.routes.append(Mount(f"/{name}", app=sub_app, name=name))
+    install_profiler(gateway)
+    instrument_metrics(gateway)
+    return gateway
+
+
+_app: FastAPI | None = None
+
+
+def __getattr__(name: str):
+    # `gateway.app` is built on first access rather than at import, so importing this module
+    # (as __main__ for `python -m gateway`, as __mp_main__ in every spawned worker and pool
+    # process, or for app_modules()) doesn't import and mount all the apps
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = build_gateway()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # A factory, so only the server's workers build the gateway, once each
+    uvicorn.run("gateway:build_gateway", factory=True, host=GATEWAY_HOST, port=GATEWAY_PORT,
+                workers=GATEWAY_WORKERS)
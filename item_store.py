@@ -0,0 +1,176 @@
+"""
+In-memory item store with a hash index on the primary key.
+
+main17 used to keep its items in a plain `List[Item]` and scan it on every
+GET /items/{item_id}. ItemStore keeps the items in a dict keyed by the id, so a
+lookup costs the same whether there are 10 items or a million, and it refuses
+to store two items with the same id.
+
+Optional secondary indexes:
+1. name  - exact-match lookup, dict of name -> set of ids.
+2. price - range lookup, a sorted list of (price, id) pairs searched with bisect. NaN
+   compares false with everything and would break the list's order, so with this index
+   a non-finite price is refused with NonFinitePrice before anything is stored.
+
+All writes go through a single threading.RLock. The critical sections never
+await, so the same store can be shared by `async def` handlers running on the
+event loop and plain `def` handlers running in the threadpool.
+
+Usage:
+    store = ItemStore(key="id", index_name=True, index_price=True)
+    store.add(Item(id=1, name="Phone", price=700.0))
+    store.get(1)
+    store.find_by_price_range(100, 800)
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from math import isfinite
+from threading import RLock
+from typing import Any, Generic, Hashable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+class DuplicateKeyError(KeyError):
+    """Raised when an item is added with a key that is already stored."""
+
+
+class NonFinitePrice(ValueError):
+    """Raised when a NaN or infinite price would go into the price index."""
+
+
+class ItemStore(Generic[T]):
+    def __init__(self, key: str = "id", *, index_name: bool = False, index_price: bool = False):
+        self._key = key
+        self._items: dict[Hashable, T] = {}
+        self._lock = RLock()
+        self._by_name: dict[str, set[Hashable]] | None = {} if index_name else None
+        self._by_price: list[tuple[float, Hashable]] | None = [] if index_price else None
+
+    def key_of(self, item: T) -> Hashable:
+        return getattr(item, self._key)
+
+    # ----------------------
+    # Writes
+    # ----------------------
+
+    def add(self, item: T) -> T:
+        """Store a new item. Raises DuplicateKeyError if the key already exists."""
+        key = getattr(item, self._key)
+        self._check(item)
+        with self._lock:
+            if key in self._items:
+                raise DuplicateKeyError(key)
+            self._items[key] = item
+            self._index(key, item)
+        return item
+
+    def extend(self, items: Iterable[T]) -> None:
+        """Add several items at once; nothing is stored if any key is a duplicate."""
+        items = list(items)
+        for item in items:
+            self._check(item)
+        with self._lock:
+            seen = set()
+            for item in items:
+                key = getattr(item, self._key)
+                if key in self._items or key in seen:
+                    raise DuplicateKeyError(key)
+                seen.add(key)
+            for item in items:
+                key = getattr(item, self._key)
+                self._items[key] = item
+                self._index(key, item)
+
+    def put(self, item: T) -> T:
+        """Insert or replace the item with this key."""
+        key = getattr(item, self._key)
+        self._check(item)
+        with self._lock:
+            old = self._items.get(key)
+            if old is not None:
+                self._unindex(key, old)
+            self._items[key] = item
+            self._index(key, item)
+        return item
+
+    def delete(self, key: Hashable) -> T:
+        """Remove and return the item with this key. Raises KeyError if missing."""
+        with self._lock:
+            item = self._items.pop(key)
+            self._unindex(key, item)
+        return item
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            if self._by_name is not None:
+                self._by_name.clear()
+            if self._by_price is not None:
+                self._by_price.clear()
+
+    # ----------------------
+    # Reads
+    # ----------------------
+
+    def get(self, key: Hashable, default: Any = None) -> T | None:
+        return self._items.get(key, default)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[T]:
+        # Snapshot so a concurrent writer can't change the dict mid-iteration
+        return iter(self.values())
+
+    def values(self) -> list[T]:
+        """All items in insertion order."""
+        with self._lock:
+            return list(self._items.values())
+
+    def find_by_name(self, name: str) -> list[T]:
+        if self._by_name is None:
+            raise RuntimeError("ItemStore was created without index_name=True")
+        with self._lock:
+            return [self._items[k] for k in self._by_name.get(name, ())]
+
+    def find_by_price_range(self, low: float, high: float) -> list[T]:
+        """Items with low <= price <= high, cheapest first."""
+        if self._by_price is None:
+            raise RuntimeError("ItemStore was created without index_price=True")
+        with self._lock:
+            index = self._by_price
+            start = bisect_left(index, low, key=lambda entry: entry[0])
+            stop = bisect_right(index, high, key=lambda entry: entry[0])
+            return [self._items[k] for _, k in index[start:stop]]
+
+    # ----------------------
+    # Index maintenance (caller holds the lock)
+    # ----------------------
+
+    def _check(self, item: T) -> None:
+        if self._by_price is not None and not isfinite(getattr(item, "price")):
+            raise NonFinitePrice(f"price must be a finite number, got {getattr(item, 'price')!r}")
+
+    def _index(self, key: Hashable, item: T) -> None:
+        if self._by_name is not None:
+            self._by_name.setdefault(getattr(item, "name"), set()).add(key)
+        if self._by_price is not None:
+            insort(self._by_price, (getattr(item, "price"), key))
+
+    def _unindex(self, key: Hashable, item: T) -> None:
+        if self._by_name is not None:
+            name = getattr(item, "name")
+            ids = self._by_name.get(name)
+            if ids is not None:
+                ids.discard(key)
+                if not ids:
+                    del self._by_name[name]
+        if self._by_price is not None:
+            entry = (getattr(item, "price"), key)
+            pos = bisect_left(self._by_price, entry)
+            if pos < len(self._by_price) and self._by_price[pos] == entry:
+                del self._by_price[pos]
@@ -3,9 +3,17 @@
 
 from fastapi import FastAPI
 
+from metrics import instrument_metrics
+from openapi_cache import cache_openapi
+
 app = FastAPI()
+openapi = cache_openapi(app)
 
 
 @app.get("/")
 async def root():
-    return "Hello world"
\ No newline at end of file
+    return "Hello world"
+
+
+# Per-route request counts, status classes, latency histograms and in-flight gauges at /metrics
+instrument_metrics(app)
@@ -9,7 +9,10 @@
 from fastapi import FastAPI
 from pydantic import BaseModel, HttpUrl
 
+from openapi_cache import cache_openapi
+
 app = FastAPI()
+openapi = cache_openapi(app)
 
 
 class Image(BaseModel):
@@ -11,7 +11,11 @@ from typing import Annotated
 from fastapi import Body, FastAPI
 from pydantic import BaseModel, Field
 
+from openapi_cache import cache_openapi
+
 app = FastAPI()
+# /openapi.json is generated at startup and served pre-serialized (see openapi_cache.py)
+openapi = cache_openapi(app)
 
 
 class Item(BaseModel):
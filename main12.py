@@ -14,6 +14,11 @@ and validating data from HTTP cookies. It includes three endpoints:
    Illustrates an incorrect approach to extract cookies directly using a Pydantic model.
    This endpoint demonstrates why explicit use of `Cookie` parameters is necessary.
 
+/extract-with-cookie/ also resolves `session_id` to a session through the `current_session`
+dependency (401 if the id is unknown). Sessions live in a session store (STORAGE_BACKEND,
+see storage.py) behind an in-process LRU/TTL cache (see session_cache.py), so a known session
+costs one dict lookup. GET /sessions/stats shows the cache's hit/miss/eviction counters.
+
 The code highlights the benefits of using `Cookie` parameters for automatic extraction, 
 validation, and inclusion in Swagger documentation.
 
@@ -22,10 +27,27 @@ curl -X GET "http://127.0.0.1:8000/extract-with-cookie/" \
 -H "Cookie: session_id=abc123; fatebook_tracker=tracker123; googall_tracker=tracker456"
 
 """
-from fastapi import FastAPI, Cookie, Request
+from typing import Annotated, Any
+
+from fastapi import FastAPI, Cookie, Depends, HTTPException, Request
 from pydantic import BaseModel, ValidationError
 
+from cookie_parser import parse_cookie_header
+from openapi_cache import cache_openapi
+from session_cache import SessionCache
+from storage import close_pools, open_document_backend
+
 app = FastAPI()
+openapi = cache_openapi(app)
+
+sessions_db = open_document_backend("main12_sessions")
+session_cache = SessionCache(sessions_db.get)
+
+async def current_session(session_id: Annotated[str, Cookie()]) -> dict[str, Any]:
+    session = await session_cache.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=401, detail="Unknown session")
+    return session
 
 # Define the Pydantic model for cookies
 class Cookies(BaseModel):
@@ -38,6 +60,7 @@ async def extract_with_cookie(
     session_id: str = Cookie(...),
     fatebook_tracker: str | None = Cookie(default=None),
     googall_tracker: str | None = Cookie(default=None),
+    session: dict[str, Any] = Depends(current_session),
 ):
     # Use the Pydantic model for structured validation
     cookies = Cookies(
@@ -45,7 +68,20 @@ async def extract_with_cookie(
         fatebook_tracker=fatebook_tracker,
         googall_tracker=googall_tracker,
     )
-    return {"cookies": cookies.dict()}
+    return {"cookies": cookies.dict(), "session": session}
+
+@app.get("/sessions/stats")
+async def session_stats():
+    return session_cache.stats()
+
+@app.on_event("startup")
+async def seed_sessions():
+    # The session used in the curl example above
+    await sessions_db.put("abc123", {"username": "johndoe"})
+
+@app.on_event("shutdown")
+async def close_session_store():
+    close_pools()
 
 
 
@@ -55,11 +91,8 @@ async def extract_without_cookie(request: Request):
     if not cookie_header:
         return {"error": "No cookies provided"}
 
-    # Parse cookies manually
-    cookies_dict = {}
-    for cookie in cookie_header.split("; "):
-        key, value = cookie.split("=")
-        cookies_dict[key] = value
+    # Parse cookies manually (RFC 6265, memoized per header; see cookie_parser.py)
+    cookies_dict = parse_cookie_header(cookie_header)
 
     # Validate cookies using Pydantic
     try:
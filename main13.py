@@ -9,14 +9,34 @@ Example: Query parameters describe what data you want to retrieve.
     User-Agent (browser or client details).
     Content-Type (data format being sent).
 
+3. GET /catalog/ answers 304 with no body when the client's copy is current (see
+   conditional.py): its `If-None-Match` matches the ETag or, without one, the catalog
+   hasn't changed since `If-Modified-Since` (also available as CommonHeaders.if_modified_since):
+    curl -i http://127.0.0.1:8000/catalog/ -H "save-data: false"
+    curl -i http://127.0.0.1:8000/catalog/ -H "save-data: false" -H 'If-None-Match: <ETag from above>'
+    curl -i http://127.0.0.1:8000/catalog/ -H "save-data: false" -H "If-Modified-Since: <Last-Modified from above>"
+
+4. Requests are traced (see tracing.py): a `traceparent` header, also available as
+   `CommonHeaders.traceparent`, continues the caller's trace, and sampled requests record
+   spans for routing, validation, the handler and serialization to traces.jsonl.
+    curl http://127.0.0.1:8000/items/ -H "save-data: false" \
+        -H "traceparent: 00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
 """
 
 from typing import Annotated
 
-from fastapi import FastAPI, Header
+from fastapi import FastAPI, Header, Request
 from pydantic import BaseModel
 
+from conditional import json_body, make_representation, respond
+from openapi_cache import cache_openapi
+from tracing import instrument
+
 app = FastAPI()
+openapi = cache_openapi(app)
+# Before the routes below, so they get the phase spans
+tracer = instrument(app)
 
 
 class CommonHeaders(BaseModel):
@@ -29,4 +49,15 @@ class CommonHeaders(BaseModel):
 
 @app.get("/items/")
 async def read_items(headers: Annotated[CommonHeaders, Header()]):
-    return headers
\ No newline at end of file
+    return headers
+
+
+# Built once: the catalog only changes when the program is restarted
+catalog = make_representation(json_body([{"name": "Foo", "price": 50.2}, {"name": "Bar", "price": 62.0}]))
+
+
+@app.get("/catalog/")
+async def read_catalog(headers: Annotated[CommonHeaders, Header()], request: Request):
+    # `respond` checks If-None-Match first and only falls back to If-Modified-Since
+    # (headers.if_modified_since) when there is none
+    return respond(request, catalog)
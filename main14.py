@@ -5,16 +5,35 @@ as well as examples of not using `response_model`. It includes:
 
 1. POST /items/ - Create an item (with and without `response_model`).
 2. GET /items/ - Retrieve a list of items (with and without `response_model`).
+   `GET /items/?stream=true` (or `Accept: application/x-ndjson`) streams the list as NDJSON.
 3. POST /user/ - Create a user with secure response filtering.
+4. POST /users/register, POST /users/login - Store users with scrypt password hashes.
+   GET /users/hashing/metrics shows how busy the hashing pool is.
+
+Password hashing runs in a separate, bounded process pool (see password_hashing.py), so a burst
+of signups doesn't slow down other requests. When the pool and its queue are full, register
+and login answer 503 with Retry-After right away.
+
+Routes are `FastResponseRoute`s (see fast_response.py): when a route returns an object that is
+already validated, as POST /items/, POST /user/ and POST /users/register do, it is serialized
+straight to JSON (only the UserOut fields for /user/) instead of being validated against the
+response_model a second time.
 
 Each section contains sample requests and responses for clarity.
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel, EmailStr
 from typing import Any
 
+from fast_response import FastResponseRoute
+from openapi_cache import cache_openapi
+from password_hashing import HasherSaturated, PasswordHasher
+from streaming import ndjson_response, wants_ndjson
+
 app = FastAPI()
+openapi = cache_openapi(app)
+app.router.route_class = FastResponseRoute
 
 # ------------------------------------------------------------
 # Item Models and Endpoints
@@ -108,10 +127,13 @@ async def create_item(item: Item) -> Any:
     return item
 
 @app.get("/items/", response_model=list[Item])
-async def read_items() -> Any:
+async def read_items(request: Request, stream: bool = False) -> Any:
     """
     Retrieve a list of items (with `response_model`).
 
+    With `?stream=true` or `Accept: application/x-ndjson` each item is validated
+    and sent as its own line instead of building the whole list first.
+
     Response:
     [
         {
@@ -130,10 +152,13 @@ async def read_items() -> Any:
         }
     ]
     """
-    return [
+    items = [
         {"name": "Portal Gun", "price": 42.0},
         {"name": "Plumbus", "price": 32.0},
     ]
+    if wants_ndjson(request, stream):
+        return ndjson_response(items, Item)
+    return items
 
 # ------------------------------------------------------------
 # User Models and Endpoints
@@ -196,3 +221,98 @@ async def create_user(user: UserIn) -> Any:
     }
     """
     return user
+
+# ------------------------------------------------------------
+# Registration and Login
+# ------------------------------------------------------------
+
+class UserInDB(UserOut):
+    hashed_password: str
+
+class Credentials(BaseModel):
+    username: str
+    password: str
+
+users_db: dict[str, UserInDB] = {}
+password_hasher = PasswordHasher()
+
+# Checked when the username is unknown, so unknown and known users take equally long
+_UNKNOWN_USER_HASH = "scrypt$16384$8$1$AAAAAAAAAAAAAAAAAAAAAA==$F166YLasXyTXFgv0hPatNM9XlWMhByy6cgtw9Cw6fLA="
+
+def _saturated(e: HasherSaturated) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+@app.post("/users/register", response_model=UserOut, status_code=201)
+async def register_user(user: UserIn) -> Any:
+    """
+    Register a user; only a scrypt hash of the password is kept.
+
+    Request:
+    {
+        "username": "johndoe",
+        "password": "supersecret",
+        "email": "john.doe@example.com",
+        "full_name": "John Doe"
+    }
+
+    Response (201):
+    {
+        "username": "johndoe",
+        "email": "john.doe@example.com",
+        "full_name": "John Doe"
+    }
+
+    409 if the username is taken, 503 if the hashing pool is saturated.
+    """
+    if user.username in users_db:
+        raise HTTPException(status_code=409, detail="Username already registered")
+    try:
+        hashed_password = await password_hasher.hash(user.password)
+    except HasherSaturated as e:
+        raise _saturated(e)
+    # Another request may have registered the name while this one was hashing
+    if user.username in users_db:
+        raise HTTPException(status_code=409, detail="Username already registered")
+    stored = UserInDB(**user.model_dump(exclude={"password"}), hashed_password=hashed_password)
+    users_db[user.username] = stored
+    return stored
+
+@app.post("/users/login")
+async def login(credentials: Credentials):
+    """
+    Check a username and password.
+
+    Response: {"username": "johndoe"}, or 401 if either is wrong.
+    """
+    user = users_db.get(credentials.username)
+    try:
+        valid = await password_hasher.verify(
+            credentials.password, user.hashed_password if user else _UNKNOWN_USER_HASH
+        )
+    except HasherSaturated as e:
+        raise _saturated(e)
+    if user is None or not valid:
+        raise HTTPException(status_code=401, detail="Incorrect username or password")
+    return {"username": user.username}
+
+@app.get("/users/hashing/metrics")
+async def hashing_metrics():
+    """
+    Utilisation of the password hashing pool.
+
+    Response:
+    {
+        "workers": 2, "max_queue": 8, "running": 1, "queued": 0, "utilisation": 0.5,
+        "peak_in_flight": 10, "completed": 42, "rejected": 3,
+        "avg_kdf_seconds": 0.071, "avg_wait_seconds": 0.35
+    }
+    """
+    return password_hasher.metrics()
+
+@app.on_event("startup")
+async def start_password_hasher():
+    await password_hasher.warm_up()
+
+@app.on_event("shutdown")
+async def stop_password_hasher():
+    password_hasher.shutdown()
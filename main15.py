@@ -1,14 +1,28 @@
 """
 This program defines an API endpoint /login/ that expects a POST request with form data.
- The FormData Pydantic model is used to structure and validate the incoming data. 
+ The FormData Pydantic model is used to structure and validate the incoming data.
+
+/login/ answers with a signed session token (see session_tokens.py), also set as the
+`session` cookie. Routes that need a logged-in user depend on `current_session`, which
+checks the token's signature and expiry itself: no session store is involved, and a token
+seen recently is answered from a small cache.
+    curl -X POST http://127.0.0.1:8000/login/ -d "username=johndoe&password=secret"
+    curl http://127.0.0.1:8000/me/ -H "Authorization: Bearer <access_token>"
+
+This demo accepts any password; main14.py's /users/login shows checking one against a hash.
 """
 
 from typing import Annotated
 
-from fastapi import FastAPI, Form
+from fastapi import Cookie, Depends, FastAPI, Form, Header, HTTPException, Response
 from pydantic import BaseModel
 
+from openapi_cache import cache_openapi
+from session_tokens import InvalidToken, TokenClaims, TokenSigner
+
 app = FastAPI()
+openapi = cache_openapi(app)
+token_signer = TokenSigner()
 
 # Define the FormData model for validation
 class FormData(BaseModel):
@@ -19,9 +33,40 @@ class FormData(BaseModel):
 
 @app.post("/login/")
 async def login(
+    response: Response,
     username: Annotated[str, Form()],
     password: Annotated[str, Form()],
 ):
     # Validate using the FormData Pydantic model
     data = FormData(username=username, password=password)
-    return data.dict()
+    token = token_signer.issue(data.username)
+    response.set_cookie("session", token, max_age=token_signer.ttl, httponly=True, samesite="lax")
+    return {
+        "username": data.username,
+        "access_token": token,
+        "token_type": "bearer",
+        "expires_in": token_signer.ttl,
+    }
+
+
+async def current_session(
+    authorization: Annotated[str | None, Header()] = None,
+    session: Annotated[str | None, Cookie()] = None,
+) -> TokenClaims:
+    """The verified session from `Authorization: Bearer <token>` or the `session` cookie."""
+    token = session
+    if authorization is not None:
+        scheme, _, credentials = authorization.partition(" ")
+        if scheme.lower() == "bearer":
+            token = credentials
+    if not token:
+        raise HTTPException(status_code=401, detail="Not logged in", headers={"WWW-Authenticate": "Bearer"})
+    try:
+        return token_signer.verify(token)
+    except InvalidToken as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+
+
+@app.get("/me/")
+async def read_me(claims: Annotated[TokenClaims, Depends(current_session)]):
+    return {"username": claims.subject, "expires_at": claims.expires_at}
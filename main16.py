@@ -8,14 +8,38 @@ UploadFile:
 Provides a lightweight object with methods to access the file contents without loading the entire file into memory.
 Better for handling larger files.
 
+Streaming (POST /files/stream):
+Reads the raw request body chunk by chunk, hashing it and writing it to disk as it arrives
+(see uploads.py). Memory use stays the same whatever the file size, and uploads over
+MAX_UPLOAD_BYTES are rejected with 413 as soon as the limit is crossed.
+    curl -X POST "http://127.0.0.1:8000/files/stream?filename=big.iso" --data-binary @big.iso
+The file is stored in UPLOAD_DIR under a random name, returned as `file_id`.
+
+Resumable uploads (/uploads/...):
+Send a large file in pieces with Content-Range and continue after a dropped connection.
+Finished files are stored once per sha256 (see upload_sessions.py).
+    POST /uploads/?filename=big.iso&size=4000000000   -> {"upload_id": "...", "offset": 0}
+    PUT  /uploads/{upload_id}  Content-Range: bytes 0-8388607/4000000000
+    HEAD /uploads/{upload_id}  -> Upload-Offset: 8388608
+    POST /uploads/{upload_id}/finalize                -> {"sha256": "...", "size": 4000000000}
+
 Go to http://127.0.0.1:8000/docs to try uploading file
 """
 
-from typing import Annotated
+import asyncio
+import hashlib
+import os
+from typing import Annotated, BinaryIO
+
+from anyio import to_thread
+from fastapi import FastAPI, File, Header, HTTPException, Query, Request, Response, UploadFile
 
-from fastapi import FastAPI, File, UploadFile
+from openapi_cache import cache_openapi
+from upload_sessions import InvalidRange, SessionConflict, SessionNotFound, UploadSessions, run_session_gc
+from uploads import MAX_UPLOAD_BYTES, UploadTooLarge, save_stream
 
 app = FastAPI()
+openapi = cache_openapi(app)
 
 
 @app.post("/files/")
@@ -23,6 +47,105 @@ async def create_file(file: Annotated[bytes, File()]):
     return {"file_size": len(file)}
 
 
+def _hash_file(file: BinaryIO) -> tuple[int, str]:
+    """Size and sha256 of a file, read in 1 MiB chunks. Blocking; runs in the threadpool."""
+    hasher = hashlib.sha256()
+    size = 0
+    while chunk := file.read(1024 * 1024):
+        hasher.update(chunk)
+        size += len(chunk)
+    return size, hasher.hexdigest()
+
+
 @app.post("/uploadfile/")
 async def create_upload_file(file: UploadFile):
-    return {"filename": file.filename}
\ No newline at end of file
+    # Read the spooled file back in chunks, in one threadpool hop, instead of all at once
+    size, sha256 = await to_thread.run_sync(_hash_file, file.file)
+    return {"filename": file.filename, "file_size": size, "sha256": sha256}
+
+
+@app.post("/files/stream")
+async def create_file_streaming(request: Request, filename: str | None = None):
+    content_length = request.headers.get("content-length")
+    if content_length is not None:
+        if not content_length.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid Content-Length header")
+        if int(content_length) > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"Upload exceeds the maximum size of {MAX_UPLOAD_BYTES} bytes")
+    try:
+        stored = await save_stream(request.stream())
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    # Stored under a random name, so a client-supplied filename can't clash or escape UPLOAD_DIR;
+    # `file_id` is that name, `filename` is only informational
+    return {"file_id": os.path.basename(stored.path), "filename": filename, "file_size": stored.size,
+            "sha256": stored.sha256}
+
+# ----------------------
+# Resumable uploads
+# ----------------------
+
+upload_sessions = UploadSessions()
+
+
+def _session_error(e: Exception) -> HTTPException:
+    if isinstance(e, SessionNotFound):
+        return HTTPException(status_code=404, detail="Upload session not found")
+    if isinstance(e, SessionConflict):
+        return HTTPException(status_code=409, detail=str(e), headers={"Upload-Offset": str(e.offset)})
+    if isinstance(e, UploadTooLarge):
+        return HTTPException(status_code=413, detail=str(e))
+    return HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/uploads/", status_code=201)
+async def create_upload_session(filename: str | None = None, size: Annotated[int | None, Query(ge=0)] = None,
+                                sha256: str | None = None):
+    try:
+        return await to_thread.run_sync(upload_sessions.create, filename, size, sha256)
+    except (UploadTooLarge, ValueError) as e:
+        raise _session_error(e)
+
+
+@app.head("/uploads/{upload_id}")
+@app.get("/uploads/{upload_id}")
+async def get_upload_session(upload_id: str, response: Response):
+    try:
+        status = await to_thread.run_sync(upload_sessions.status, upload_id)
+    except SessionNotFound as e:
+        raise _session_error(e)
+    response.headers["Upload-Offset"] = str(status["offset"])
+    return status
+
+
+@app.put("/uploads/{upload_id}")
+async def upload_chunk(upload_id: str, request: Request, content_range: Annotated[str, Header()]):
+    try:
+        offset = await upload_sessions.append(upload_id, content_range, request.stream())
+    except (SessionNotFound, SessionConflict, InvalidRange, UploadTooLarge) as e:
+        raise _session_error(e)
+    return Response(status_code=204, headers={"Upload-Offset": str(offset)})
+
+
+@app.post("/uploads/{upload_id}/finalize")
+async def finalize_upload(upload_id: str):
+    try:
+        return await upload_sessions.finalize(upload_id)
+    except (SessionNotFound, SessionConflict) as e:
+        raise _session_error(e)
+
+
+gc_task: asyncio.Task | None = None
+
+@app.on_event("startup")
+async def start_session_gc():
+    global gc_task
+    # Not at import time: importing main16 shouldn't create directories
+    await to_thread.run_sync(upload_sessions.create_directories)
+    gc_task = asyncio.create_task(run_session_gc(upload_sessions))
+
+
+@app.on_event("shutdown")
+async def stop_session_gc():
+    if gc_task is not None:
+        gc_task.cancel()
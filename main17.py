@@ -13,14 +13,49 @@ This isn't much significant in the longer run, it's just another way of decorati
 Endpoints:
 1. Create an item.
 2. Get an item by ID.
-3. List all items.
+3. List all items (optionally filtered by name or price range). Send `Accept: application/x-ndjson`
+   or `?stream=true` to stream the list one JSON document per line (see streaming.py).
+
+Items live in an ItemStore (see item_store.py): lookups by ID use a hash index instead of
+scanning a list, and creating an item with an ID that already exists returns 409.
+Set STORAGE_BACKEND=sqlite to keep them in a SQLite file instead (see storage.py).
+
+GET responses carry an ETag and Last-Modified. Send them back as If-None-Match or
+If-Modified-Since and, while the item (or for the list, the store) hasn't changed, the
+answer is a body-less 304. The body and ETag are built once per stored version and reused
+until the next write (see conditional.py).
 """
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from math import isfinite
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field, TypeAdapter
 from typing import List
 
+from conditional import RepresentationCache, conditional_get
+from item_store import DuplicateKeyError
+from openapi_cache import cache_openapi
+from storage import close_pools, open_item_backend
+from streaming import ndjson_response, wants_ndjson
+
 app = FastAPI()
+# /openapi.json is generated at startup and served pre-serialized (see openapi_cache.py)
+openapi = cache_openapi(app)
+
+
+@app.exception_handler(RequestValidationError)
+async def validation_error(request: Request, exc: RequestValidationError):
+    # Like FastAPI's default handler, except that a NaN/Infinity input (refused by the
+    # models below) is echoed as a string: JSON can't carry it, and rendering it would 500
+    errors = [
+        {**error, "input": str(error["input"])}
+        if isinstance(error.get("input"), float) and not isfinite(error["input"]) else error
+        for error in exc.errors()
+    ]
+    return JSONResponse(status_code=422, content={"detail": jsonable_encoder(errors)})
 
 # ----------------------
 # Pydantic Models
@@ -30,11 +65,15 @@ class Item(BaseModel):
     id: int
     name: str
     description: str | None = None
-    price: float
-    tax: float | None = None
+    # NaN/Infinity can't be sorted in the price index or written as JSON
+    price: float = Field(allow_inf_nan=False)
+    tax: float | None = Field(default=None, allow_inf_nan=False)
 
-# In-memory database for demonstration purposes
-items_db: List[Item] = []
+# Database for demonstration purposes, indexed by ID, name and price
+items_db = open_item_backend(Item, table="main17_items")
+# Serialized GET responses, reused while the stored version is unchanged
+representations = RepresentationCache()
+item_list_adapter = TypeAdapter(List[Item])
 
 # ----------------------
 # Path Operations
@@ -49,6 +88,7 @@ items_db: List[Item] = []
     description="This endpoint allows you to create a new item by providing the item's details. "
                 "The created item will be returned in the response.",
     response_description="The created item, including its ID, name, description, price, and tax.",
+    responses={409: {"description": "An item with this ID already exists"}},
 )
 async def create_item(item: Item) -> Item:
     """
@@ -71,8 +111,13 @@ async def create_item(item: Item) -> Item:
         "price": 1500.00,
         "tax": 225.00
     }
+
+    Response (409) if an item with the same ID was already created.
     """
-    items_db.append(item)
+    try:
+        await items_db.add(item)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail=f"Item with ID {item.id} already exists")
     return item
 
 
@@ -85,7 +130,7 @@ async def create_item(item: Item) -> Item:
     description="Fetch the details of a specific item by providing its unique ID.",
     response_description="The item details, including its ID, name, description, price, and tax.",
 )
-async def get_item(item_id: int) -> Item:
+async def get_item(request: Request, item_id: int) -> Item:
     """
     Retrieves an item by its ID.
 
@@ -94,11 +139,18 @@ async def get_item(item_id: int) -> Item:
 
     Response:
     - 200: The details of the requested item.
+    - 304: If-None-Match / If-Modified-Since show the client's copy is current.
     - 404: If the item is not found.
     """
-    for item in items_db:
-        if item.id == item_id:
-            return item
+    async def render() -> bytes | None:
+        item = await items_db.get(item_id)
+        return None if item is None else item.__pydantic_serializer__.to_json(item)
+
+    response = await conditional_get(
+        request, representations, ("item", item_id), version=lambda: items_db.version_info(item_id), render=render
+    )
+    if response is not None:
+        return response
     raise HTTPException(status_code=404, detail=f"Item with ID {item_id} not found")
 
 
@@ -111,14 +163,49 @@ async def get_item(item_id: int) -> Item:
     description="Retrieve a list of all items currently stored in the database.",
     response_description="A list of all items, with their IDs, names, descriptions, prices, and taxes.",
 )
-async def list_items() -> List[Item]:
+async def list_items(
+    request: Request,
+    name: str | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    stream: bool = False,
+) -> List[Item]:
     """
     Lists all items in the database.
 
+    Query Parameters (optional):
+    - name (str): Only items with exactly this name.
+    - min_price / max_price (float): Only items priced within this range (inclusive).
+    - stream (bool): Stream the items as NDJSON (same as `Accept: application/x-ndjson`).
+
     Response:
     - 200: A list of all items.
+    - 304: If-None-Match / If-Modified-Since show the client's copy is current (not for NDJSON).
     """
-    return items_db
+    if wants_ndjson(request, stream):
+        if name is None and min_price is None and max_price is None:
+            return ndjson_response(items_db.iterate(), Item)
+        return ndjson_response(await find_items(name, min_price, max_price), Item)
+
+    async def render() -> bytes:
+        return item_list_adapter.dump_json(await find_items(name, min_price, max_price))
+
+    # Each combination of filters is its own resource; all of them change with the store
+    resource = ("items", name, min_price, max_price)
+    return await conditional_get(request, representations, resource, version=items_db.version_info, render=render)
+
+
+async def find_items(name: str | None, min_price: float | None, max_price: float | None) -> List[Item]:
+    if min_price is not None or max_price is not None:
+        low = min_price if min_price is not None else float("-inf")
+        high = max_price if max_price is not None else float("inf")
+        items = await items_db.find_by_price_range(low, high)
+        if name is not None:
+            items = [item for item in items if item.name == name]
+        return items
+    if name is not None:
+        return await items_db.find_by_name(name)
+    return await items_db.values()
 
 # ----------------------
 # Example Data for Testing
@@ -126,8 +213,14 @@ async def list_items() -> List[Item]:
 
 @app.on_event("startup")
 async def populate_example_data():
-    """Pre-populates the in-memory database with example items for testing."""
-    items_db.extend([
+    """Pre-populates the database with example items for testing."""
+    for item in [
         Item(id=1, name="Phone", description="A smartphone with a great camera", price=700.00, tax=105.00),
         Item(id=2, name="Tablet", description="A tablet for media consumption", price=300.00, tax=45.00),
-    ])
+    ]:
+        await items_db.put(item)
+
+
+@app.on_event("shutdown")
+def close_database():
+    close_pools()
@@ -1,19 +1,40 @@
 """
 Unified Program Demonstrating `jsonable_encoder`:
 1. Example 1: Stores events using `jsonable_encoder` to ensure JSON compatibility.
+   Events are indexed by date (see event_store.py):
+   - GET /events?from=2025-01-01T00:00:00&to=2025-02-01T00:00:00&limit=100 - events in a date range, oldest first.
+   - GET /events/stats?bucket=day - number of events per hour or per day.
+   - Set EVENT_RETENTION_DAYS to evict older events in the background.
 2. Example 2: Updates and retrieves items using `jsonable_encoder`.
 
 Key Feature:
 `jsonable_encoder` ensures that complex types (e.g., `datetime`, `None`) are converted into JSON-compatible formats.
+The handlers below use `encode_for_storage` (see encoders.py), which gives the same result for pydantic models
+but calls pydantic-core's serializer directly instead of walking the dumped dict a second time in Python.
+The encoded dicts are what gets stored, so the same data can live in memory or, with
+STORAGE_BACKEND=sqlite, in a SQLite file (see storage.py).
+
+GET /items/{item_id}, GET /events and GET /events/stats answer If-None-Match / If-Modified-Since
+with a body-less 304 while the data hasn't changed. Each response body and its ETag are built
+once per stored version and reused until the next write (see conditional.py).
 """
 
-from datetime import datetime
-from fastapi import FastAPI
-from fastapi.encoders import jsonable_encoder
+import asyncio
+import os
+from datetime import datetime, timedelta
+from fastapi import FastAPI, HTTPException, Query, Request
 from pydantic import BaseModel
-from typing import List
+from typing import Annotated, List, Literal
+
+from conditional import RepresentationCache, conditional_get, json_body
+from encoders import encode_for_storage
+from fast_response import serializer_for
+from event_store import run_retention
+from openapi_cache import cache_openapi
+from storage import close_pools, open_document_backend, open_event_backend
 
 app = FastAPI()
+openapi = cache_openapi(app)
 
 # ----------------------
 # Example 1: Event Management
@@ -23,15 +44,47 @@ class Event(BaseModel):
     name: str
     date: datetime
 
-events = {}
+events = open_event_backend("main18_event_log")
+# Serialized GET responses, reused while the stored version is unchanged
+representations = RepresentationCache()
 
 @app.post("/events/{id}")
-def create_event(id: str, event: Event):
-    # Convert to JSON-compatible format
-    json_event = jsonable_encoder(event)
-    events[id] = json_event
+async def create_event(id: str, event: Event):
+    # Convert to JSON-compatible format (same output as jsonable_encoder(event))
+    json_event = encode_for_storage(event)
+    await events.put(id, json_event, event.date)
     return {"status": "Event stored", "event": json_event}
 
+@app.get("/events")
+async def list_events(
+    request: Request,
+    from_: Annotated[datetime | None, Query(alias="from")] = None,
+    to: datetime | None = None,
+    limit: Annotated[int, Query(gt=0, le=1000)] = 100,
+):
+    # Naive datetimes are treated as UTC; `to` is exclusive
+    async def render() -> bytes:
+        return json_body([{"id": key, "event": event} for key, event in await events.range(from_, to, limit)])
+
+    resource = ("events", from_, to, limit)
+    return await conditional_get(request, representations, resource, version=events.version_info, render=render)
+
+@app.get("/events/stats")
+async def event_stats(
+    request: Request,
+    bucket: Literal["hour", "day"] = "hour",
+    from_: Annotated[datetime | None, Query(alias="from")] = None,
+    to: datetime | None = None,
+):
+    async def render() -> bytes:
+        counts = await events.stats(bucket, from_, to)
+        return json_body(
+            {"bucket": bucket, "counts": [{"start": start, "count": count} for start, count in counts.items()]}
+        )
+
+    resource = ("event-stats", bucket, from_, to)
+    return await conditional_get(request, representations, resource, version=events.version_info, render=render)
+
 # ----------------------
 # Example 2: Item Management
 # ----------------------
@@ -43,20 +96,35 @@ class Item(BaseModel):
     tax: float = 10.5
     tags: list[str] = []
 
-items = {
+items = open_document_backend("main18_items")
+
+example_items = {
     "foo": {"name": "Foo", "price": 50.2},
     "bar": {"name": "Bar", "description": "The bartenders", "price": 62, "tax": 20.2},
     "baz": {"name": "Baz", "description": None, "price": 50.2, "tax": 10.5, "tags": []},
 }
 
 @app.get("/items/{item_id}", response_model=Item)
-async def read_item(item_id: str):
-    return items[item_id]
+async def read_item(request: Request, item_id: str):
+    async def render() -> bytes | None:
+        item = await items.get(item_id)
+        if item is None:
+            return None
+        # Stored items are dicts; validate against Item like response_model would
+        _, serialize = serializer_for(dict, Item)
+        return serialize(item)
+
+    response = await conditional_get(
+        request, representations, ("item", item_id), version=lambda: items.version_info(item_id), render=render
+    )
+    if response is None:
+        raise HTTPException(status_code=404, detail=f"Item {item_id} not found")
+    return response
 
 @app.put("/items/{item_id}", response_model=Item)
 async def update_item(item_id: str, item: Item):
-    update_item_encoded = jsonable_encoder(item)
-    items[item_id] = update_item_encoded
+    update_item_encoded = encode_for_storage(item)
+    await items.put(item_id, update_item_encoded)
     return update_item_encoded
 
 # ----------------------
@@ -65,7 +133,28 @@ async def update_item(item_id: str, item: Item):
 
 @app.on_event("startup")
 async def populate_example_data():
-    # Populate events
-    events["1"] = jsonable_encoder(
-        Event(name="FastAPI Meetup", date=datetime(2025, 1, 12, 14, 30))
-    )
+    # Populate items and events, keeping anything already stored
+    await items.put_many(example_items, replace=False)
+    meetup = Event(name="FastAPI Meetup", date=datetime(2025, 1, 12, 14, 30))
+    await events.put_many({"1": (encode_for_storage(meetup), meetup.date)}, replace=False)
+
+# ----------------------
+# Event Retention
+# ----------------------
+
+EVENT_RETENTION_DAYS = os.environ.get("EVENT_RETENTION_DAYS")
+retention_task: asyncio.Task | None = None
+
+@app.on_event("startup")
+async def start_retention():
+    global retention_task
+    if EVENT_RETENTION_DAYS:
+        max_age = timedelta(days=float(EVENT_RETENTION_DAYS))
+        retention_task = asyncio.create_task(run_retention(events.evict_before, max_age))
+
+
+@app.on_event("shutdown")
+async def close_database():
+    if retention_task is not None:
+        retention_task.cancel()
+    close_pools()
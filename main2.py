@@ -2,9 +2,13 @@
 This program explains the basic of path operations
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from enum import Enum
 
+from file_serving import FILES_ROOT, FileCache, serve_file
+from openapi_cache import cache_openapi
+from radix_router import compile_routes
+
 class ModelName(str, Enum):
     alexnet = "alexnet"
     resnet = "resnet"
@@ -12,6 +16,10 @@ class ModelName(str, Enum):
 
 
 app = FastAPI()
+openapi = cache_openapi(app)
+# Static segments are matched before parameters, whatever the declaration order;
+# duplicate routes (like the second read_item below) are reported at startup
+compile_routes(app)
 
 
 @app.get("/models/{model_name}")
@@ -41,9 +49,16 @@ async def read_item(item_id:int):
 async def read_item(item_id:int):
     return {"item_id": item_id+5}
 
+# Files under FILES_ROOT, with Range, ETag and Last-Modified (see file_serving.py)
+files = FileCache(FILES_ROOT)
+
+
 @app.get("/files/{file_path:path}")
-async def read_file(file_path: str):
-    return {"file_path": file_path}
+async def read_file(file_path: str, request: Request):
+    response = await serve_file(request, files, file_path)
+    if response is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return response
 
 """
 Because path operations are evaluated in order, 
@@ -51,4 +66,7 @@ you need to make sure that the path for /users/me is declared before the one for
 
 Otherwise, the path for /users/{user_id} would match also for /users/me,
  "thinking" that it's receiving a parameter user_id with a value of "me".
+
+With compile_routes(app) (see radix_router.py) /users/me wins either way, because static
+segments are tried before parameters; the shadowed route is still logged at startup.
 """
\ No newline at end of file
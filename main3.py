@@ -7,22 +7,44 @@ This program demonstrates the use of:
 3. Automatic validation of parameters by FastAPI.
 
 Endpoints:
-1. **GET /items/**: Retrieve items from a database with pagination (`skip`, `limit`).
+1. **GET /items/**: Retrieve items from a database with pagination (`skip`, `limit`), or with
+   cursor pagination (`cursor`, `limit`) using the `X-Next-Cursor` response header.
 2. **GET /itemsnn/{item_id}**: Fetch item details using `item_id` and optional `q` and `short` query parameters.
 3. **GET /itemsrq/{item_id}**: Retrieve an item with a required query parameter `needy`.
 
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Response
+
+from openapi_cache import cache_openapi
+from pagination import InvalidCursor, decode_cursor, encode_cursor
 
 app = FastAPI()
+openapi = cache_openapi(app)
 
 fake_items_db = [{"item_name": "Foo"}, {"item_name": "Bar"}, {"item_name": "Baz"}]
 
 
 @app.get("/items/")
-async def read_item(skip: int = 0, limit: int = 10):
-    return fake_items_db[skip : skip + limit]
+async def read_item(response: Response, skip: int = 0, limit: int = 10, cursor: str | None = None):
+    # fake_items_db is append-only, so an item's position never changes and works as the key,
+    # like an auto-increment primary key would in a real database
+    if cursor is not None:
+        try:
+            skip = decode_cursor(cursor) + 1
+        except (InvalidCursor, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    page = fake_items_db[skip : skip + limit]
+    last = skip + len(page) - 1
+    if page and last + 1 < len(fake_items_db):
+        response.headers["X-Next-Cursor"] = encode_cursor(last)
+    return page
+
+#Cursor pagination: every page that has more items after it carries an X-Next-Cursor header.
+# Send it back as ?cursor=... to get the next page. The cursor is signed, so it can't be edited,
+# and the next page starts right after the last item seen, however far into the list it is.
+#http://127.0.0.1:8000/items/?limit=2 - [{"item_name":"Foo"},{"item_name":"Bar"}] with X-Next-Cursor: MQ.xxxx
+#http://127.0.0.1:8000/items/?limit=2&cursor=MQ.xxxx - [{"item_name":"Baz"}]
 
 #http://127.0.0.1:8000/items/book - 
 # {"detail":[{"type":"int_parsing","loc":["path","item_id"],"msg":"Input should be a valid integer, unable to parse string as an integer","input":"book"}]}
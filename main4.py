@@ -8,11 +8,18 @@ if a tax is provided. The `Item` model uses Pydantic for data validation.
 Endpoints:
 1. POST /items/ - Accepts item details (name, description, price, tax) and returns the item data.
    - If `tax` is provided, it calculates the final price (`price + tax`) and includes it in the response.
+2. POST /items/batch - Accepts many items at once (a JSON array, or NDJSON with `Content-Type: application/x-ndjson`)
+   and returns the same result for each one, in order. Invalid rows get their own errors instead of failing
+   the whole batch (see batch_pricing.py). Bodies over BATCH_MAX_BYTES or BATCH_MAX_ROWS get 413.
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
+from batch_pricing import MAX_BATCH_BYTES, BatchBodyError, BatchTooLarge, price_batch, read_batch_body, validate_batch
+from openapi_cache import cache_openapi
+
 class Item(BaseModel):
     name:str
     description:str| None = None
@@ -20,6 +27,7 @@ class Item(BaseModel):
     tax:float| None=None
 
 app = FastAPI()
+openapi = cache_openapi(app)
 
 @app.post("/items/")
 async def create_item(item: Item):
@@ -27,4 +35,41 @@ async def create_item(item: Item):
     if item.tax:
         final_price = item.tax + item.price
         item_dict.update({'final_price':final_price})
-    return item_dict
\ No newline at end of file
+    return item_dict
+
+
+@app.post(
+    "/items/batch",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": Item.model_json_schema()}},
+                "application/x-ndjson": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def create_items_batch(request: Request):
+    content_length = request.headers.get("content-length")
+    if content_length is not None and not content_length.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid Content-Length")
+    if content_length is not None and int(content_length) > MAX_BATCH_BYTES:
+        raise HTTPException(status_code=413, detail=f"Batch body is larger than {MAX_BATCH_BYTES} bytes")
+    ndjson = request.headers.get("content-type", "").startswith("application/x-ndjson")
+    try:
+        body = await read_batch_body(request.stream())
+        items, errors = validate_batch(Item, body, ndjson=ndjson)
+    except BatchTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except BatchBodyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # The results are plain dicts already, so skip jsonable_encoder
+    return JSONResponse(price_batch(items, errors))
+
+#Request (JSON array):
+#[{"name": "Foo", "price": 35.4, "tax": 3.2}, {"name": "Bar"}, {"name": "Baz", "price": 50}]
+#Response:
+#[{"index": 0, "item": {"name": "Foo", "description": null, "price": 35.4, "tax": 3.2, "final_price": 38.6}},
+# {"index": 1, "errors": [{"type": "missing", "loc": ["price"], "msg": "Field required"}]},
+# {"index": 2, "item": {"name": "Baz", "description": null, "price": 50.0, "tax": null}}]
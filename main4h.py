@@ -16,6 +16,8 @@ Endpoints:
 from fastapi import FastAPI
 from pydantic import BaseModel
 
+from openapi_cache import cache_openapi
+
 
 class Item(BaseModel):
     name: str
@@ -25,6 +27,7 @@ class Item(BaseModel):
 
 
 app = FastAPI()
+openapi = cache_openapi(app)
 
 
 @app.put("/items/{item_id}")
@@ -24,7 +24,10 @@ from typing import Annotated
 
 from fastapi import FastAPI, Query
 
+from openapi_cache import cache_openapi
+
 app = FastAPI()
+openapi = cache_openapi(app)
 
 @app.get("/items/")
 async def read_items(q: Annotated[str | None, Query(min_length=3, max_length=10, pattern="^varun")] = None):
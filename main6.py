@@ -20,7 +20,10 @@ from typing import Annotated
 
 from fastapi import FastAPI, Path, Query
 
+from openapi_cache import cache_openapi
+
 app = FastAPI()
+openapi = cache_openapi(app)
 
 
 @app.get("/items/{item_id}")
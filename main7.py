@@ -1,9 +1,14 @@
+from datetime import datetime, timedelta
 from typing import Annotated, Literal
 
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, Response
 from pydantic import BaseModel, Field
 
+from catalog_index import CatalogIndex
+from openapi_cache import cache_openapi
+
 app = FastAPI()
+openapi = cache_openapi(app)
 
 #The FilterParams class is a Pydantic model that validates and enforces constraints on query parameters.
 #  It defines the structure of the expected query parameters for the /items/ endpoint.
@@ -27,9 +32,53 @@ class FilterParams(BaseModel):
     tags: list[str] = []
 
 
+class Item(BaseModel):
+    id: int
+    name: str
+    tags: list[str] = []
+    created_at: datetime
+    updated_at: datetime
+
+
+#The items live in a CatalogIndex (see catalog_index.py), which keeps both timestamps sorted and an
+#  inverted index from tag to items, so a page costs O(log n + limit) instead of sorting everything.
+catalog = CatalogIndex()
+
+
 @app.get("/items/")
-async def read_items(filter_query: Annotated[FilterParams, Query()]):
-    return filter_query
+async def read_items(filter_query: Annotated[FilterParams, Query()], response: Response):
+    # tags=python,fastapi and tags=python&tags=fastapi mean the same thing
+    tags = [tag for value in filter_query.tags for tag in value.split(",") if tag]
+    result = catalog.query(
+        order_by=filter_query.order_by,
+        offset=filter_query.offset,
+        limit=filter_query.limit,
+        tags=tags,
+    )
+    response.headers["X-Query-Plan"] = result.plan
+    return {"filters": filter_query, "items": result.items}
+
+
+@app.on_event("startup")
+async def populate_example_data():
+    start = datetime(2025, 1, 1)
+    examples = [
+        ("FastAPI Guide", ["python", "fastapi"]),
+        ("Pydantic Deep Dive", ["python", "pydantic"]),
+        ("Async Patterns", ["python", "asyncio"]),
+        ("Starlette Internals", ["python", "starlette", "fastapi"]),
+        ("Rust for Pythonistas", ["rust"]),
+    ]
+    catalog.extend(
+        Item(
+            id=i,
+            name=name,
+            tags=tags,
+            created_at=start + timedelta(days=i),
+            updated_at=start + timedelta(days=2 * (len(examples) - i)),
+        )
+        for i, (name, tags) in enumerate(examples, start=1)
+    )
 
 """
 order_by:
@@ -41,6 +90,9 @@ filter_query: This is an instance of FilterParams, annotated with Query() to ind
 Behavior: FastAPI automatically maps query parameters to the FilterParams model, validates the input, and raises an error 
 if the input doesn't meet the constraints defined in FilterParams.
 
-The endpoint returns the validated query parameters as a JSON object.
+The endpoint returns the validated query parameters together with the matching page of items, ordered by
+order_by (oldest first). Items must carry every tag in tags. The X-Query-Plan response header says whether
+the page came straight from the sorted index, from intersecting the tag sets, or from scanning the sorted
+index for tagged items.
 
 """
\ No newline at end of file
@@ -19,7 +19,10 @@ from typing import Annotated
 from fastapi import FastAPI, Path, Body
 from pydantic import BaseModel
 
+from openapi_cache import cache_openapi
+
 app = FastAPI()
+openapi = cache_openapi(app)
 
 
 class Item(BaseModel):
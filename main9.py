@@ -28,7 +28,10 @@ from typing import Annotated
 from fastapi import Body, FastAPI
 from pydantic import BaseModel, Field
 
+from openapi_cache import cache_openapi
+
 app = FastAPI()
+openapi = cache_openapi(app)
 
 #The same way you can declare additional validation and metadata in path operation function parameters with 
     #   Query, Path and Body, 
@@ -0,0 +1,230 @@
+"""
+Per-route request metrics in Prometheus text format.
+
+`instrument_metrics(app)` adds a pure ASGI middleware and a GET /metrics route that
+reports, for each route template and method:
+
+    http_requests_total{method, route, status}     - counter, status is "2xx", "4xx", ...
+    http_request_duration_seconds{method, route}   - histogram with fixed buckets
+    http_requests_in_flight{method, route}         - gauge
+
+Labels use the route's template (/items/{item_id}), never the raw path, so the number of
+series is bounded by the number of routes. Requests that match no route (404s) and
+requests whose path matches a route that doesn't allow their method (405s, however the
+405 is produced) are counted under route="<unmatched>"; unusual methods are counted
+under method="OTHER".
+
+Cheap on purpose:
+
+1. Finding the route costs nothing per request: the first request wraps each route's
+   ASGI app (mounted apps' routes too, with the mount's prefix) in a function that
+   already holds that route's series, so the route itself tells the middleware which
+   series to update. Routes added later are wrapped when the app's route list grows, or,
+   if they are added inside a mount or replace another route, when the first request
+   that reaches one finishes (that request is found by its endpoint and counted too).
+2. Every counter is a plain int on a slotted object, updated from the event loop thread
+   without locks. The histogram stores one count per bucket, found with `bisect`, and
+   is only made cumulative when /metrics is rendered.
+3. No labels are formatted until someone scrapes /metrics.
+
+The counters live in the process, so with several uvicorn workers each reports its own
+numbers, and a scrape reaches whichever worker accepts it.
+
+An instrumented app mounted inside another instrumented app (main.py in the gateway) is
+only counted by the outer one, with the full template: its middleware steps aside and
+its own /metrics answers 404, since it would never see a request.
+
+`python -m benchmarks.bench_metrics` measures the overhead on main.py's hello world route.
+
+Usage:
+    app = FastAPI()
+    ...                        # routes
+    instrument_metrics(app)    # last, so /metrics doesn't sit in front of other routes
+"""
+
+from bisect import bisect_left
+from time import perf_counter
+from typing import Any, Iterable
+
+from fastapi import FastAPI, Request, Response
+from starlette.routing import BaseRoute, Match, Mount, Route
+
+# Seconds; requests slower than the last bucket only show up in +Inf
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+UNMATCHED = "<unmatched>"
+# Scope key holding the outermost registry, so nested ones can step aside
+REGISTRY_KEY = "metrics.registry"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Series:
+    """Everything recorded for one (method, route template)."""
+
+    __slots__ = ("in_flight", "statuses", "buckets", "seconds")
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.statuses = [0] * 10  # index = status // 100
+        self.buckets = [0] * (len(BUCKETS) + 1)  # the last one is +Inf
+        self.seconds = 0.0
+
+    def observe(self, status: int, seconds: float) -> None:
+        self.statuses[status // 100] += 1
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+        self.seconds += seconds
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    def __init__(self, app: FastAPI):
+        self.app = app
+        # Set in the scope by a wrapped route, read back by the middleware
+        self.scope_key = f"metrics.series.{id(self)}"
+        self._series: dict[tuple[str, str], Series] = {}
+        # id -> route; holding the route keeps its id from being reused by a new one
+        self._wrapped: dict[int, BaseRoute] = {}
+        # id(endpoint) -> [(route, template)] of the wrapped routes serving it
+        self._endpoints: dict[int, list[tuple[Route, str]]] = {}
+        self._not_routes: set[int] = set()  # endpoints (mounted apps) known not to be routes
+        self._routes_seen = -1
+
+    def series(self, method: str, template: str) -> Series:
+        key = (method if method in METHODS else "OTHER", template)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = Series()
+        return series
+
+    # Route wrapping
+
+    def wrap_if_changed(self) -> None:
+        routes = self.app.router.routes
+        if len(routes) != self._routes_seen:
+            self._routes_seen = len(routes)
+            self._wrap_routes(routes, "")
+
+    def _wrap_routes(self, routes: Iterable[BaseRoute], prefix: str) -> None:
+        for route in routes:
+            if isinstance(route, Mount):
+                self._wrap_routes(route.routes, prefix + route.path)
+            elif isinstance(route, Route) and id(route) not in self._wrapped:
+                self._wrapped[id(route)] = route
+                template, methods = prefix + route.path_format, route.methods or ()
+                self._endpoints.setdefault(id(route.endpoint), []).append((route, template))
+                route.app = self._wrap(route.app, template, methods)
+
+    def unwrapped_series(self, scope: dict) -> Series | None:
+        """The series of a route the request reached before it was wrapped, if any.
+
+        Wraps every route not wrapped yet. Only runs for requests that ended without a
+        series, which are otherwise unmatched, so the walk is skipped for endpoints
+        already known not to be routes (the apps of mounts that had no matching route).
+        """
+        endpoint = scope.get("endpoint")
+        if endpoint is None or id(endpoint) in self._not_routes:
+            return None
+        self._wrap_routes(self.app.router.routes, "")
+        candidates = self._endpoints.get(id(endpoint))
+        if not candidates:
+            self._not_routes.add(id(endpoint))
+            return None
+        # One function can serve several routes; the scope still holds the path it matched
+        for route, template in candidates:
+            if len(candidates) == 1 or route.matches(scope)[0] is Match.FULL:
+                return self.series(scope["method"], template)
+        return None
+
+    def _wrap(self, inner: Any, template: str, methods: Iterable[str]) -> Any:
+        by_method = {method: self.series(method, template) for method in methods}
+        scope_key = self.scope_key
+
+        async def app(scope, receive, send):
+            series = by_method.get(scope["method"]) or self.series(scope["method"], template)
+            scope[scope_key] = series
+            series.in_flight += 1
+            try:
+                await inner(scope, receive, send)
+            finally:
+                series.in_flight -= 1
+
+        return app
+
+    # Exposition
+
+    def render(self) -> str:
+        totals = ["# HELP http_requests_total Requests handled, by route template and status class.",
+                  "# TYPE http_requests_total counter"]
+        durations = ["# HELP http_request_duration_seconds Time from the request entering the app to the response.",
+                     "# TYPE http_request_duration_seconds histogram"]
+        in_flight = ["# HELP http_requests_in_flight Requests being handled right now.",
+                     "# TYPE http_requests_in_flight gauge"]
+        for (method, template), series in sorted(self._series.items(), key=lambda item: (item[0][1], item[0][0])):
+            labels = f'method="{method}",route="{_label(template)}"'
+            for status_class, count in enumerate(series.statuses):
+                if count:
+                    totals.append(f'http_requests_total{{{labels},status="{status_class}xx"}} {count}')
+            cumulative = 0
+            for bound, count in zip(BUCKETS, series.buckets):
+                cumulative += count
+                durations.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += series.buckets[-1]
+            durations.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+            durations.append(f"http_request_duration_seconds_sum{{{labels}}} {series.seconds}")
+            durations.append(f"http_request_duration_seconds_count{{{labels}}} {cumulative}")
+            in_flight.append(f"http_requests_in_flight{{{labels}}} {series.in_flight}")
+        return "\n".join(totals + durations + in_flight) + "\n"
+
+    async def endpoint(self, request: Request) -> Response:
+        if request.scope.get(REGISTRY_KEY, self) is not self:
+            # Mounted in an instrumented app: that app's /metrics has these requests
+            return Response(status_code=404)
+        return Response(self.render(), media_type=CONTENT_TYPE)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: times each request and records it in its route's Series."""
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or REGISTRY_KEY in scope:
+            # Not HTTP, or an outer app's middleware is already counting this request
+            return await self.app(scope, receive, send)
+        registry = self.registry
+        scope[REGISTRY_KEY] = registry
+        registry.wrap_if_changed()
+        status = 500  # if the app raises before responding
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            seconds = perf_counter() - start
+            # A 405 usually comes from Starlette before the route's app runs, but an endpoint
+            # class can answer it from inside the wrapped app; both count as <unmatched>
+            series = None
+            if status != 405:
+                series = scope.get(registry.scope_key) or registry.unwrapped_series(scope)
+            if series is None:
+                series = registry.series(scope["method"], UNMATCHED)
+            series.observe(status, seconds)
+
+
+def instrument_metrics(app: FastAPI, path: str = "/metrics") -> MetricsRegistry:
+    """Record per-route metrics for `app` and serve them at `path`."""
+    registry = MetricsRegistry(app)
+    app.add_middleware(MetricsMiddleware, registry=registry)
+    app.add_route(path, registry.endpoint, include_in_schema=False)
+    return registry
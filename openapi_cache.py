@@ -0,0 +1,153 @@
+"""
+OpenAPI schema built at startup and served from memory.
+
+FastAPI builds `app.openapi()` the first time someone opens /openapi.json (or /docs, which
+loads it). For apps with many routes, models and examples that takes tens of milliseconds,
+which stalls that request and everything queued behind it on the event loop. Every later
+hit then re-serializes the cached dict to JSON and sends it uncompressed.
+
+`cache_openapi(app)` changes that:
+
+1. The schema is generated during startup, or with `in_thread=True` in a worker thread
+   started at startup, so the app starts accepting requests right away. A request
+   that arrives before the thread is done waits for it.
+2. The JSON bytes, a gzip-compressed copy and a strong ETag for each are computed once.
+3. /openapi.json serves the gzip bytes to clients that accept gzip, answers
+   If-None-Match with 304, and never touches the schema dict again.
+
+How long generation, serialization and compression took is logged at startup (on uvicorn's
+"uvicorn.error" logger, so it shows up next to uvicorn's own startup lines) and kept in
+`OpenAPICache.timings`; `python -m benchmarks.bench_openapi` reports it for every mainN app,
+all of which use `cache_openapi`. If a build fails, the request waiting for it gets the
+error and the next request tries again.
+
+Configuration:
+    OPENAPI_IN_THREAD=1   - default for `in_thread`
+
+Usage:
+    app = FastAPI()
+    cache_openapi(app)   # routes declared before or after are all included
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+
+from anyio import to_thread
+from fastapi import FastAPI, Request, Response
+from starlette.routing import Route
+
+from conditional import etag_matches
+
+# uvicorn only configures its own loggers; a module logger's INFO records would be dropped
+logger = logging.getLogger("uvicorn.error")
+
+OPENAPI_IN_THREAD = os.environ.get("OPENAPI_IN_THREAD", "") == "1"
+
+
+def accepts_gzip(accept_encoding: str | None) -> bool:
+    """True if an Accept-Encoding header allows gzip (and doesn't set its q to 0).
+
+    An explicit gzip entry takes precedence over `*`, as in RFC 9110: `*;q=0, gzip` allows it.
+    """
+    if not accept_encoding:
+        return False
+    allowed: dict[str, bool] = {}
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        name = name.strip().lower()
+        if name in ("gzip", "*") and name not in allowed:
+            q = params.strip().removeprefix("q=").strip()
+            try:
+                allowed[name] = not q or float(q) > 0
+            except ValueError:
+                allowed[name] = False
+    return allowed.get("gzip", allowed.get("*", False))
+
+
+class OpenAPICache:
+    def __init__(self, app: FastAPI):
+        self.app = app
+        self.body = b""
+        self.gzip_body = b""
+        self.etag = ""
+        self.gzip_etag = ""
+        self.timings: dict[str, float] = {}
+        self._ready: asyncio.Future | None = None
+
+    def build(self) -> None:
+        """Generate, serialize and compress the schema. Blocking."""
+        start = time.perf_counter()
+        self.app.openapi_schema = None  # regenerate even if something built it before
+        schema = self.app.openapi()
+        generated = time.perf_counter()
+        # Same bytes as FastAPI's own JSONResponse
+        body = json.dumps(schema, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+        serialized = time.perf_counter()
+        gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        compressed = time.perf_counter()
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        # Each encoding is a different representation, so each gets its own strong ETag
+        self.etag, self.gzip_etag = f'"{digest}"', f'"{digest}-gzip"'
+        self.body, self.gzip_body = body, gzip_body
+        self.timings = {
+            "generate_ms": (generated - start) * 1e3,
+            "serialize_ms": (serialized - generated) * 1e3,
+            "gzip_ms": (compressed - serialized) * 1e3,
+            "bytes": len(body),
+            "gzip_bytes": len(gzip_body),
+        }
+        logger.info(
+            "OpenAPI schema for %r: generated in %.1f ms, serialized in %.1f ms, gzipped in %.1f ms "
+            "(%d bytes, %d gzipped)", self.app.title, self.timings["generate_ms"], self.timings["serialize_ms"],
+            self.timings["gzip_ms"], len(body), len(gzip_body),
+        )
+
+    async def start(self, in_thread: bool = False) -> None:
+        if in_thread:
+            self._ready = asyncio.ensure_future(to_thread.run_sync(self.build))
+        else:
+            self.build()
+
+    async def endpoint(self, request: Request) -> Response:
+        if not self.body:
+            if self._ready is None:
+                # Startup hasn't run (e.g. the app is mounted without its lifespan)
+                self._ready = asyncio.ensure_future(to_thread.run_sync(self.build))
+            ready = self._ready
+            try:
+                await asyncio.shield(ready)
+            except Exception:
+                # Don't keep serving the failure: the next request builds again
+                if self._ready is ready:
+                    self._ready = None
+                raise
+        if accepts_gzip(request.headers.get("accept-encoding")):
+            body, etag, encoding = self.gzip_body, self.gzip_etag, {"Content-Encoding": "gzip"}
+        else:
+            body, etag, encoding = self.body, self.etag, {}
+        headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None and etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers={**headers, **encoding})
+
+
+def cache_openapi(app: FastAPI, in_thread: bool = OPENAPI_IN_THREAD) -> OpenAPICache:
+    """Serve `app`'s /openapi.json from an OpenAPICache built at startup."""
+    cache = OpenAPICache(app)
+    if app.openapi_url:
+        for i, route in enumerate(app.router.routes):
+            if isinstance(route, Route) and route.path == app.openapi_url:
+                app.router.routes[i] = Route(app.openapi_url, cache.endpoint, include_in_schema=False)
+                break
+
+        async def build_schema() -> None:
+            await cache.start(in_thread)
+
+        app.add_event_handler("startup", build_schema)
+    return cache
@@ -0,0 +1,67 @@
+"""
+Opaque, signed cursors for keyset pagination.
+
+skip/limit pagination (`items[skip : skip + limit]`) has two problems once the data lives
+in a real store: the store has to walk past `skip` rows to find the page, so deep pages get
+slower, and a row inserted before the current position shifts every later page by one.
+
+With keyset pagination the client sends back the key of the last row it saw and the next
+page is "rows with key > last key", which a sorted index or a primary key answers in
+O(log n + limit) however deep the page is, and which doesn't move when rows are inserted.
+
+The key is handed to the client as an opaque token: base64url(JSON) + "." + HMAC-SHA256
+signature, so clients can't forge or edit cursors. Set CURSOR_SECRET to keep cursors valid
+across restarts and workers; without it a random per-process secret is used.
+
+Usage:
+    token = encode_cursor(last_key)
+    last_key = decode_cursor(token)  # raises InvalidCursor if tampered with
+    page = rows with key > last_key, ordered by key, first `limit`
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+from typing import Any
+
+CURSOR_SECRET = os.environ.get("CURSOR_SECRET", "").encode() or os.urandom(32)
+
+_SIGNATURE_BYTES = 16
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor is malformed or its signature doesn't match."""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: bytes, secret: bytes) -> bytes:
+    return hmac.new(secret, payload, hashlib.sha256).digest()[:_SIGNATURE_BYTES]
+
+
+def encode_cursor(key: Any, secret: bytes = CURSOR_SECRET) -> str:
+    """Encode a JSON-serializable key as a signed, URL-safe token."""
+    payload = json.dumps(key, separators=(",", ":")).encode()
+    return f"{_b64encode(payload)}.{_b64encode(_sign(payload, secret))}"
+
+
+def decode_cursor(token: str, secret: bytes = CURSOR_SECRET) -> Any:
+    """Return the key inside a token produced by encode_cursor."""
+    try:
+        payload_part, signature_part = token.split(".")
+        payload = _b64decode(payload_part)
+        signature = _b64decode(signature_part)
+    except ValueError:
+        raise InvalidCursor("Malformed cursor") from None
+    if not hmac.compare_digest(signature, _sign(payload, secret)):
+        raise InvalidCursor("Cursor signature does not match")
+    return json.loads(payload)
+
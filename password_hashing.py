@@ -0,0 +1,168 @@
+"""
+Password hashing in a dedicated, bounded process pool.
+
+A password KDF is slow on purpose: one scrypt hash here takes ~70 ms of CPU. Run on the event
+loop, every other request waits for it. Run in the shared anyio threadpool (where `def` routes
+and `to_thread` calls go), a burst of signups takes all the threads and the CPU, and
+unrelated requests queue behind them.
+
+PasswordHasher sends every hash and verify to its own ProcessPoolExecutor instead:
+
+1. At most `workers` KDFs run at once, in other processes, so the CPU they use is capped
+   and the event loop's process only waits on a future.
+2. At most `max_queue` more wait for a worker. Past that, `hash`/`verify` raise
+   HasherSaturated straight away (→ 503 with Retry-After) instead of letting the queue and
+   its latency grow without bound.
+3. `metrics()` reports running/queued/rejected counts, the average KDF time in a worker and
+   the average time from submit to result (KDF plus queueing).
+
+Hashes are stored as `scrypt$n$r$p$<salt>$<hash>` (base64), so the cost parameters can be
+raised later without breaking existing hashes.
+
+Configuration:
+    PASSWORD_HASH_WORKERS=<cpus // 2>   - KDF processes
+    PASSWORD_HASH_QUEUE=<4 * workers>   - hashes allowed to wait for a worker
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+
+SCRYPT_N = 2**14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+HASH_QUEUE_DEPTH = int(os.environ.get("PASSWORD_HASH_QUEUE", str(4 * HASH_WORKERS)))
+
+
+class HasherSaturated(Exception):
+    """Every worker is busy and the queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Password hashing is saturated, try again later")
+        self.retry_after = retry_after
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def hash_password(password: str, salt: bytes | None = None) -> str:
+    """scrypt with a random salt, encoded with its parameters. CPU-bound; runs in a worker."""
+    salt = os.urandom(SALT_BYTES) if salt is None else salt
+    key = hashlib.scrypt(password.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P, dklen=KEY_BYTES)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(key)}"
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    """Recompute the hash with the parameters and salt stored in `encoded` and compare."""
+    try:
+        scheme, n, r, p, salt, key = encoded.split("$")
+        if scheme != "scrypt":
+            return False
+        salt, key = base64.b64decode(salt), base64.b64decode(key)
+        actual = hashlib.scrypt(password.encode(), salt=salt, n=int(n), r=int(r), p=int(p), dklen=len(key))
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, key)
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = HASH_WORKERS, max_queue: int = HASH_QUEUE_DEPTH):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: ProcessPoolExecutor | None = None
+        # Futures finish on the executor's management thread, so the counters need a lock
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._kdf_seconds = 0.0
+        self._wait_seconds = 0.0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: the workers don't inherit the server's threads, sockets or event loop
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def _submit(self, fn, *args):
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise HasherSaturated(self._retry_after())
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        submitted = time.perf_counter()
+        try:
+            future = self._pool().submit(_timed, fn, *args)
+        except BaseException:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        # Counted as finished when the worker is done, not when the caller stops waiting:
+        # a cancelled request doesn't free its worker.
+        future.add_done_callback(lambda f: self._finished(f, submitted))
+        result, _ = await asyncio.wrap_future(future)
+        return result
+
+    def _finished(self, future: Future, submitted: float) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+            self._wait_seconds += time.perf_counter() - submitted
+            if not future.cancelled() and future.exception() is None:
+                self._kdf_seconds += future.result()[1]
+
+    def _retry_after(self) -> int:
+        average = self._kdf_seconds / self._completed if self._completed else 0.1
+        return max(1, round(average * (self.workers + self.max_queue) / self.workers))
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(hash_password, password)
+
+    async def verify(self, password: str, encoded: str) -> bool:
+        return await self._submit(verify_password, password, encoded)
+
+    async def warm_up(self) -> None:
+        """Start the worker processes now rather than on the first signup."""
+        pool = self._pool()
+        await asyncio.gather(*(asyncio.wrap_future(pool.submit(os.getpid)) for _ in range(self.workers)))
+
+    def metrics(self) -> dict:
+        with self._lock:
+            in_flight, completed = self._in_flight, self._completed
+            running = min(in_flight, self.workers)
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "running": running,
+                "queued": in_flight - running,
+                "utilisation": running / self.workers,
+                "peak_in_flight": self._peak_in_flight,
+                "completed": completed,
+                "rejected": self._rejected,
+                "avg_kdf_seconds": self._kdf_seconds / completed if completed else None,
+                "avg_wait_seconds": self._wait_seconds / completed if completed else None,
+            }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,268 @@
+"""
+On-demand profiling of a live worker, behind an admin token.
+
+`install_profiler(app)` adds GET /debug/profile (in the spirit of Go's /debug/pprof) so a
+slow worker can be profiled where it is, instead of being restarted under a profiler:
+
+    mode=sample (default)
+        A background thread reads every thread's stack with `sys._current_frames()` each
+        `interval` seconds for `seconds` seconds, and the response is the stacks in
+        collapsed format ("thread;outer;...;inner count" per line), ready for
+        flamegraph.pl or speedscope. Nothing is hooked into the interpreter, so the
+        handlers run at full speed between samples. The event loop thread shows where
+        requests spend their CPU, and its time in `select` is idle time. The sampler
+        needs the GIL to read the stacks, so while the loop is busy it gets a turn every
+        `sys.getswitchinterval()` (5 ms) at best, whatever the interval.
+
+    mode=cprofile&route=/items/{item_id}&method=GET
+        cProfile runs while at least one request to that route is in flight, and the
+        response is pstats output sorted by `sort`, `limit` lines long. Only the event
+        loop thread is profiled: the body of a `def` endpoint runs in the threadpool and
+        shows up as the wait for it. Other tasks that run on the loop while such a request
+        is suspended are included too.
+
+Idle, it costs nothing: no thread runs and no hook or wrapper is installed until a
+profile is requested, and the route itself isn't added unless PROFILER_TOKEN is set.
+One profile runs at a time per process (a second request gets 409). With several
+uvicorn workers, the profile is of whichever worker accepted the request; its pid is in
+the X-Profile-Pid header.
+
+Configuration:
+    PROFILER_TOKEN=              - bearer token for /debug/profile; unset, there is no route
+    PROFILER_MAX_SECONDS=60      - longest profile a request may ask for
+
+Usage:
+    install_profiler(app)    # after the app's routes, so it doesn't sit in front of them
+
+    curl -H "Authorization: Bearer $PROFILER_TOKEN" \\
+        "localhost:8000/debug/profile?seconds=30" > stacks.txt
+    flamegraph.pl stacks.txt > flame.svg
+"""
+
+import asyncio
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from types import CodeType, FrameType
+from typing import Annotated, Iterable, Literal
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from starlette.routing import BaseRoute, Mount, Route
+
+PROFILER_TOKEN = os.environ.get("PROFILER_TOKEN", "")
+PROFILER_MAX_SECONDS = float(os.environ.get("PROFILER_MAX_SECONDS", "60"))
+DEFAULT_INTERVAL = 0.005
+
+
+class ProfilerBusy(Exception):
+    """Another profile is already running in this process."""
+
+
+def _short_path(filename: str) -> str:
+    """`filename` relative to the longest sys.path entry containing it."""
+    for entry in sorted((path for path in sys.path if path), key=len, reverse=True):
+        if filename.startswith(entry.rstrip(os.sep) + os.sep):
+            return filename[len(entry.rstrip(os.sep)) + 1:]
+    return filename
+
+
+def _code_label(code: CodeType) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    # ";" separates frames in the collapsed format
+    return f"{name} ({_short_path(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class StackSampler:
+    """Counts the collapsed stacks of every other thread, sampled from a background thread."""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        self.counts: Counter[str] = Counter()
+        self.samples = 0
+        self.cpu_seconds = 0.0  # spent by the sampling thread itself
+        self._labels: dict[CodeType, str] = {}
+        self._stop = threading.Event()
+
+    def run(self, seconds: float) -> None:
+        """Sample for `seconds`, or until `stop()`. Blocks; call it on its own thread."""
+        me = threading.get_ident()
+        names: dict[int, str] = {}
+        cpu_start = time.thread_time()
+        next_tick = time.monotonic()
+        deadline = next_tick + seconds
+        while True:
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                if ident not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                self.counts[self._collapse(names.get(ident, str(ident)), frame)] += 1
+            self.samples += 1
+            next_tick += self.interval
+            if next_tick >= deadline:
+                break
+            delay = next_tick - time.monotonic()
+            if delay < 0:  # fell behind; skip the missed ticks rather than bursting
+                next_tick, delay = time.monotonic(), 0.0
+            if self._stop.wait(delay):
+                break
+        self.cpu_seconds = time.thread_time() - cpu_start
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _collapse(self, thread: str, frame: FrameType | None) -> str:
+        labels = self._labels
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            label = labels.get(code)
+            if label is None:
+                label = labels[code] = _code_label(code)
+            stack.append(label)
+            frame = frame.f_back
+        stack.append(thread)
+        stack.reverse()
+        return ";".join(stack)
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+class RouteProfile:
+    """cProfile enabled while a request to `route` is in flight, until `close()`."""
+
+    def __init__(self, route: Route):
+        self.route = route
+        self.profile = cProfile.Profile()
+        self.requests = 0
+        self.closed = False
+        self._in_flight = 0
+        self._inner = route.app
+        route.app = self._app
+
+    async def _app(self, scope, receive, send):
+        if self.closed:
+            return await self._inner(scope, receive, send)
+        if self._in_flight == 0:
+            self.profile.enable()
+        self._in_flight += 1
+        self.requests += 1
+        try:
+            await self._inner(scope, receive, send)
+        finally:
+            self._in_flight -= 1
+            if self._in_flight == 0 and not self.closed:
+                self.profile.disable()
+
+    def close(self) -> None:
+        if self._in_flight:
+            self.profile.disable()
+        self.closed = True
+        # If something wrapped the route on top of us in the meantime (metrics.py does on
+        # its first request), stay in the chain as a pass-through instead.
+        if self.route.app == self._app:
+            self.route.app = self._inner
+
+    def report(self, sort: str, limit: int) -> str:
+        stream = io.StringIO()
+        pstats.Stats(self.profile, stream=stream).sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+
+def find_route(routes: Iterable[BaseRoute], template: str, method: str, prefix: str = "") -> Route | None:
+    """The first route (mounted apps' included) with this full path template and method."""
+    for route in routes:
+        if isinstance(route, Mount):
+            found = find_route(route.routes, template, method, prefix + route.path)
+            if found is not None:
+                return found
+        elif (isinstance(route, Route) and prefix + route.path_format == template
+              and (route.methods is None or method in route.methods)):
+            return route
+    return None
+
+
+class Profiler:
+    def __init__(self, app: FastAPI, max_seconds: float = PROFILER_MAX_SECONDS):
+        self.app = app
+        self.max_seconds = max_seconds
+        self._running = False
+
+    def _start(self) -> None:
+        if self._running:
+            raise ProfilerBusy("A profile is already running in this worker")
+        self._running = True
+
+    async def sample(self, seconds: float, interval: float = DEFAULT_INTERVAL) -> StackSampler:
+        self._start()
+        sampler = StackSampler(interval)
+        try:
+            await asyncio.to_thread(sampler.run, seconds)
+        finally:
+            sampler.stop()  # if the request was cancelled, the thread stops at its next tick
+            self._running = False
+        return sampler
+
+    async def profile_route(self, template: str, method: str, seconds: float) -> RouteProfile:
+        route = find_route(self.app.router.routes, template, method)
+        if route is None:
+            raise LookupError(f"No route {method} {template}")
+        self._start()
+        profile = RouteProfile(route)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile.close()
+            self._running = False
+        return profile
+
+
+def install_profiler(app: FastAPI, path: str = "/debug/profile", token: str = PROFILER_TOKEN,
+                     max_seconds: float = PROFILER_MAX_SECONDS) -> Profiler | None:
+    """Serve on-demand profiles of this process at `path`, for requests bearing `token`."""
+    if not token:
+        return None
+    profiler = Profiler(app, max_seconds)
+
+    async def require_token(authorization: Annotated[str | None, Header()] = None) -> None:
+        scheme, _, credentials = (authorization or "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(credentials.encode(), token.encode()):
+            raise HTTPException(status_code=401, detail="Admin token required", headers={"WWW-Authenticate": "Bearer"})
+
+    async def profile(
+        seconds: Annotated[float, Query(gt=0, le=max_seconds)] = 10.0,
+        mode: Literal["sample", "cprofile"] = "sample",
+        interval: Annotated[float, Query(ge=0.001, le=1.0)] = DEFAULT_INTERVAL,
+        route: str | None = None,
+        method: str = "GET",
+        sort: Literal["cumulative", "tottime", "calls", "ncalls"] = "cumulative",
+        limit: Annotated[int, Query(ge=1)] = 50,
+    ):
+        headers = {"X-Profile-Pid": str(os.getpid())}
+        try:
+            if mode == "sample":
+                sampler = await profiler.sample(seconds, interval)
+                headers["X-Profile-Samples"] = str(sampler.samples)
+                headers["X-Profile-Sampler-CPU"] = f"{sampler.cpu_seconds:.3f}"
+                return PlainTextResponse(sampler.collapsed(), headers=headers)
+            if route is None:
+                raise HTTPException(status_code=422, detail="mode=cprofile needs ?route=<path template>")
+            result = await profiler.profile_route(route, method.upper(), seconds)
+        except ProfilerBusy as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except LookupError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        headers["X-Profile-Requests"] = str(result.requests)
+        return PlainTextResponse(result.report(sort, limit), headers=headers)
+
+    app.add_api_route(path, profile, methods=["GET"], dependencies=[Depends(require_token)],
+                      include_in_schema=False)
+    return profiler
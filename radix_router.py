@@ -0,0 +1,356 @@
+"""
+Compiled route matching: a radix trie over path segments.
+
+Starlette finds the route for a request by trying every route's regex in declaration
+order until one matches, so dispatch gets slower with every route added and the last
+route in a big app pays for all the ones before it. Declaration order also decides
+which route wins when two can match the same path, which is why main2 has to declare
+/users/me before anything like /users/{user_id}, and why its second
+/items/{item_id} handler is never called.
+
+`compile_routes(app)` builds a trie from the app's routes, one level per path segment,
+and puts it in front of the router:
+
+1. At every level, a static segment ("me") is tried first, then the typed parameters
+   (int, float, uuid), then plain {str} parameters, then {name:path} catch-alls. The
+   search backtracks, so /users/me wins over /users/{user_id} whatever the order of
+   declaration, and /items/{id:int} leaves /items/{name} for everything that isn't
+   a number.
+2. A lookup only walks the segments of the request path, so it costs the same for
+   10 routes as for 1000.
+3. Routes that exist only at the same path (GET and PUT /items/{id}) share a node; if
+   none of them allows the method, the first one answers 405, like Starlette.
+4. Conflicts are reported at startup: a route with the same path and methods as an
+   earlier one is a duplicate that can never be called; a route that an earlier, more
+   general route already matches (/users/{user_id} before /users/me) is shadowed under
+   Starlette's linear matching and only reachable through the trie. Both are logged;
+   with on_conflict="error" duplicates stop the app from starting.
+
+Anything the trie can't express (mounts, hosts, websocket routes, parameters inside a
+segment like /{name}.json, custom convertors, route classes with their own `matches`)
+is matched the usual way, in declaration order relative to the trie's pick. Redirects
+for a missing or extra trailing slash and 404s work as before.
+
+Configuration:
+    ROUTE_CONFLICTS=warn   - default for `on_conflict` ("warn" or "error")
+
+Usage:
+    app = FastAPI()
+    ...                    # declare routes
+    compile_routes(app)    # can also be called before the routes; compiles at startup
+"""
+
+import logging
+import os
+import re
+from typing import Any, Iterator, NamedTuple
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from starlette._utils import get_route_path
+from starlette.convertors import CONVERTOR_TYPES, Convertor
+from starlette.datastructures import URL
+from starlette.responses import RedirectResponse
+from starlette.routing import BaseRoute, Match, Route, Router
+from starlette.types import Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+ROUTE_CONFLICTS = os.environ.get("ROUTE_CONFLICTS", "warn")
+
+# Typed parameters are tried in this order, before {str} and {path}
+TYPED = ("int", "float", "uuid")
+PARAM = re.compile(r"^\{([a-zA-Z_][a-zA-Z0-9_]*)(?::([a-zA-Z_][a-zA-Z0-9_]*))?\}$")
+
+
+class RouteConflict(Exception):
+    """Raised at startup for duplicate routes when on_conflict="error"."""
+
+    def __init__(self, conflicts: list[str]):
+        super().__init__("; ".join(conflicts))
+        self.conflicts = conflicts
+
+
+class _Entry(NamedTuple):
+    route: Route
+    index: int                              # position in router.routes
+    methods: frozenset[str] | None
+    signature: tuple[str, ...]              # "s:users", "p:int", "p:path", ...
+    params: tuple[tuple[str, Convertor], ...]
+
+
+class _Node:
+    __slots__ = ("static", "typed", "string", "catch_all", "routes")
+
+    def __init__(self) -> None:
+        self.static: dict[str, _Node] = {}
+        self.typed: list[tuple[str, re.Pattern, _Node]] = []
+        self.string: _Node | None = None
+        self.catch_all: list[_Entry] = []   # {name:path} as the last segment
+        self.routes: list[_Entry] = []      # routes whose path ends here
+
+
+def _split(path: str) -> list[str]:
+    return path[1:].split("/")
+
+
+def _parse(route: BaseRoute) -> tuple[tuple[str, ...], tuple[tuple[str, Convertor], ...]] | None:
+    """The trie signature and parameters of a route, or None if the trie can't hold it."""
+    if type(route).matches not in (Route.matches, APIRoute.matches) or not route.path.startswith("/"):
+        return None
+    signature, params = [], []
+    segments = _split(route.path)
+    for i, segment in enumerate(segments):
+        if "{" not in segment:
+            signature.append("s:" + segment)
+            continue
+        match = PARAM.match(segment)
+        if match is None:
+            return None
+        name, kind = match.group(1), match.group(2) or "str"
+        if kind not in CONVERTOR_TYPES or route.param_convertors[name] is not CONVERTOR_TYPES[kind]:
+            return None
+        if kind == "path" and i != len(segments) - 1:
+            return None
+        signature.append("p:" + kind)
+        params.append((name, CONVERTOR_TYPES[kind]))
+    return tuple(signature), tuple(params)
+
+
+def _kind_matches(kind: str, value: str) -> bool:
+    return re.fullmatch(CONVERTOR_TYPES[kind].regex, value) is not None
+
+
+def _covers(general: str, specific: str) -> bool:
+    """True if every segment matched by `specific` is also matched by `general`."""
+    if general == specific:
+        return True
+    if general == "p:str":
+        return specific not in ("p:path", "s:")
+    if general.startswith("s:") or specific == "p:path":
+        return False
+    kind = general[2:]
+    if specific.startswith("s:"):
+        return _kind_matches(kind, specific[2:])
+    return kind == "float" and specific == "p:int"
+
+
+class RadixRouter:
+    """Trie-based dispatch in front of a Starlette router (see the module docstring)."""
+
+    def __init__(self, router: Router, on_conflict: str = ROUTE_CONFLICTS):
+        if on_conflict not in ("warn", "error"):
+            raise ValueError(f"on_conflict must be 'warn' or 'error', not {on_conflict!r}")
+        self.router = router
+        self.on_conflict = on_conflict
+        self.root = _Node()
+        self.fallback: list[tuple[int, BaseRoute]] = []
+        self.conflicts: list[str] = []
+        self._compiled: list[BaseRoute] | None = None
+
+    # Building
+
+    def compile(self) -> None:
+        self.root, self.fallback = _Node(), []
+        entries = []
+        for index, route in enumerate(self.router.routes):
+            parsed = _parse(route) if isinstance(route, Route) else None
+            if parsed is None:
+                self.fallback.append((index, route))
+                continue
+            methods = frozenset(route.methods) if route.methods else None
+            entry = _Entry(route, index, methods, *parsed)
+            self._insert(entry)
+            entries.append(entry)
+        self._compiled = list(self.router.routes)
+        self.conflicts = self._check(entries)
+
+    def _insert(self, entry: _Entry) -> None:
+        node = self.root
+        for part in entry.signature:
+            if part == "p:path":
+                node.catch_all.append(entry)
+                return
+            if part.startswith("s:"):
+                node = node.static.setdefault(part[2:], _Node())
+            elif part == "p:str":
+                node.string = node.string or _Node()
+                node = node.string
+            else:
+                kind = part[2:]
+                for child_kind, _, child in node.typed:
+                    if child_kind == kind:
+                        node = child
+                        break
+                else:
+                    child = _Node()
+                    node.typed.append((kind, re.compile(CONVERTOR_TYPES[kind].regex), child))
+                    node.typed.sort(key=lambda typed: TYPED.index(typed[0]))
+                    node = child
+        node.routes.append(entry)
+
+    def _covering(self, node: _Node, signature: tuple[str, ...], i: int) -> Iterator[_Entry]:
+        """Every entry whose path matches all the paths `signature` matches."""
+        if i == len(signature):
+            yield from node.routes
+            return
+        # A catch-all takes whatever is left, even a single empty segment
+        yield from node.catch_all
+        part = signature[i]
+        if part.startswith("s:") and part[2:] in node.static:
+            yield from self._covering(node.static[part[2:]], signature, i + 1)
+        if part == "p:path":
+            return
+        for kind, _, child in node.typed:
+            if _covers("p:" + kind, part):
+                yield from self._covering(child, signature, i + 1)
+        if node.string is not None and _covers("p:str", part):
+            yield from self._covering(node.string, signature, i + 1)
+
+    def _check(self, entries: list[_Entry]) -> list[str]:
+        duplicates, shadowed = [], []
+        for entry in entries:
+            earlier = [
+                other for other in self._covering(self.root, entry.signature, 0)
+                if other.index < entry.index
+                and (other.methods is None or (entry.methods is not None and entry.methods <= other.methods))
+            ]
+            if not earlier:
+                continue
+            first = min(earlier, key=lambda other: (other.signature != entry.signature, other.index))
+            duplicate = first.signature == entry.signature
+            verb = "a duplicate of" if duplicate else "shadowed under linear matching by"
+            message = f"{_describe(entry)} (route #{entry.index}) is {verb} {_describe(first)} (route #{first.index})"
+            (duplicates if duplicate else shadowed).append(message)
+        for message in shadowed:
+            logger.warning("%s; the compiled router prefers the more specific route", message)
+        for message in duplicates:
+            logger.warning("%s and can never be called", message)
+        if duplicates and self.on_conflict == "error":
+            raise RouteConflict(duplicates)
+        return duplicates + shadowed
+
+    # Matching
+
+    def lookup(self, scope: Scope) -> tuple[Match, _Entry | None, tuple[str, ...]]:
+        """The trie's pick for an http scope: FULL, PARTIAL (wrong method) or NONE."""
+        segments = _split(get_route_path(scope))
+        partial: list[tuple[_Entry, tuple[str, ...]]] = []
+        found = self._find(self.root, segments, 0, [], scope["method"], partial)
+        if found is not None:
+            return Match.FULL, found[0], found[1]
+        if partial:
+            return Match.PARTIAL, partial[0][0], partial[0][1]
+        return Match.NONE, None, ()
+
+    def _find(self, node: _Node, segments: list[str], i: int, values: list[str], method: str,
+              partial: list) -> tuple[_Entry, tuple[str, ...]] | None:
+        if i == len(segments):
+            return self._pick(node.routes, values, method, partial)
+        segment = segments[i]
+        child = node.static.get(segment)
+        if child is not None:
+            found = self._find(child, segments, i + 1, values, method, partial)
+            if found is not None:
+                return found
+        if segment:
+            for _, pattern, child in node.typed:
+                if pattern.fullmatch(segment):
+                    values.append(segment)
+                    found = self._find(child, segments, i + 1, values, method, partial)
+                    values.pop()
+                    if found is not None:
+                        return found
+            if node.string is not None:
+                values.append(segment)
+                found = self._find(node.string, segments, i + 1, values, method, partial)
+                values.pop()
+                if found is not None:
+                    return found
+        if node.catch_all:
+            return self._pick(node.catch_all, values + ["/".join(segments[i:])], method, partial)
+        return None
+
+    @staticmethod
+    def _pick(entries: list[_Entry], values: list[str], method: str,
+              partial: list) -> tuple[_Entry, tuple[str, ...]] | None:
+        for entry in entries:
+            if entry.methods is None or method in entry.methods:
+                return entry, tuple(values)
+        if entries and not partial:
+            partial.append((entries[0], tuple(values)))
+        return None
+
+    @staticmethod
+    def _child_scope(scope: Scope, entry: _Entry, values: tuple[str, ...]) -> dict[str, Any]:
+        path_params = dict(scope.get("path_params", {}))
+        for (name, convertor), value in zip(entry.params, values):
+            path_params[name] = convertor.convert(value)
+        child_scope = {"endpoint": entry.route.endpoint, "path_params": path_params}
+        if isinstance(entry.route, APIRoute):
+            child_scope["route"] = entry.route
+        return child_scope
+
+    def _resolve(self, scope: Scope) -> tuple[Match, BaseRoute | None, dict[str, Any]]:
+        """Combine the trie's pick with the fallback routes, honouring declaration order."""
+        match, entry, values = self.lookup(scope)
+        partial = (entry.index, entry.route, self._child_scope(scope, entry, values)) if match is Match.PARTIAL else None
+        for index, route in self.fallback:
+            if match is Match.FULL and index > entry.index:
+                break
+            route_match, child_scope = route.matches(scope)
+            if route_match is Match.FULL:
+                return Match.FULL, route, child_scope
+            if route_match is Match.PARTIAL and (partial is None or index < partial[0]):
+                partial = (index, route, child_scope)
+        if match is Match.FULL:
+            return Match.FULL, entry.route, self._child_scope(scope, entry, values)
+        if partial is not None:
+            return Match.PARTIAL, partial[1], partial[2]
+        return Match.NONE, None, {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        router = self.router
+        if scope["type"] != "http" or not scope["path"].startswith("/"):
+            await router.app(scope, receive, send)
+            return
+        if self._compiled is None or len(self._compiled) != len(router.routes):
+            self.compile()  # routes were added since startup (or startup didn't run)
+        if "router" not in scope:
+            scope["router"] = router
+
+        match, route, child_scope = self._resolve(scope)
+        if route is not None:
+            scope.update(child_scope)
+            await route.handle(scope, receive, send)
+            return
+
+        route_path = get_route_path(scope)
+        if router.redirect_slashes and route_path != "/":
+            redirect_scope = dict(scope)
+            if route_path.endswith("/"):
+                redirect_scope["path"] = redirect_scope["path"].rstrip("/")
+            else:
+                redirect_scope["path"] = redirect_scope["path"] + "/"
+            if self._resolve(redirect_scope)[0] is not Match.NONE:
+                response = RedirectResponse(url=str(URL(scope=redirect_scope)))
+                await response(scope, receive, send)
+                return
+        await router.default(scope, receive, send)
+
+
+def _describe(entry: _Entry) -> str:
+    methods = ",".join(sorted(entry.methods - {"HEAD"} or entry.methods)) if entry.methods else "*"
+    return f"{methods} {entry.route.path}"
+
+
+def compile_routes(app: FastAPI, on_conflict: str = ROUTE_CONFLICTS) -> RadixRouter:
+    """Dispatch `app`'s requests through a RadixRouter, compiled (and checked) at startup."""
+    radix = RadixRouter(app.router, on_conflict)
+    app.router.middleware_stack = radix
+
+    async def compile_on_startup() -> None:
+        radix.compile()
+
+    app.add_event_handler("startup", compile_on_startup)
+    return radix
@@ -0,0 +1,110 @@
+"""
+In-process cache for resolving session ids.
+
+A route authenticated by a `session_id` cookie has to turn the id into a session on every
+request. Asking the session store each time costs a round trip (a threadpool hop and a
+query for SQLite, a network call for a real session service) on every request.
+SessionCache sits in front of the store:
+
+1. Bounded LRU: at most `maxsize` sessions; the least recently used one is evicted first.
+2. TTL: an entry is reloaded from the store after `ttl` seconds, so a session deleted or
+   changed in the store is noticed within `ttl`. `invalidate()` drops one immediately.
+3. Negative caching: ids the store doesn't know are remembered as unknown for
+   `negative_ttl` seconds, so a client repeating a bad cookie doesn't hit the store each time.
+4. Miss coalescing: if many requests miss on the same id at once, only one of them loads
+   it and the rest wait for that load. `invalidate()` or `put()` during a load detaches it:
+   its waiters still get what it loads, but it isn't cached, and the next `get` loads again.
+
+In the common case (a hit) resolving a session is one dict lookup and an expiry check.
+`stats()` reports hits, misses, coalesced misses, evictions and expirations.
+
+All methods must be called from the event loop thread; nothing is locked.
+
+Usage:
+    cache = SessionCache(store.get)          # any `async (session_id) -> session | None`
+    session = await cache.get(session_id)    # None if the store doesn't know it
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+SESSION_CACHE_SIZE = 10_000
+SESSION_CACHE_TTL = 300.0
+SESSION_NEGATIVE_TTL = 30.0
+
+
+class SessionCache:
+    def __init__(self, load: Callable[[str], Awaitable[Any | None]], maxsize: int = SESSION_CACHE_SIZE,
+                 ttl: float = SESSION_CACHE_TTL, negative_ttl: float = SESSION_NEGATIVE_TTL):
+        self._load = load
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # session id -> (session or None for "unknown", monotonic expiry)
+        self._entries: OrderedDict[str, tuple[Any | None, float]] = OrderedDict()
+        self._pending: dict[str, asyncio.Task] = {}
+        self._counters = dict.fromkeys(
+            ("hits", "negative_hits", "misses", "coalesced", "evictions", "expirations", "load_errors"), 0
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, session_id: str) -> Any | None:
+        entry = self._entries.get(session_id)
+        if entry is not None:
+            session, expires = entry
+            if expires > time.monotonic():
+                self._entries.move_to_end(session_id)
+                self._counters["hits" if session is not None else "negative_hits"] += 1
+                return session
+            del self._entries[session_id]
+            self._counters["expirations"] += 1
+
+        task = self._pending.get(session_id)
+        if task is None:
+            self._counters["misses"] += 1
+            task = self._pending[session_id] = asyncio.ensure_future(self._fill(session_id))
+        else:
+            self._counters["coalesced"] += 1
+        # Shielded: a waiter that is cancelled (client went away) doesn't cancel the load
+        # the other waiters are sharing
+        return await asyncio.shield(task)
+
+    async def _fill(self, session_id: str) -> Any | None:
+        task = asyncio.current_task()
+        try:
+            session = await self._load(session_id)
+        except Exception:
+            self._counters["load_errors"] += 1
+            raise
+        finally:
+            # Not ours any more if invalidate() or put() ran while loading
+            current = self._pending.get(session_id) is task
+            if current:
+                del self._pending[session_id]
+        if current:
+            self._store(session_id, session)
+        return session
+
+    def put(self, session_id: str, session: Any | None) -> None:
+        """Cache `session` (None caches "unknown") as if it had just been loaded."""
+        self._pending.pop(session_id, None)
+        self._store(session_id, session)
+
+    def _store(self, session_id: str, session: Any | None) -> None:
+        ttl = self.ttl if session is not None else self.negative_ttl
+        self._entries[session_id] = (session, time.monotonic() + ttl)
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def invalidate(self, session_id: str) -> None:
+        self._entries.pop(session_id, None)
+        self._pending.pop(session_id, None)
+
+    def stats(self) -> dict[str, int]:
+        return {**self._counters, "size": len(self._entries), "maxsize": self.maxsize}
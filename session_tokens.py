@@ -0,0 +1,142 @@
+"""
+Signed, expiring session tokens.
+
+A session id in a store means one store lookup per request, and a store every worker can
+reach. A signed token carries the session itself: the user and an expiry time, plus an
+HMAC-SHA256 signature over both. Any worker that knows the key can check it without asking
+anyone, and nobody without the key can make or edit one.
+
+    <key id>.<base64url JSON {"sub", "iat", "exp"}>.<base64url signature>
+
+Key rotation: the signer holds several keys by id. New tokens are signed with the active
+(first) one; tokens signed with any key still held keep verifying until they expire. To
+rotate, add a new key with `rotate()`, and `retire()` the old one once its tokens have
+expired (or immediately, to log everyone out).
+
+Verified tokens go into a small LRU cache, so a client sending the same token on every
+request costs a dict lookup and an expiry check instead of a base64 decode, an HMAC and a
+JSON parse. Only tokens that verified are cached, so the cache can't be used to skip the
+signature check.
+
+Configuration:
+    SESSION_TOKEN_KEYS=2:newsecret,1:oldsecret   - key id:secret pairs, the first one signs.
+                                                   Without it a random per-process key is used.
+    SESSION_TOKEN_TTL=3600                       - token lifetime in seconds
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+SESSION_TOKEN_TTL = int(os.environ.get("SESSION_TOKEN_TTL", "3600"))
+VERIFY_CACHE_SIZE = 4096
+
+
+class InvalidToken(ValueError):
+    """Raised when a token is malformed, signed with an unknown key or tampered with."""
+
+
+class ExpiredToken(InvalidToken):
+    pass
+
+
+@dataclass(frozen=True)
+class TokenClaims:
+    subject: str
+    issued_at: int
+    expires_at: int
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _keys_from_env() -> dict[str, bytes]:
+    value = os.environ.get("SESSION_TOKEN_KEYS", "")
+    if not value:
+        return {"0": os.urandom(32)}
+    keys = {}
+    for pair in value.split(","):
+        kid, _, secret = pair.strip().partition(":")
+        if not kid or not secret or "." in kid:
+            raise ValueError("SESSION_TOKEN_KEYS must look like 'id:secret,id:secret'")
+        keys[kid] = secret.encode()
+    return keys
+
+
+class TokenSigner:
+    def __init__(self, keys: dict[str, bytes] | None = None, ttl: int = SESSION_TOKEN_TTL,
+                 cache_size: int = VERIFY_CACHE_SIZE):
+        # Insertion order matters: the first key is the one that signs
+        self._keys = dict(keys) if keys is not None else _keys_from_env()
+        if not self._keys:
+            raise ValueError("TokenSigner needs at least one key")
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, TokenClaims] = OrderedDict()
+
+    @property
+    def active_key_id(self) -> str:
+        return next(iter(self._keys))
+
+    def rotate(self, kid: str, secret: bytes) -> None:
+        """Sign new tokens with `secret`; tokens signed with the other keys stay valid."""
+        if "." in kid:
+            raise ValueError("Key ids can't contain '.'")
+        self._keys = {kid: secret, **{k: v for k, v in self._keys.items() if k != kid}}
+
+    def retire(self, kid: str) -> None:
+        """Stop accepting tokens signed with `kid`."""
+        if kid == self.active_key_id:
+            raise ValueError("Can't retire the active key; rotate first")
+        del self._keys[kid]
+        self._cache.clear()
+
+    def _sign(self, kid: str, payload: str) -> bytes:
+        return hmac.new(self._keys[kid], f"{kid}.{payload}".encode(), hashlib.sha256).digest()
+
+    def issue(self, subject: str, ttl: int | None = None) -> str:
+        now = int(time.time())
+        claims = {"sub": subject, "iat": now, "exp": now + (self.ttl if ttl is None else ttl)}
+        kid = self.active_key_id
+        payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+        return f"{kid}.{payload}.{_b64encode(self._sign(kid, payload))}"
+
+    def verify(self, token: str) -> TokenClaims:
+        """The token's claims; raises InvalidToken (or ExpiredToken) if it isn't valid now."""
+        claims = self._cache.get(token)
+        if claims is not None and claims.expires_at > time.time():
+            self._cache.move_to_end(token)
+            return claims
+        if claims is not None:
+            del self._cache[token]
+            raise ExpiredToken("Token has expired")
+        claims = self._verify_signature(token)
+        if claims.expires_at <= time.time():
+            raise ExpiredToken("Token has expired")
+        self._cache[token] = claims
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return claims
+
+    def _verify_signature(self, token: str) -> TokenClaims:
+        try:
+            kid, payload, signature = token.split(".")
+            signature = _b64decode(signature)
+        except ValueError:
+            raise InvalidToken("Malformed token") from None
+        if kid not in self._keys:
+            raise InvalidToken("Token was signed with an unknown key")
+        if not hmac.compare_digest(signature, self._sign(kid, payload)):
+            raise InvalidToken("Token signature does not match")
+        claims = json.loads(_b64decode(payload))
+        return TokenClaims(subject=claims["sub"], issued_at=claims["iat"], expires_at=claims["exp"])
@@ -0,0 +1,483 @@
+"""
+SQLite-backed persistent stores built on the standard library sqlite3 module.
+
+The in-memory `items_db` (main17) and `items`/`events` dicts (main18) are lost on restart
+and have to fit in RAM. The classes here keep the same data in a SQLite file instead:
+
+1. SQLitePool          - a bounded pool of connections. Every query runs in the anyio
+                         threadpool, so a slow disk never blocks the event loop.
+2. SQLiteItemStore     - models with an integer id (main17's Item), with indexed name
+                         and price columns for the same lookups ItemStore offers.
+3. SQLiteDocumentStore - JSON documents under a string key (main18's items).
+4. SQLiteEventStore    - JSON events with an indexed date column (main18's events).
+
+Every write also bumps a version number for the store in the `store_versions` table, in
+the same transaction, and item and document rows remember the version that last wrote
+them. `version()` / `version(key)` read those numbers, so every worker sharing the file can
+tell whether a response it built earlier (and its ETag, see conditional.py) is still current.
+Each version is stored with the Unix time of its write (`modified_at`, 0.0 for rows from
+before the column existed), and `version_info()` / `version_info(key)` read both at once.
+
+The database runs in WAL mode so readers don't wait for writers. Queries use constant
+SQL strings with `?` placeholders; sqlite3 keeps a per-connection cache of compiled
+statements, so after the first call each query is a prepared statement. Bulk writes go
+through `executemany` inside a single transaction.
+
+Usage:
+    pool = SQLitePool("tutorial.db", size=4)
+    store = SQLiteItemStore(pool, Item)
+    await store.add(Item(id=1, name="Phone", price=700.0))
+    await store.get(1)
+"""
+
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from queue import Empty, Queue
+from threading import Lock
+from typing import Any, AsyncIterator, Callable, Generic, Iterable, Iterator, TypeVar
+
+import anyio
+from anyio import to_thread
+from pydantic import BaseModel
+
+from event_store import bucket_start, to_utc
+from item_store import DuplicateKeyError
+
+M = TypeVar("M", bound=BaseModel)
+R = TypeVar("R")
+
+
+class SQLitePool:
+    def __init__(self, path: str, size: int = 4, statement_cache: int = 128):
+        self.path = path
+        self.size = size
+        self._statement_cache = statement_cache
+        self._idle: Queue[sqlite3.Connection] = Queue(maxsize=size)
+        self._created = 0
+        self._create_lock = Lock()
+        # At most `size` worker threads hold a connection at once, so a thread never
+        # blocks waiting on the queue while occupying a threadpool slot.
+        self._limiter = anyio.CapacityLimiter(size)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=30,
+            isolation_level=None,  # autocommit; transactions are opened explicitly
+            check_same_thread=False,  # a connection moves between threadpool threads
+            cached_statements=self._statement_cache,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection (blocking). Use from worker threads or sync code only."""
+        try:
+            conn = self._idle.get_nowait()
+        except Empty:
+            with self._create_lock:
+                grow = self._created < self.size
+                if grow:
+                    self._created += 1
+            conn = self._connect() if grow else self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def call(self, fn: Callable[..., R], *args: Any) -> R:
+        """Run fn(conn, *args) on a pooled connection in the current thread."""
+        with self.connection() as conn:
+            return fn(conn, *args)
+
+    async def run(self, fn: Callable[..., R], *args: Any) -> R:
+        """Run fn(conn, *args) on a pooled connection in the anyio threadpool."""
+        return await to_thread.run_sync(self.call, fn, *args, limiter=self._limiter)
+
+    def close(self) -> None:
+        """Close idle connections. The pool reconnects lazily if it is used again."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except Empty:
+                break
+            conn.close()
+            with self._create_lock:
+                self._created -= 1
+
+
+@contextmanager
+def _transaction(conn: sqlite3.Connection) -> Iterator[None]:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _add_column(conn: sqlite3.Connection, table: str, column: str, definition: str) -> None:
+    """Add `column` to a table created before it existed."""
+    if column in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+        return
+    try:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    except sqlite3.OperationalError as e:
+        if "duplicate column" not in str(e):  # another worker added it first
+            raise
+
+
+def _init_versions(conn: sqlite3.Connection, table: str, per_row: bool) -> None:
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS store_versions "
+        "(name TEXT PRIMARY KEY, version INTEGER NOT NULL, modified_at REAL NOT NULL DEFAULT 0)"
+    )
+    _add_column(conn, "store_versions", "modified_at", "REAL NOT NULL DEFAULT 0")
+    conn.execute("INSERT OR IGNORE INTO store_versions (name, version) VALUES (?, 0)", (table,))
+    if per_row:
+        _add_column(conn, table, "version", "INTEGER NOT NULL DEFAULT 0")
+        _add_column(conn, table, "modified_at", "REAL NOT NULL DEFAULT 0")
+
+
+def _bump_version(conn: sqlite3.Connection, table: str, now: float | None = None) -> tuple[int, float]:
+    """Next (version, modified_at) of `table`; call inside the write's transaction."""
+    now = time.time() if now is None else now
+    sql = "UPDATE store_versions SET version = version + 1, modified_at = ? WHERE name = ? RETURNING version"
+    return conn.execute(sql, (now, table)).fetchone()[0], now
+
+
+def _read_version(conn: sqlite3.Connection, table: str) -> int:
+    return conn.execute("SELECT version FROM store_versions WHERE name = ?", (table,)).fetchone()[0]
+
+
+def _read_version_info(conn: sqlite3.Connection, table: str) -> tuple[int, float]:
+    return conn.execute("SELECT version, modified_at FROM store_versions WHERE name = ?", (table,)).fetchone()
+
+
+# ----------------------
+# Items with an integer primary key (main17)
+# ----------------------
+
+class SQLiteItemStore(Generic[M]):
+    def __init__(self, pool: SQLitePool, model: type[M], table: str = "items", key: str = "id"):
+        self._pool = pool
+        self._model = model
+        self._key = key
+        self._table = table
+        t = table
+        self._sql_insert = f"INSERT INTO {t} (id, name, price, data, version, modified_at) VALUES (?, ?, ?, ?, ?, ?)"
+        self._sql_upsert = (
+            f"INSERT OR REPLACE INTO {t} (id, name, price, data, version, modified_at) VALUES (?, ?, ?, ?, ?, ?)"
+        )
+        self._sql_get = f"SELECT data FROM {t} WHERE id = ?"
+        self._sql_all = f"SELECT data FROM {t} ORDER BY rowid"
+        self._sql_page = f"SELECT id, data FROM {t} WHERE id > ? ORDER BY id LIMIT ?"
+        self._sql_by_name = f"SELECT data FROM {t} WHERE name = ? ORDER BY rowid"
+        self._sql_by_price = f"SELECT data FROM {t} WHERE price BETWEEN ? AND ? ORDER BY price, id"
+        self._sql_delete = f"DELETE FROM {t} WHERE id = ?"
+        self._sql_count = f"SELECT COUNT(*) FROM {t}"
+        self._sql_version = f"SELECT version, modified_at FROM {t} WHERE id = ?"
+        pool.call(self._create_schema)
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        t = self._table
+        conn.executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS {t} (
+                id INTEGER PRIMARY KEY,
+                name TEXT,
+                price REAL,
+                data TEXT NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0,
+                modified_at REAL NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS {t}_name ON {t} (name);
+            CREATE INDEX IF NOT EXISTS {t}_price ON {t} (price);
+            """
+        )
+        _init_versions(conn, t, per_row=True)
+
+    def _row(self, item: M) -> tuple:
+        return (
+            getattr(item, self._key),
+            getattr(item, "name", None),
+            getattr(item, "price", None),
+            item.model_dump_json(),
+        )
+
+    def _write(self, sql: str, row: tuple) -> Callable[[sqlite3.Connection], None]:
+        def write(conn: sqlite3.Connection) -> None:
+            with _transaction(conn):
+                conn.execute(sql, (*row, *_bump_version(conn, self._table)))
+
+        return write
+
+    def _load(self, rows: Iterable[tuple]) -> list[M]:
+        validate = self._model.model_validate_json
+        return [validate(row[0]) for row in rows]
+
+    async def add(self, item: M) -> M:
+        insert = self._write(self._sql_insert, self._row(item))
+        try:
+            await self._pool.run(insert)
+        except sqlite3.IntegrityError:
+            raise DuplicateKeyError(getattr(item, self._key)) from None
+        return item
+
+    async def extend(self, items: Iterable[M]) -> None:
+        """Batched insert in one transaction; nothing is stored if any key is a duplicate."""
+        rows = [self._row(item) for item in items]
+
+        def insert_many(conn: sqlite3.Connection) -> None:
+            try:
+                with _transaction(conn):
+                    stamp = _bump_version(conn, self._table)
+                    conn.executemany(self._sql_insert, [(*row, *stamp) for row in rows])
+            except sqlite3.IntegrityError as e:
+                raise DuplicateKeyError(str(e)) from None
+
+        await self._pool.run(insert_many)
+
+    async def put(self, item: M) -> M:
+        await self._pool.run(self._write(self._sql_upsert, self._row(item)))
+        return item
+
+    async def get(self, key: int) -> M | None:
+        row = await self._pool.run(lambda conn: conn.execute(self._sql_get, (key,)).fetchone())
+        return None if row is None else self._model.model_validate_json(row[0])
+
+    async def delete(self, key: int) -> M:
+        def delete(conn: sqlite3.Connection) -> str:
+            with _transaction(conn):
+                row = conn.execute(self._sql_get, (key,)).fetchone()
+                if row is None:
+                    raise KeyError(key)
+                conn.execute(self._sql_delete, (key,))
+                _bump_version(conn, self._table)
+            return row[0]
+
+        return self._model.model_validate_json(await self._pool.run(delete))
+
+    async def clear(self) -> None:
+        def clear(conn: sqlite3.Connection) -> None:
+            with _transaction(conn):
+                conn.execute(f"DELETE FROM {self._table}")
+                _bump_version(conn, self._table)
+
+        await self._pool.run(clear)
+
+    async def version(self, key: int | None = None) -> int:
+        """Version of the whole table, or of one item (0 if it doesn't exist)."""
+        if key is None:
+            return await self._pool.run(_read_version, self._table)
+        return (await self.version_info(key))[0]
+
+    async def version_info(self, key: int | None = None) -> tuple[int, float]:
+        """(version, modified_at) of the whole table, or of one item ((0, 0.0) if it doesn't exist)."""
+        if key is None:
+            return tuple(await self._pool.run(_read_version_info, self._table))
+        row = await self._pool.run(lambda conn: conn.execute(self._sql_version, (key,)).fetchone())
+        return (0, 0.0) if row is None else tuple(row)
+
+    async def count(self) -> int:
+        return await self._pool.run(lambda conn: conn.execute(self._sql_count).fetchone()[0])
+
+    async def values(self) -> list[M]:
+        rows = await self._pool.run(lambda conn: conn.execute(self._sql_all).fetchall())
+        return self._load(rows)
+
+    async def iterate(self, batch_size: int = 500) -> AsyncIterator[M]:
+        """Yield every item in id order, fetching `batch_size` rows per query."""
+        last = -(2**63)
+        while True:
+            rows = await self._pool.run(lambda conn: conn.execute(self._sql_page, (last, batch_size)).fetchall())
+            validate = self._model.model_validate_json
+            for _, data in rows:
+                yield validate(data)
+            if len(rows) < batch_size:
+                return
+            last = rows[-1][0]
+
+    async def find_by_name(self, name: str) -> list[M]:
+        rows = await self._pool.run(lambda conn: conn.execute(self._sql_by_name, (name,)).fetchall())
+        return self._load(rows)
+
+    async def find_by_price_range(self, low: float, high: float) -> list[M]:
+        rows = await self._pool.run(lambda conn: conn.execute(self._sql_by_price, (low, high)).fetchall())
+        return self._load(rows)
+
+
+# ----------------------
+# JSON documents under a string key (main18)
+# ----------------------
+
+class SQLiteDocumentStore:
+    def __init__(self, pool: SQLitePool, table: str):
+        self._pool = pool
+        self._table = table
+        self._sql_get = f"SELECT doc FROM {table} WHERE key = ?"
+        self._sql_put = f"INSERT OR REPLACE INTO {table} (key, doc, version, modified_at) VALUES (?, ?, ?, ?)"
+        self._sql_put_new = f"INSERT OR IGNORE INTO {table} (key, doc, version, modified_at) VALUES (?, ?, ?, ?)"
+        self._sql_all = f"SELECT key, doc FROM {table} ORDER BY rowid"
+        self._sql_delete = f"DELETE FROM {table} WHERE key = ?"
+        self._sql_version = f"SELECT version, modified_at FROM {table} WHERE key = ?"
+        pool.call(self._create_schema)
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self._table} "
+            f"(key TEXT PRIMARY KEY, doc TEXT NOT NULL, version INTEGER NOT NULL DEFAULT 0, "
+            f"modified_at REAL NOT NULL DEFAULT 0)"
+        )
+        _init_versions(conn, self._table, per_row=True)
+
+    async def get(self, key: str) -> Any | None:
+        row = await self._pool.run(lambda conn: conn.execute(self._sql_get, (key,)).fetchone())
+        return None if row is None else json.loads(row[0])
+
+    async def put(self, key: str, doc: Any) -> None:
+        await self.put_many({key: doc})
+
+    async def put_many(self, docs: dict[str, Any], replace: bool = True) -> None:
+        """Batched write in one transaction. With replace=False existing keys are kept."""
+        sql = self._sql_put if replace else self._sql_put_new
+        rows = [(key, json.dumps(doc)) for key, doc in docs.items()]
+
+        def write(conn: sqlite3.Connection) -> None:
+            with _transaction(conn):
+                # Only bump the version if a row was written (replace=False may skip them all)
+                stamp = (_read_version(conn, self._table) + 1, time.time())
+                if conn.executemany(sql, [(*row, *stamp) for row in rows]).rowcount:
+                    _bump_version(conn, self._table, now=stamp[1])
+
+        await self._pool.run(write)
+
+    async def delete(self, key: str) -> None:
+        def delete(conn: sqlite3.Connection) -> None:
+            with _transaction(conn):
+                if conn.execute(self._sql_delete, (key,)).rowcount:
+                    _bump_version(conn, self._table)
+
+        await self._pool.run(delete)
+
+    async def version(self, key: str | None = None) -> int:
+        """Version of the whole table, or of one document (0 if it doesn't exist)."""
+        if key is None:
+            return await self._pool.run(_read_version, self._table)
+        return (await self.version_info(key))[0]
+
+    async def version_info(self, key: str | None = None) -> tuple[int, float]:
+        """(version, modified_at) of the whole table, or of one document ((0, 0.0) if it doesn't exist)."""
+        if key is None:
+            return tuple(await self._pool.run(_read_version_info, self._table))
+        row = await self._pool.run(lambda conn: conn.execute(self._sql_version, (key,)).fetchone())
+        return (0, 0.0) if row is None else tuple(row)
+
+    async def items(self) -> list[tuple[str, Any]]:
+        rows = await self._pool.run(lambda conn: conn.execute(self._sql_all).fetchall())
+        return [(key, json.loads(doc)) for key, doc in rows]
+
+
+# ----------------------
+# Events indexed by date (main18)
+# ----------------------
+
+def _ts(value: datetime) -> str:
+    # Fixed-width UTC text, so string order in the index is time order
+    return to_utc(value).strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+
+_TS_MAX = "9999-12-31T23:59:59.999999"
+_BUCKET_PREFIX = {"hour": 13, "day": 10}  # length of "YYYY-MM-DDTHH" / "YYYY-MM-DD"
+
+
+class SQLiteEventStore:
+    def __init__(self, pool: SQLitePool, table: str):
+        self._pool = pool
+        self._table = table
+        t = table
+        self._sql_get = f"SELECT doc FROM {t} WHERE key = ?"
+        self._sql_put = f"INSERT OR REPLACE INTO {t} (key, ts, doc) VALUES (?, ?, ?)"
+        self._sql_put_new = f"INSERT OR IGNORE INTO {t} (key, ts, doc) VALUES (?, ?, ?)"
+        self._sql_range = f"SELECT key, doc FROM {t} WHERE ts >= ? AND ts < ? ORDER BY ts, key LIMIT ?"
+        self._sql_stats = (
+            f"SELECT substr(ts, 1, ?) AS bucket, COUNT(*) FROM {t} "
+            f"WHERE ts >= ? AND ts < ? GROUP BY bucket ORDER BY bucket"
+        )
+        self._sql_evict = f"DELETE FROM {t} WHERE ts < ?"
+        self._sql_delete = f"DELETE FROM {t} WHERE key = ?"
+        pool.call(self._create_schema)
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        t = self._table
+        conn.executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS {t} (key TEXT PRIMARY KEY, ts TEXT NOT NULL, doc TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS {t}_ts ON {t} (ts);
+            """
+        )
+        # Events are only read as ranges, so only the table as a whole has a version
+        _init_versions(conn, t, per_row=False)
+
+    def _write(self, sql: str, args: tuple) -> Callable[[sqlite3.Connection], int]:
+        def write(conn: sqlite3.Connection) -> int:
+            with _transaction(conn):
+                count = conn.execute(sql, args).rowcount
+                if count:
+                    _bump_version(conn, self._table)
+            return count
+
+        return write
+
+    async def get(self, key: str) -> Any | None:
+        row = await self._pool.run(lambda conn: conn.execute(self._sql_get, (key,)).fetchone())
+        return None if row is None else json.loads(row[0])
+
+    async def put(self, key: str, event: Any, date: datetime) -> None:
+        row = (key, _ts(date), json.dumps(event))
+        await self._pool.run(self._write(self._sql_put, row))
+
+    async def put_many(self, events: dict[str, tuple[Any, datetime]], replace: bool = True) -> None:
+        sql = self._sql_put if replace else self._sql_put_new
+        rows = [(key, _ts(date), json.dumps(event)) for key, (event, date) in events.items()]
+
+        def write(conn: sqlite3.Connection) -> None:
+            with _transaction(conn):
+                if conn.executemany(sql, rows).rowcount:
+                    _bump_version(conn, self._table)
+
+        await self._pool.run(write)
+
+    async def delete(self, key: str) -> None:
+        await self._pool.run(self._write(self._sql_delete, (key,)))
+
+    async def version(self) -> int:
+        return await self._pool.run(_read_version, self._table)
+
+    async def version_info(self) -> tuple[int, float]:
+        return tuple(await self._pool.run(_read_version_info, self._table))
+
+    async def range(self, start: datetime | None = None, end: datetime | None = None,
+                    limit: int = 100) -> list[tuple[str, Any]]:
+        args = (_ts(start) if start else "", _ts(end) if end else _TS_MAX, limit)
+        rows = await self._pool.run(lambda conn: conn.execute(self._sql_range, args).fetchall())
+        return [(key, json.loads(doc)) for key, doc in rows]
+
+    async def stats(self, bucket: str = "hour", start: datetime | None = None,
+                    end: datetime | None = None) -> dict[datetime, int]:
+        # Counted with an index range scan over [start, end); there are no stored counters
+        width = _BUCKET_PREFIX[bucket]
+        low = _ts(bucket_start(to_utc(start), bucket)) if start else ""
+        args = (width, low, _ts(end) if end else _TS_MAX)
+        rows = await self._pool.run(lambda conn: conn.execute(self._sql_stats, args).fetchall())
+        fmt = "%Y-%m-%dT%H" if bucket == "hour" else "%Y-%m-%d"
+        return {datetime.strptime(prefix, fmt).replace(tzinfo=timezone.utc): count for prefix, count in rows}
+
+    async def evict_before(self, cutoff: datetime) -> int:
+        return await self._pool.run(self._write(self._sql_evict, (_ts(cutoff),)))
@@ -0,0 +1,264 @@
+"""
+Storage backend selection for main12, main17 and main18.
+
+The apps talk to their data through the same async interface, so the backend can be
+switched with an environment variable without touching the path operations:
+
+    STORAGE_BACKEND=memory  (default) - ItemStore / dict, lost on restart
+    STORAGE_BACKEND=sqlite             - SQLite file in WAL mode (see sqlite_store.py)
+    SQLITE_PATH=tutorial.db            - database file for the sqlite backend
+    SQLITE_POOL_SIZE=4                 - connections in the sqlite pool
+
+Example:
+    STORAGE_BACKEND=sqlite uvicorn main17:app --reload
+
+The memory adapters below just wrap ItemStore and a dict in `async def` methods; they
+never await anything, so they cost one coroutine call on top of the dict lookup.
+
+Every backend also counts versions: each write bumps the store's version, and items and
+documents remember the version that last wrote them. `version()` (the whole store) and
+`version(key)` (one item or document, 0 if it doesn't exist) let routes reuse a response
+built for the same version (see conditional.py). A version is never reused, even when a
+key is deleted and created again. `version_info()` / `version_info(key)` return the version
+together with the Unix time of the write that made it, which conditional.py sends as
+Last-Modified; before the first write, a store's time is when it was opened (memory) or
+0.0 (sqlite, for rows written before times were recorded), meaning unknown.
+"""
+
+import os
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Hashable, Iterable, TypeVar
+
+from pydantic import BaseModel
+
+from event_store import EventStore
+from item_store import ItemStore
+
+M = TypeVar("M", bound=BaseModel)
+
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "memory")
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "tutorial.db")
+SQLITE_POOL_SIZE = int(os.environ.get("SQLITE_POOL_SIZE", "4"))
+
+_pools: dict[str, Any] = {}
+
+
+class MemoryItemBackend:
+    """Async facade over ItemStore with the same methods as SQLiteItemStore."""
+
+    def __init__(self, store: ItemStore):
+        self.store = store
+        # Only changed between awaits on the event loop, so the counters need no lock
+        self._version = 0
+        self._modified_at = time.time()
+        # key -> (version, time) of the write that last stored it
+        self._versions: dict[Hashable, tuple[int, float]] = {}
+
+    def _bump(self, keys: Iterable[Hashable] = ()) -> None:
+        self._version += 1
+        self._modified_at = time.time()
+        stamp = (self._version, self._modified_at)
+        for key in keys:
+            self._versions[key] = stamp
+
+    async def add(self, item: M) -> M:
+        self.store.add(item)
+        self._bump([self.store.key_of(item)])
+        return item
+
+    async def extend(self, items: Iterable[M]) -> None:
+        items = list(items)
+        self.store.extend(items)
+        self._bump(map(self.store.key_of, items))
+
+    async def put(self, item: M) -> M:
+        self.store.put(item)
+        self._bump([self.store.key_of(item)])
+        return item
+
+    async def get(self, key: Hashable) -> M | None:
+        return self.store.get(key)
+
+    async def delete(self, key: Hashable) -> M:
+        item = self.store.delete(key)
+        self._versions.pop(key, None)
+        self._bump()
+        return item
+
+    async def clear(self) -> None:
+        self.store.clear()
+        self._versions.clear()
+        self._bump()
+
+    async def version(self, key: Hashable | None = None) -> int:
+        return (await self.version_info(key))[0]
+
+    async def version_info(self, key: Hashable | None = None) -> tuple[int, float]:
+        if key is None:
+            return self._version, self._modified_at
+        return self._versions.get(key, (0, 0.0))
+
+    async def count(self) -> int:
+        return len(self.store)
+
+    async def values(self) -> list[M]:
+        return self.store.values()
+
+    async def iterate(self, batch_size: int = 500) -> AsyncIterator[M]:
+        # Items are already in memory; the snapshot only copies references
+        for item in self.store.values():
+            yield item
+
+    async def find_by_name(self, name: str) -> list[M]:
+        return self.store.find_by_name(name)
+
+    async def find_by_price_range(self, low: float, high: float) -> list[M]:
+        return self.store.find_by_price_range(low, high)
+
+
+class MemoryDocumentBackend:
+    """Async facade over a dict with the same methods as SQLiteDocumentStore."""
+
+    def __init__(self, docs: dict[str, Any] | None = None):
+        self.docs: dict[str, Any] = {} if docs is None else docs
+        self._version = 0
+        self._modified_at = time.time()
+        # key -> (version, time) of the write that last stored it
+        self._versions: dict[str, tuple[int, float]] = dict.fromkeys(self.docs, (0, self._modified_at))
+
+    def _bump(self) -> tuple[int, float]:
+        self._version += 1
+        self._modified_at = time.time()
+        return self._version, self._modified_at
+
+    async def get(self, key: str) -> Any | None:
+        return self.docs.get(key)
+
+    async def put(self, key: str, doc: Any) -> None:
+        self.docs[key] = doc
+        self._versions[key] = self._bump()
+
+    async def put_many(self, docs: dict[str, Any], replace: bool = True) -> None:
+        # Only a real write bumps the version (and so invalidates cached representations)
+        written = {key: doc for key, doc in docs.items() if replace or key not in self.docs}
+        if not written:
+            return
+        self.docs.update(written)
+        self._versions.update(dict.fromkeys(written, self._bump()))
+
+    async def delete(self, key: str) -> None:
+        if self.docs.pop(key, None) is not None:
+            del self._versions[key]
+            self._bump()
+
+    async def version(self, key: str | None = None) -> int:
+        return (await self.version_info(key))[0]
+
+    async def version_info(self, key: str | None = None) -> tuple[int, float]:
+        if key is None:
+            return self._version, self._modified_at
+        return self._versions.get(key, (0, 0.0))
+
+    async def items(self) -> list[tuple[str, Any]]:
+        return list(self.docs.items())
+
+
+class MemoryEventBackend:
+    """Async facade over EventStore with the same methods as SQLiteEventStore."""
+
+    def __init__(self, store: EventStore):
+        self.store = store
+        self._version = 0
+        self._modified_at = time.time()
+
+    def _bump(self) -> None:
+        self._version += 1
+        self._modified_at = time.time()
+
+    async def get(self, key: str) -> Any | None:
+        return self.store.get(key)
+
+    async def put(self, key: str, event: Any, date: datetime) -> None:
+        self.store.put(key, event, date)
+        self._bump()
+
+    async def put_many(self, events: dict[str, tuple[Any, datetime]], replace: bool = True) -> None:
+        written = 0
+        for key, (event, date) in events.items():
+            if replace or key not in self.store:
+                self.store.put(key, event, date)
+                written += 1
+        if written:
+            self._bump()
+
+    async def delete(self, key: str) -> None:
+        # Like SQLiteEventStore: deleting a missing key is a no-op and keeps the version
+        if key in self.store:
+            self.store.delete(key)
+            self._bump()
+
+    async def version(self) -> int:
+        return self._version
+
+    async def version_info(self) -> tuple[int, float]:
+        return self._version, self._modified_at
+
+    async def range(self, start: datetime | None = None, end: datetime | None = None,
+                    limit: int = 100) -> list[tuple[str, Any]]:
+        return self.store.range(start, end, limit)
+
+    async def stats(self, bucket: str = "hour", start: datetime | None = None,
+                    end: datetime | None = None) -> dict[datetime, int]:
+        return self.store.stats(bucket, start, end)
+
+    async def evict_before(self, cutoff: datetime) -> int:
+        evicted = self.store.evict_before(cutoff)
+        if evicted:
+            self._bump()
+        return evicted
+
+
+def sqlite_pool(path: str = SQLITE_PATH, size: int = SQLITE_POOL_SIZE):
+    """One shared pool per database file."""
+    from sqlite_store import SQLitePool
+
+    pool = _pools.get(path)
+    if pool is None:
+        pool = _pools[path] = SQLitePool(path, size=size)
+    return pool
+
+
+def close_pools() -> None:
+    for pool in _pools.values():
+        pool.close()
+
+
+def open_item_backend(model: type[M], table: str = "items", backend: str = STORAGE_BACKEND):
+    if backend == "memory":
+        return MemoryItemBackend(ItemStore(key="id", index_name=True, index_price=True))
+    if backend == "sqlite":
+        from sqlite_store import SQLiteItemStore
+
+        return SQLiteItemStore(sqlite_pool(), model, table=table)
+    raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}, expected 'memory' or 'sqlite'")
+
+
+def open_document_backend(table: str, backend: str = STORAGE_BACKEND):
+    if backend == "memory":
+        return MemoryDocumentBackend()
+    if backend == "sqlite":
+        from sqlite_store import SQLiteDocumentStore
+
+        return SQLiteDocumentStore(sqlite_pool(), table)
+    raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}, expected 'memory' or 'sqlite'")
+
+
+def open_event_backend(table: str, backend: str = STORAGE_BACKEND):
+    if backend == "memory":
+        return MemoryEventBackend(EventStore())
+    if backend == "sqlite":
+        from sqlite_store import SQLiteEventStore
+
+        return SQLiteEventStore(sqlite_pool(), table)
+    raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}, expected 'memory' or 'sqlite'")
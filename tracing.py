@@ -0,0 +1,374 @@
+"""
+Request tracing with W3C trace context, head sampling and batched export.
+
+A request that arrives with a `traceparent` header is part of a trace started elsewhere:
+
+    traceparent: 00-<32 hex trace id>-<16 hex parent span id>-<2 hex flags, 01 = sampled>
+
+`instrument(app)` continues that trace (or starts a new one) and records one server span for
+the request with four child spans, one per phase:
+
+    routing        - from the request entering the app to the route's handler starting
+    validation     - reading the body and solving parameters and dependencies
+    handler        - the path operation function itself
+    serialization  - turning the return value into a Response
+
+Head sampling: whether a trace is recorded is decided once, when it starts. An incoming
+traceparent's sampled flag is followed; otherwise a new trace is sampled with probability
+TRACE_SAMPLE_RATE. An unsampled request without a traceparent costs a header scan and one
+random() call: no ids are generated, no timestamps taken and no context variables set.
+
+Finished spans are written into a fixed-size ring buffer without taking a lock: each writer
+claims a slot with `next()` on an itertools.count (atomic under the GIL) and stores the span
+there. A background thread drains the buffer every TRACE_EXPORT_INTERVAL seconds and appends
+each batch to TRACE_EXPORT_PATH as one line of OTLP/JSON (`{"resourceSpans": [...]}`). If
+the exporter falls more than one buffer behind, the oldest spans are overwritten and
+counted as dropped.
+
+Call `instrument(app)` right after creating the app, before declaring routes: the phase
+spans come from the route class, which only applies to routes added afterwards.
+
+Configuration:
+    TRACE_SAMPLE_RATE=0.01          - share of new traces that are recorded
+    TRACE_EXPORT_PATH=traces.jsonl  - OTLP/JSON lines file
+    TRACE_EXPORT_INTERVAL=1.0       - seconds between exports
+    TRACE_BUFFER_SIZE=16384         - spans kept in the ring buffer
+"""
+
+import asyncio
+import functools
+import itertools
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from fastapi import FastAPI, Request, Response
+from fastapi.routing import APIRoute
+
+logger = logging.getLogger(__name__)
+
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", "0.01"))
+TRACE_EXPORT_PATH = os.environ.get("TRACE_EXPORT_PATH", "traces.jsonl")
+TRACE_EXPORT_INTERVAL = float(os.environ.get("TRACE_EXPORT_INTERVAL", "1.0"))
+TRACE_BUFFER_SIZE = int(os.environ.get("TRACE_BUFFER_SIZE", "16384"))
+
+_TRACEPARENT = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(-.*)?$")
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+
+
+@dataclass(frozen=True)
+class TraceContext:
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+    @property
+    def traceparent(self) -> str:
+        """The header to send on outgoing requests so the trace continues there."""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(value: str) -> TraceContext | None:
+    """The context in a traceparent header, or None if it isn't valid."""
+    match = _TRACEPARENT.match(value.strip().lower())
+    if match is None:
+        return None
+    version, trace_id, span_id, flags, rest = match.groups()
+    # Version ff is forbidden; version 00 has no extra fields
+    if version == "ff" or (version == "00" and rest) or trace_id == _INVALID_TRACE_ID or span_id == _INVALID_SPAN_ID:
+        return None
+    return TraceContext(trace_id, span_id, sampled=bool(int(flags, 16) & 1))
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+# The trace the current request belongs to (None if it has none), for outgoing calls
+current_trace: ContextVar[TraceContext | None] = ContextVar("current_trace", default=None)
+
+
+class _Phases:
+    """Phase boundaries of one sampled request, in time.time_ns()."""
+
+    __slots__ = ("route_start", "endpoint_start", "endpoint_end", "route_end")
+
+    def __init__(self):
+        self.route_start = self.endpoint_start = self.endpoint_end = self.route_end = 0
+
+
+_current_phases: ContextVar[_Phases | None] = ContextVar("_current_phases", default=None)
+
+# (trace_id, span_id, parent_span_id, name, kind, start_ns, end_ns, attributes, error)
+Span = tuple[str, str, str, str, int, int, int, dict[str, Any], bool]
+
+
+class SpanRingBuffer:
+    """Fixed-size buffer of finished spans. Many writers, one reader, no locks."""
+
+    def __init__(self, size: int = TRACE_BUFFER_SIZE):
+        self.size = size
+        self._slots: list[tuple[int, Span] | None] = [None] * size
+        self._sequence = itertools.count()
+        self._read = 0
+        self.dropped = 0
+
+    def append(self, span: Span) -> None:
+        seq = next(self._sequence)
+        self._slots[seq % self.size] = (seq, span)
+
+    def drain(self, limit: int | None = None) -> list[Span]:
+        """Spans written since the last drain, oldest first. Call from one thread only."""
+        batch: list[Span] = []
+        while limit is None or len(batch) < limit:
+            slot = self._slots[self._read % self.size]
+            if slot is None or slot[0] < self._read:
+                break  # nothing newer written yet
+            seq, span = slot
+            if seq > self._read:
+                # Writers lapped the reader: the spans in between were overwritten
+                oldest = max(self._read, seq - self.size + 1)
+                self.dropped += oldest - self._read
+                self._read = oldest
+                continue
+            batch.append(span)
+            self._read += 1
+        return batch
+
+
+def _attribute(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def to_otlp_json(spans: list[Span], service_name: str) -> dict:
+    """One OTLP/JSON export request (ids in hex, times as strings of nanoseconds)."""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", service_name)]},
+            "scopeSpans": [{
+                "scope": {"name": "tracing"},
+                "spans": [
+                    {
+                        "traceId": trace_id,
+                        "spanId": span_id,
+                        "parentSpanId": parent_id,
+                        "name": name,
+                        "kind": kind,
+                        "startTimeUnixNano": str(start),
+                        "endTimeUnixNano": str(end),
+                        "attributes": [_attribute(k, v) for k, v in attributes.items()],
+                        "status": {"code": 2 if error else 0},
+                    }
+                    for trace_id, span_id, parent_id, name, kind, start, end, attributes, error in spans
+                ],
+            }],
+        }]
+    }
+
+
+class BatchExporter:
+    """Background thread that appends batches of spans to an OTLP/JSON lines file."""
+
+    def __init__(self, buffer: SpanRingBuffer, path: str = TRACE_EXPORT_PATH,
+                 interval: float = TRACE_EXPORT_INTERVAL, service_name: str = "fastapi-tutorial",
+                 batch_size: int = 512):
+        self.buffer = buffer
+        self.path = path
+        self.interval = interval
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.exported = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the thread after a final export."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.export()
+        self.export()
+
+    def export(self) -> int:
+        count = 0
+        while batch := self.buffer.drain(self.batch_size):
+            try:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(to_otlp_json(batch, self.service_name), separators=(",", ":")) + "\n")
+            except OSError:
+                logger.exception("Span export to %s failed; %d spans lost", self.path, len(batch))
+                continue
+            count += len(batch)
+        self.exported += count
+        return count
+
+
+class Tracer:
+    def __init__(self, sample_rate: float = TRACE_SAMPLE_RATE, buffer: SpanRingBuffer | None = None):
+        self.sample_rate = sample_rate
+        self.buffer = SpanRingBuffer() if buffer is None else buffer
+
+    def sample(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def record(self, trace_id: str, parent_id: str, phases: _Phases, server: Span) -> None:
+        """The server span plus one child span per phase that was reached."""
+        append = self.buffer.append
+        append(server)
+        _, span_id, _, _, _, start, end, _, error = server
+        if not phases.route_start:
+            return  # no route matched (404/405): the whole request was routing
+        boundaries = (
+            ("routing", start, phases.route_start),
+            ("validation", phases.route_start, phases.endpoint_start or phases.route_end),
+            ("handler", phases.endpoint_start, phases.endpoint_end),
+            ("serialization", phases.endpoint_end, phases.route_end),
+        )
+        for name, begin, finish in boundaries:
+            if begin and finish:
+                append((trace_id, _new_id(64), span_id, name, SPAN_KIND_INTERNAL, begin, finish, {}, False))
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware: continues or starts the trace and records the server span."""
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        parent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                parent = parse_traceparent(value.decode("latin-1"))
+                break
+        if parent is None:
+            if not self.tracer.sample():
+                return await self.app(scope, receive, send)
+        elif not parent.sampled:
+            # Not recorded, but the trace id is still passed on to outgoing calls
+            token = current_trace.set(parent)
+            try:
+                return await self.app(scope, receive, send)
+            finally:
+                current_trace.reset(token)
+        await self._traced(scope, receive, send, parent)
+
+    async def _traced(self, scope, receive, send, parent: TraceContext | None):
+        trace_id = parent.trace_id if parent is not None else _new_id(128)
+        context = TraceContext(trace_id, _new_id(64), sampled=True)
+        phases = _Phases()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        trace_token = current_trace.set(context)
+        phases_token = _current_phases.set(phases)
+        start = time.time_ns()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end = time.time_ns()
+            _current_phases.reset(phases_token)
+            current_trace.reset(trace_token)
+            route = scope.get("route")
+            attributes = {
+                "http.request.method": scope["method"],
+                "url.path": scope["path"],
+                "http.route": getattr(route, "path", ""),
+                "http.response.status_code": status,
+            }
+            name = f"{scope['method']} {attributes['http.route'] or scope['path']}"
+            server = (trace_id, context.span_id, parent.span_id if parent else "", name, SPAN_KIND_SERVER,
+                      start, end, attributes, status >= 500)
+            self.tracer.record(trace_id, context.span_id, phases, server)
+
+
+def _timed_endpoint(call: Callable) -> Callable:
+    """Wrap a path operation so sampled requests record when it starts and ends."""
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def endpoint(*args, **kwargs):
+            phases = _current_phases.get()
+            if phases is None:
+                return await call(*args, **kwargs)
+            phases.endpoint_start = time.time_ns()
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                phases.endpoint_end = time.time_ns()
+    else:
+        @functools.wraps(call)
+        def endpoint(*args, **kwargs):
+            # Runs in the threadpool; the request's context is copied there, phases included
+            phases = _current_phases.get()
+            if phases is None:
+                return call(*args, **kwargs)
+            phases.endpoint_start = time.time_ns()
+            try:
+                return call(*args, **kwargs)
+            finally:
+                phases.endpoint_end = time.time_ns()
+    return endpoint
+
+
+class TracedRoute(APIRoute):
+    """APIRoute that marks the phase boundaries of sampled requests."""
+
+    def get_route_handler(self) -> Callable[[Request], Any]:
+        self.dependant.call = _timed_endpoint(self.dependant.call)
+        handler = super().get_route_handler()
+
+        async def traced_handler(request: Request) -> Response:
+            phases = _current_phases.get()
+            if phases is None:
+                return await handler(request)
+            phases.route_start = time.time_ns()
+            try:
+                return await handler(request)
+            finally:
+                phases.route_end = time.time_ns()
+
+        return traced_handler
+
+
+def instrument(app: FastAPI, tracer: Tracer | None = None, exporter: BatchExporter | None = None) -> Tracer:
+    """Trace `app`'s requests. Call before declaring routes (see the module docstring)."""
+    tracer = Tracer() if tracer is None else tracer
+    exporter = BatchExporter(tracer.buffer, service_name=app.title) if exporter is None else exporter
+    app.router.route_class = TracedRoute
+    app.add_middleware(TracingMiddleware, tracer=tracer)
+    app.add_event_handler("startup", exporter.start)
+    app.add_event_handler("shutdown", exporter.stop)
+    return tracer
@@ -0,0 +1,330 @@
+"""
+Resumable chunked uploads and a content-addressed blob store.
+
+A large upload sent in one request starts over from zero when the connection drops.
+An upload session lets the client send the file in pieces and pick up where it left off:
+
+1. POST   /uploads/                       create a session -> upload_id
+2. PUT    /uploads/{upload_id}            append bytes, with `Content-Range: bytes start-end/total`
+3. HEAD   /uploads/{upload_id}            how many bytes arrived so far (`Upload-Offset` header)
+4. POST   /uploads/{upload_id}/finalize   check the size, store the blob, return its sha256
+
+Finished files go into a BlobStore keyed by their sha256 (`blobs/ab/abcdef...`), so the same
+content is stored once however many times it is uploaded. If the client says which sha256 it
+is about to upload and that blob already exists, creating the session answers "exists" and
+nothing needs to be sent at all.
+
+While a session receives its bytes in order, its sha256 is updated incrementally as chunks
+arrive, so finalize is a rename. Only if the process restarted in the middle of an upload is
+the received file hashed again at finalize.
+
+Sessions that see no new bytes for SESSION_TTL_SECONDS are deleted by `collect_expired`,
+which `run_session_gc` calls periodically.
+
+`create`, `status` and `collect_expired` run in the threadpool, while `append` and
+`finalize` run on the event loop and send their file I/O to the threadpool, so the
+session table, each session's `busy` flag and the set of sessions being collected are
+guarded by one lock. The lock is never held across file I/O. A session's bytes and hash
+are then only touched by whichever request holds `busy`, and `collect_expired` skips busy
+sessions and keeps requests off the ones it is deleting.
+
+On disk (under UPLOAD_DIR):
+    sessions/<upload_id>.part   bytes received so far; its size is the offset
+    sessions/<upload_id>.json   filename, expected total size, expected sha256
+    blobs/<sha[:2]>/<sha>       finished, deduplicated content
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterable
+
+import anyio
+from anyio import to_thread
+
+from uploads import MAX_UPLOAD_BYTES, UPLOAD_DIR, UploadTooLarge
+
+logger = logging.getLogger(__name__)
+
+SESSION_TTL_SECONDS = float(os.environ.get("SESSION_TTL_SECONDS", str(24 * 3600)))
+HASH_CHUNK = 1024 * 1024
+
+_UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+_CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+
+
+class SessionNotFound(KeyError):
+    pass
+
+
+class SessionConflict(Exception):
+    """The request doesn't fit the session's state (wrong offset, busy, incomplete)."""
+
+    def __init__(self, message: str, offset: int):
+        super().__init__(message)
+        self.offset = offset
+
+
+class InvalidRange(ValueError):
+    pass
+
+
+def parse_content_range(header: str) -> tuple[int, int, int | None]:
+    """`bytes start-end/total` -> (start, end inclusive, total or None)."""
+    match = _CONTENT_RANGE.match(header.strip())
+    if not match:
+        raise InvalidRange(f"Malformed Content-Range: {header!r}")
+    start, end, total = match.groups()
+    start, end = int(start), int(end)
+    total = None if total == "*" else int(total)
+    if end < start or (total is not None and end >= total):
+        raise InvalidRange(f"Invalid Content-Range: {header!r}")
+    return start, end, total
+
+
+class BlobStore:
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path_for(self, sha256: str) -> str:
+        return os.path.join(self.directory, sha256[:2], sha256)
+
+    def exists(self, sha256: str) -> bool:
+        return bool(_SHA256.match(sha256)) and os.path.exists(self.path_for(sha256))
+
+    def adopt(self, path: str, sha256: str) -> bool:
+        """Move `path` into the store under its hash. Returns False if it was already there."""
+        target = self.path_for(sha256)
+        if os.path.exists(target):
+            os.unlink(path)
+            return False
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+        return True
+
+
+@dataclass
+class _Session:
+    upload_id: str
+    filename: str | None
+    size: int | None
+    sha256: str | None
+    hasher: "hashlib._Hash" = field(default_factory=hashlib.sha256)
+    hashed: int = 0  # bytes fed to `hasher`; equals the offset unless the process restarted
+    # Set while a PUT or finalize is running; checked and set under UploadSessions._lock
+    busy: bool = False
+
+
+class UploadSessions:
+    def __init__(self, directory: str = UPLOAD_DIR, max_bytes: int = MAX_UPLOAD_BYTES,
+                 ttl: float = SESSION_TTL_SECONDS):
+        self.sessions_dir = os.path.join(directory, "sessions")
+        self.blobs = BlobStore(os.path.join(directory, "blobs"))
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sessions: dict[str, _Session] = {}
+        self._collecting: set[str] = set()  # upload_ids collect_expired is looking at
+        self._lock = threading.Lock()
+
+    def create_directories(self) -> None:
+        """Blocking; call it once at startup, before the first request."""
+        os.makedirs(self.sessions_dir, exist_ok=True)
+        os.makedirs(self.blobs.directory, exist_ok=True)
+
+    def _part(self, upload_id: str) -> str:
+        return os.path.join(self.sessions_dir, upload_id + ".part")
+
+    def _meta(self, upload_id: str) -> str:
+        return os.path.join(self.sessions_dir, upload_id + ".json")
+
+    def _load(self, upload_id: str) -> _Session:
+        """Blocking: a session not seen since a restart is read from disk."""
+        with self._lock:
+            session = self._sessions.get(upload_id)
+        if session is not None:
+            return session
+        if not _UPLOAD_ID.match(upload_id):
+            raise SessionNotFound(upload_id)
+        # Session created before a restart: metadata is on disk, the hash state is not
+        try:
+            with open(self._meta(upload_id)) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            raise SessionNotFound(upload_id) from None
+        with self._lock:
+            return self._sessions.setdefault(upload_id, _Session(upload_id, **meta))
+
+    async def _claim(self, upload_id: str) -> _Session:
+        """The session, marked busy; SessionConflict if a request already has it."""
+        session = await to_thread.run_sync(self._load, upload_id)
+        with self._lock:
+            if self._sessions.get(upload_id) is not session:  # collected meanwhile
+                raise SessionNotFound(upload_id)
+            available = not session.busy and upload_id not in self._collecting
+            if available:
+                session.busy = True
+        if not available:
+            offset = await to_thread.run_sync(self.offset, upload_id)
+            raise SessionConflict("Another request is using this session", offset)
+        return session
+
+    def offset(self, upload_id: str) -> int:
+        """Blocking: bytes received so far."""
+        try:
+            return os.path.getsize(self._part(upload_id))
+        except FileNotFoundError:  # finalized or collected
+            raise SessionNotFound(upload_id) from None
+
+    def status(self, upload_id: str) -> dict:
+        session = self._load(upload_id)
+        return {
+            "upload_id": upload_id,
+            "filename": session.filename,
+            "size": session.size,
+            "offset": self.offset(upload_id),
+        }
+
+    def create(self, filename: str | None = None, size: int | None = None, sha256: str | None = None) -> dict:
+        """Start a session, or report that a blob with `sha256` is already stored."""
+        if sha256 is not None and self.blobs.exists(sha256):
+            return {"status": "exists", "sha256": sha256, "size": os.path.getsize(self.blobs.path_for(sha256))}
+        if size is not None and size < 0:
+            raise ValueError(f"Session size must not be negative, got {size}")
+        if size is not None and size > self.max_bytes:
+            raise UploadTooLarge(self.max_bytes)
+        upload_id = uuid.uuid4().hex
+        meta = {"filename": filename, "size": size, "sha256": sha256}
+        with open(self._meta(upload_id), "w") as f:
+            json.dump(meta, f)
+        open(self._part(upload_id), "wb").close()
+        with self._lock:
+            self._sessions[upload_id] = _Session(upload_id, **meta)
+        return {"status": "created", "upload_id": upload_id, "offset": 0}
+
+    async def append(self, upload_id: str, content_range: str, chunks: AsyncIterable[bytes]) -> int:
+        """Append one Content-Range worth of body; returns the new offset.
+
+        Bytes are kept as they arrive, so if the connection drops half way the client can
+        ask for the offset and resend from there.
+        """
+        start, end, total = parse_content_range(content_range)
+        session = await self._claim(upload_id)
+        try:
+            offset = await to_thread.run_sync(self.offset, upload_id)
+            if start != offset:
+                raise SessionConflict(f"Expected Content-Range to start at {offset}", offset)
+            if total is not None and session.size is not None and total != session.size:
+                raise InvalidRange(f"Total {total} does not match the session size {session.size}")
+            if session.size is not None and end >= session.size:
+                raise InvalidRange(f"Content-Range ends past the session size {session.size}")
+            if end + 1 > self.max_bytes:
+                raise UploadTooLarge(self.max_bytes)
+
+            file = await to_thread.run_sync(open, self._part(upload_id), "ab")
+            in_order = session.hashed == offset
+            try:
+                async for chunk in chunks:
+                    if offset + len(chunk) > end + 1:
+                        raise InvalidRange("Body is longer than its Content-Range")
+                    await to_thread.run_sync(self._write, file, session if in_order else None, chunk)
+                    offset += len(chunk)
+            finally:
+                with anyio.CancelScope(shield=True):
+                    await to_thread.run_sync(file.close)
+            return offset
+        finally:
+            session.busy = False
+
+    @staticmethod
+    def _write(file, session: _Session | None, chunk: bytes) -> None:
+        file.write(chunk)
+        if session is not None:
+            session.hasher.update(chunk)
+            session.hashed += len(chunk)
+
+    async def finalize(self, upload_id: str) -> dict:
+        session = await self._claim(upload_id)
+        try:
+            part = self._part(upload_id)
+            size = await to_thread.run_sync(self.offset, upload_id)
+            if session.size is not None and size != session.size:
+                raise SessionConflict(f"Received {size} of {session.size} bytes", size)
+            if session.hashed == size:
+                sha256 = session.hasher.hexdigest()
+            else:
+                sha256 = await to_thread.run_sync(self._hash_file, part)
+            if session.sha256 is not None and sha256 != session.sha256:
+                raise SessionConflict(f"Content sha256 {sha256} does not match the declared {session.sha256}", size)
+            stored = await to_thread.run_sync(self.blobs.adopt, part, sha256)
+            await to_thread.run_sync(os.unlink, self._meta(upload_id))
+            with self._lock:
+                del self._sessions[upload_id]
+        finally:
+            session.busy = False
+        return {"sha256": sha256, "size": size, "filename": session.filename, "deduplicated": not stored}
+
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            while chunk := f.read(HASH_CHUNK):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def collect_expired(self, now: float | None = None) -> int:
+        """Delete sessions that received no bytes for `ttl` seconds. Returns how many."""
+        now = time.time() if now is None else now
+        removed = 0
+        for name in os.listdir(self.sessions_dir):
+            if not name.endswith(".json"):
+                continue
+            upload_id = name[: -len(".json")]
+            # While the id is in _collecting, _claim refuses it, so the files can be
+            # checked and deleted without holding the lock
+            with self._lock:
+                session = self._sessions.get(upload_id)
+                if (session is not None and session.busy) or upload_id in self._collecting:
+                    continue
+                self._collecting.add(upload_id)
+            try:
+                if not self._expired(upload_id, now):
+                    continue
+                for path in (self._part(upload_id), self._meta(upload_id)):
+                    if os.path.exists(path):
+                        os.unlink(path)
+                with self._lock:
+                    self._sessions.pop(upload_id, None)
+                removed += 1
+            finally:
+                with self._lock:
+                    self._collecting.discard(upload_id)
+        return removed
+
+    def _expired(self, upload_id: str, now: float) -> bool:
+        part = self._part(upload_id)
+        try:
+            last_activity = os.path.getmtime(part if os.path.exists(part) else self._meta(upload_id))
+        except FileNotFoundError:  # finalized meanwhile
+            return False
+        return now - last_activity >= self.ttl
+
+
+async def run_session_gc(sessions: UploadSessions, interval: float = 300.0) -> None:
+    """Every `interval` seconds, delete expired upload sessions. Runs until cancelled."""
+    while True:
+        try:
+            removed = await to_thread.run_sync(sessions.collect_expired)
+        except Exception:
+            logger.exception("Upload session cleanup failed")
+        else:
+            if removed:
+                logger.info("Removed %d expired upload sessions", removed)
+        await asyncio.sleep(interval)
@@ -0,0 +1,89 @@
+"""
+Constant-memory streaming uploads with incremental hashing.
+
+`File()` (bytes) reads the whole upload into RAM before the path operation runs, and
+`UploadFile` only avoids that by letting Starlette spool the parsed multipart body to a
+temporary file first. For very large files neither is what we want.
+
+`save_stream` consumes the raw request body chunk by chunk (`request.stream()`):
+1. Each chunk is written to a temporary file and fed to an incremental sha256, both in
+   the anyio threadpool, so the event loop never waits on the disk or the hash.
+2. A byte counter enforces `max_bytes` while the body is still arriving; when it is
+   exceeded the partial file is deleted and UploadTooLarge is raised (→ 413).
+3. When the body is complete the temporary file is renamed into place.
+
+Only one chunk is held in memory at a time, so peak memory doesn't depend on the file size.
+
+Configuration:
+    UPLOAD_DIR=uploads             - where finished uploads are stored
+    MAX_UPLOAD_BYTES=10737418240   - 10 GiB by default
+"""
+
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from typing import AsyncIterable, BinaryIO
+
+from anyio import CancelScope, to_thread
+
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "uploads")
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(10 * 1024**3)))
+
+
+class UploadTooLarge(Exception):
+    """The upload is bigger than the configured maximum."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Upload exceeds the maximum size of {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    size: int
+    sha256: str
+
+
+def _write_and_hash(file: BinaryIO, hasher: "hashlib._Hash", chunk: bytes) -> None:
+    # hashlib releases the GIL for large buffers, so this runs truly in parallel
+    hasher.update(chunk)
+    file.write(chunk)
+
+
+def _discard(file: BinaryIO, path: str) -> None:
+    file.close()
+    os.unlink(path)
+
+
+async def save_stream(
+    chunks: AsyncIterable[bytes],
+    directory: str = UPLOAD_DIR,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    name: str | None = None,
+) -> StoredUpload:
+    """Write an async stream of chunks to `directory/name` (a random name by default)."""
+    await to_thread.run_sync(lambda: os.makedirs(directory, exist_ok=True))
+    name = name or uuid.uuid4().hex
+    final_path = os.path.join(directory, name)
+    tmp_path = final_path + ".part"
+    file = await to_thread.run_sync(open, tmp_path, "wb")
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(max_bytes)
+            await to_thread.run_sync(_write_and_hash, file, hasher, chunk)
+    except BaseException:
+        # Shielded so the partial file is removed even if the request was cancelled
+        with CancelScope(shield=True):
+            await to_thread.run_sync(_discard, file, tmp_path)
+        raise
+    await to_thread.run_sync(file.close)
+    await to_thread.run_sync(os.replace, tmp_path, final_path)
+    return StoredUpload(path=final_path, size=size, sha256=hasher.hexdigest())